@@ -1,17 +1,43 @@
-from flask import Flask, request, jsonify
-import joblib
+from flask import Flask, request, jsonify, Response, send_file
 import numpy as np
 from flask_cors import CORS
 import os
 import json
-import requests
 import random
+import math
+import time
+import zlib
+import gzip
+import hmac
+import shutil
+import tempfile
 from io import BytesIO
 from PIL import Image
 import google.generativeai as genai
 from datetime import datetime, timedelta
 import pandas as pd
 
+import price_client
+import price_store
+import price_sync
+import price_export
+import price_map
+import price_anomaly
+import market_geo
+import disease_store
+import equipment_store
+import crop_ranking
+import crop_model
+import crop_canary
+import crop_explain
+import schemes_engine
+import screen_schemes
+import metrics
+import profiling
+import http_cache
+import quota
+import validation
+
 app = Flask(__name__)
 CORS(app)
 
@@ -24,36 +50,146 @@ with open(CONFIG_PATH, "r") as f:
     config = json.load(f)
 
 DISEASE_API_KEY = config.get("DISEASE_API_KEY", "")
-PRICING_API_KEY = config.get("PRICING_API_KEY", "")
+PRICING_API_KEY = os.environ.get("PRICING_API_KEY") or config.get("PRICING_API_KEY", "")
 SCHEMES_API_KEY = config.get("SCHEMES_API_KEY", "")
-PRICING_BASE_URL = config.get("PRICING_BASE_URL")
+# Env overrides let the price path run against fake_datagov.py offline
+PRICING_BASE_URL = os.environ.get("PRICING_BASE_URL") or config.get("PRICING_BASE_URL")
+
+# Guards every /admin/ route; they answer 403 while it is unset
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") or config.get("ADMIN_TOKEN")
 
 genai.configure(api_key=DISEASE_API_KEY)
 
+def admin_authorized():
+    supplied = request.headers.get("X-Admin-Token")
+    return bool(ADMIN_TOKEN) and supplied is not None and hmac.compare_digest(supplied, ADMIN_TOKEN)
+
+# ---------------- Metrics ----------------
+metrics.configure(config.get("SLOW_REQUEST_MS"), config.get("SLOW_REQUEST_LOG"))
+metrics.init_app(app)
+http_cache.init_compression(app, min_size=config.get("COMPRESS_MIN_BYTES", 1024))
+
+# ---------------- Upstream Quotas ----------------
+quota_manager = quota.QuotaManager(config.get("UPSTREAM_QUOTAS"))
+
+def quota_exceeded(e):
+    return jsonify({"error": str(e)}), 429, {"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+
+def upstream_busy(retry_after=None):
+    return (jsonify({"error": "Upstream API is rate limiting requests, please retry later"}), 503,
+            {"Retry-After": str(retry_after or 5)})
+
+def is_rate_limit_error(e):
+    """Gemini surfaces quota errors as google.api_core ResourceExhausted (HTTP 429)"""
+    return getattr(e, "code", None) == 429 or type(e).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+# ---------------- Input Validation ----------------
+# Request schemas (validation.Schema) are declared next to their routes and compiled at import
+MAX_REPORTED_ERRORS = 100
+
+def invalid_input(e):
+    """400 for a validation.ValidationError, with the structured per-field / per-row errors"""
+    return jsonify({"error": str(e), "errors": e.errors[:MAX_REPORTED_ERRORS]}), 400
+
 # ---------------- Crop Recommendation ----------------
-MODEL_DIR = os.path.join(os.path.dirname(__file__), "models", "crop_recommendation")
-MODEL_PATH = os.path.join(MODEL_DIR, "rf_model.pkl")
-ENCODER_PATH = os.path.join(MODEL_DIR, "label_encoder.pkl")
+# Serving model version (data/models/CURRENT, else the shipped model); hot-swapped after retraining
+crop_models = crop_model.ModelRegistry()
+# Shadow-scores and canary-routes /predict traffic when a candidate version is configured
+crop_router = crop_canary.CandidateRouter(crop_models)
+MAX_TOP_K = 10
+
+FEATURE_FIELDS = [name for name, _, _ in validation.SOIL_RANGES]
 
-model = joblib.load(MODEL_PATH)
-label_encoder = joblib.load(ENCODER_PATH)
+PREDICT_SCHEMA = validation.Schema({
+    **validation.soil_fields(FEATURE_FIELDS),
+    "top_k": validation.Field("int", default=3, min_val=1, max_val=MAX_TOP_K),
+    "include_prices": validation.Field("bool", default=False),
+    "state": validation.Field("str", max_length=100),
+})
+EXPLAIN_SCHEMA = validation.Schema(validation.soil_fields(FEATURE_FIELDS))
+EXPLAIN_OPTIONS = validation.Schema({"top_k": validation.Field("int", default=1, min_val=1, max_val=MAX_TOP_K)})
+
+def crop_features(data):
+    """Validated /predict fields -> one model input row"""
+    return np.array([[data[f] for f in FEATURE_FIELDS]])
+
+def predict_crop(features):
+    return rank_crops(features, 1)[0][0]
+
+def rank_crops(features, k=3, bundle=None):
+    """Top-k crops with calibrated probabilities from a single predict_proba pass"""
+    bundle = bundle or crop_models.current()
+    with metrics.span("model_predict"):
+        proba = bundle.predict_proba(features)
+    with metrics.span("label_decode"):
+        return crop_ranking.top_k(proba, bundle.classes, k)[0]
+
+def recommend(data):
+    """/predict response body; "top_k" and "include_prices" (optionally scoped to "state") are optional"""
+    data = PREDICT_SCHEMA.check(data)
+    k = data["top_k"]
+    features = crop_features(data)
+    bundle, role = crop_router.choose()
+    t0 = time.perf_counter()
+    ranked = rank_crops(features, k, bundle)
+    if role == "primary":
+        crop_router.shadow(features, ranked[0][0], time.perf_counter() - t0)
+    trends = None
+    if data["include_prices"]:
+        with metrics.span("price_enrich"):
+            trends = price_store.commodity_trends(data.get("state"))
+    recommendations = crop_ranking.ranked_items(ranked, trends)
+    return {
+        "recommended_crop": ranked[0][0],
+        "confidence": recommendations[0]["probability"],
+        "recommendations": recommendations,
+        "model_version": bundle.version,
+    }
 
 @app.route("/predict", methods=["POST"])
 def predict():
     try:
-        data = request.json
-        features = np.array([[ 
-            data.get("nitrogen", 0),
-            data.get("phosphorous", 0),
-            data.get("potassium", 0),
-            data.get("temperature", 0),
-            data.get("humidity", 0),
-            data.get("ph", 0),
-            data.get("rainfall", 0),
-        ]])
-        prediction_num = model.predict(features)[0]
-        prediction_label = label_encoder.inverse_transform([prediction_num])[0]
-        return jsonify({"recommended_crop": prediction_label})
+        data = request.get_json(silent=True)
+        return jsonify(recommend(data))
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+MAX_EXPLAIN_ROWS = 1000
+
+@app.route("/explain", methods=["POST"])
+def explain():
+    """
+    Per-feature contributions behind a recommendation. Body: the /predict fields, or
+    {"samples": [...]} for a batch; optional "top_k" or "crops" to explain named crops instead.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get("samples") if "samples" in data else [data]
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "No samples to explain"}), 400
+        if len(items) > MAX_EXPLAIN_ROWS:
+            return jsonify({"error": f"At most {MAX_EXPLAIN_ROWS} samples per request"}), 413
+        columns = EXPLAIN_SCHEMA.check_batch(items)
+        features = np.column_stack([columns[f] for f in FEATURE_FIELDS])
+        top_k = EXPLAIN_OPTIONS.check(data)["top_k"]
+        crops = data.get("crops")
+        if isinstance(crops, str):
+            crops = [crops]
+        bundle = crop_models.current()
+        with metrics.span("model_explain"):
+            explanations = crop_explain.explain(bundle, features, FEATURE_FIELDS, crops, top_k)
+        body = {"model_version": bundle.version}
+        if "samples" in data:
+            body["explanations"] = explanations
+        else:
+            body["explanation"] = explanations[0]
+        return jsonify(body)
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -70,7 +206,65 @@ Return ONLY valid JSON (no markdown). Schema:
 }
 """
 
-import re
+DISEASE_MODEL_ID = "gemini-1.5-flash"
+
+def reencode_jpeg(stream):
+    with metrics.span("image_decode"):
+        img = Image.open(stream).convert("RGB")
+    with metrics.span("image_encode"):
+        buf = BytesIO()
+        img.save(buf, format="JPEG", quality=92)
+        return buf.getvalue()
+
+def parse_disease_text(text):
+    # 🔹 Try to extract JSON substring (between first { and last })
+    json_str = None
+    if "{" in text and "}" in text:
+        json_str = text[text.find("{"): text.rfind("}")+1]
+
+    parsed = None
+    if json_str:
+        try:
+            parsed = json.loads(json_str)
+        except Exception:
+            pass
+
+    if not parsed:
+        parsed = {
+            "disease": "Unknown",
+            "confidence": 0.0,
+            "severity": "none",
+            "advice": text[:200],  # fallback: raw text preview
+            "precautions": ""
+        }
+    return parsed
+
+# A mandi further than this from the upload location says nothing about its district
+MAX_REGION_KM = config.get("DISEASE_REGION_MAX_KM", 50)
+
+def detection_region(form):
+    """
+    (state, district, lat, lon) sent with an upload. A missing district falls back to the
+    nearest mandi's (within MAX_REGION_KM), but only when that mandi is in the state sent.
+    """
+    state, district = form.get("state"), form.get("district")
+    lat, lon = disease_store.coarse(form.get("lat"), form.get("lon"))
+    if lat is not None and not district:
+        found = market_index.nearest(float(form["lat"]), float(form["lon"]), 1, max_km=MAX_REGION_KM)
+        if found:
+            market = found[0][0]
+            state = state or market["state"]
+            if market["state"].strip().lower() == state.strip().lower():
+                district = market["district"]
+    return state, district, lat, lon
+
+def record_detection(result, form):
+    """Keep the result for /disease_trends; never fails the diagnosis itself"""
+    try:
+        state, district, lat, lon = detection_region(form)
+        disease_store.record(result, state, district, lat, lon)
+    except Exception as e:
+        app.logger.warning(f"Could not record detection: {e}")
 
 @app.route("/detect_disease", methods=["POST"])
 def detect_disease():
@@ -78,107 +272,128 @@ def detect_disease():
         if "image" not in request.files:
             return jsonify({"error": "No image uploaded"}), 400
 
-        file = request.files["image"]
-        img = Image.open(file.stream)
-        buf = BytesIO()
-        img.convert("RGB").save(buf, format="JPEG", quality=92)
-        image_bytes = buf.getvalue()
+        image_bytes = reencode_jpeg(request.files["image"].stream)
 
-        model_g = genai.GenerativeModel("gemini-1.5-flash")
-        resp = model_g.generate_content(
-            [DISEASE_PROMPT, {"mime_type": "image/jpeg", "data": image_bytes}]
-        )
+        gemini_quota = quota_manager["gemini"]
+        gemini_quota.acquire(quota.request_priority(request.headers))
+        model_g = genai.GenerativeModel(DISEASE_MODEL_ID)
+        try:
+            with metrics.span("gemini_call"):
+                resp = model_g.generate_content(
+                    [DISEASE_PROMPT, {"mime_type": "image/jpeg", "data": image_bytes}]
+                )
+        except Exception as e:
+            if is_rate_limit_error(e):
+                gemini_quota.report(429)
+                return upstream_busy()
+            raise
+        gemini_quota.report(200)
 
         text = getattr(resp, "text", "") or ""
+        result = parse_disease_text(text)
+        record_detection(result, request.form)
+        return jsonify(result)
 
-        # 🔹 Try to extract JSON substring (between first { and last })
-        json_str = None
-        if "{" in text and "}" in text:
-            json_str = text[text.find("{"): text.rfind("}")+1]
-
-        parsed = None
-        if json_str:
-            try:
-                parsed = json.loads(json_str)
-            except Exception:
-                pass
-
-        if not parsed:
-            parsed = {
-                "disease": "Unknown",
-                "confidence": 0.0,
-                "severity": "none",
-                "advice": text[:200],  # fallback: raw text preview
-                "precautions": ""
-            }
+    except quota.QuotaExceeded as e:
+        return quota_exceeded(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(parsed)
 
+@app.route("/disease_trends", methods=["GET"])
+def disease_trends():
+    """Detections per district x disease over ?window=7|14|30 days; filters: state, district, disease"""
+    try:
+        try:
+            window = int(request.args.get("window", 7))
+            limit = min(max(int(request.args.get("limit", 50)), 1), 500)
+        except ValueError:
+            return jsonify({"error": "window and limit must be integers"}), 400
+        rows = disease_store.trends(window, request.args.get("state"), request.args.get("district"),
+                                    request.args.get("disease"), limit=limit)
+        return jsonify({"window": window, "trends": rows})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-
 # ---------------- Crop Prices ----------------
-@app.route("/get_price", methods=["GET"])
-def get_price():
-    try:
-        state = request.args.get("state")
-        commodity = request.args.get("commodity")
-        market = request.args.get("market")
-        filter_type = request.args.get("filter", "all")  # today | 7days | 15days | all
-        limit = request.args.get("limit", 2000)
-
-        params = {
-            "api-key": PRICING_API_KEY,
-            "format": "json",
-            "limit": limit,
-            "sort[Arrival_Date]": "desc"
-        }
-        if commodity:
-            params["filters[Commodity]"] = commodity
-        if state:
-            params["filters[State]"] = state
-        if market:
-            params["filters[Market]"] = market
+# One pooled, quota-gated client for every data.gov.in call made by this process
+price_api = price_client.PriceClient(PRICING_API_KEY, PRICING_BASE_URL or price_client.DEFAULT_URL, timeout=20,
+                                     quota=quota_manager["datagov"])
 
-        resp = requests.get(PRICING_BASE_URL, params=params, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
+MAX_PRICE_LIMIT = 10000
+PRICE_QUERY = validation.Schema({
+    "commodity": validation.Field("str", max_length=100),
+    "state": validation.Field("str", max_length=100),
+    "market": validation.Field("str", max_length=100),
+    "filter": validation.Field("str", default="all", choices=("today", "7days", "15days", "all")),
+    "limit": validation.Field("int", default=2000, min_val=1, max_val=MAX_PRICE_LIMIT),
+    "include_quarantined": validation.Field("bool", default=False),
+})
 
-        if "records" not in data or not data["records"]:
-            return jsonify({"error": "No records found"}), 404
+def price_filters(query):
+    return price_client.filters(query["commodity"], query["state"], query["market"])
 
-        records = data["records"]
+def price_params(query):
+    """data.gov.in query parameters for a validated /get_price query"""
+    return price_api.params(price_filters(query), limit=query["limit"])
 
-        def parse_date(d):
-            try:
-                return datetime.strptime(d, "%d/%m/%Y")
-            except:
-                return None
-
-        today = datetime.now().date()
-        cutoff_7 = datetime.now() - timedelta(days=7)
-        cutoff_15 = datetime.now() - timedelta(days=15)
-
-        filtered = []
-        for r in records:
-            d = parse_date(r.get("Arrival_Date", ""))
-            if not d:
-                continue
-            if filter_type == "today" and d.date() != today:
-                continue
-            if filter_type == "7days" and d < cutoff_7:
-                continue
-            if filter_type == "15days" and d < cutoff_15:
-                continue
-            filtered.append(r)
+# Upstream pages behind /get_price are reused briefly, so polling clients share one fetch
+price_pages = price_client.PageCache(ttl=config.get("PRICE_CACHE_SECONDS", 60))
+
+def price_page_key(query):
+    return tuple(sorted(price_filters(query).items())), query["limit"]
+
+def price_snapshot_version(args):
+    """Snapshot behind a /get_price response; the date is part of it because filter=today etc. move daily"""
+    query, errors = PRICE_QUERY.validate(args)
+    if errors:
+        return None
+    version = price_pages.version(price_page_key(query))
+    return f"{version}:{datetime.now().date()}:{price_anomaly.revision()}" if version else None
+
+def format_price_records(records, filter_type, include_quarantined=False):
+    """
+    Apply the date filter and reshape raw records; returns (rows, error message).
+    Prices the anomaly detector flagged carry "anomaly"; quarantined ones are dropped unless asked for.
+    """
+    if not records:
+        return None, "No records found"
 
-        if not filtered:
-            return jsonify({"error": "No records match filter"}), 404
+    def parse_date(d):
+        try:
+            return datetime.strptime(d, "%d/%m/%Y")
+        except:
+            return None
 
+    today = datetime.now().date()
+    cutoff_7 = datetime.now() - timedelta(days=7)
+    cutoff_15 = datetime.now() - timedelta(days=15)
+
+    filtered = []
+    for r in records:
+        d = parse_date(r.get("Arrival_Date", ""))
+        if not d:
+            continue
+        if filter_type == "today" and d.date() != today:
+            continue
+        if filter_type == "7days" and d < cutoff_7:
+            continue
+        if filter_type == "15days" and d < cutoff_15:
+            continue
+        filtered.append(r)
+
+    if not filtered:
+        return None, "No records match filter"
+
+    flagged = price_anomaly.flags()
+    with metrics.span("dataframe_build"):
         df = pd.DataFrame(filtered)
         cols = ['Arrival_Date','State','District','Market','Commodity',
                 'Min_Price','Max_Price','Modal_Price']
+        if flagged:
+            cols.append('Variety')  # alerts are per variety; only used for the lookup below
         df = df[[c for c in cols if c in df.columns]]
 
         df['Arrival_Date'] = pd.to_datetime(df['Arrival_Date'], format='%d/%m/%Y', errors='coerce')
@@ -196,11 +411,359 @@ def get_price():
             "Modal_Price": "modal_price",
         }).to_dict(orient="records")
 
-        return jsonify(formatted)
+    if flagged:
+        kept = []
+        for row in formatted:
+            variety = str(row.pop("Variety", "") or "").lower()
+            status = flagged.get((row["arrival_date"], str(row.get("state", "")).lower(),
+                                  str(row.get("market", "")).lower(), str(row.get("commodity", "")).lower(),
+                                  variety, price_client.parse_price(row.get("modal_price"))))
+            if status == "quarantined" and not include_quarantined:
+                continue
+            if status:
+                row["anomaly"] = status
+            kept.append(row)
+        if not kept:
+            return None, "No records match filter"
+        formatted = kept
+    return formatted, None
+
+@app.route("/get_price", methods=["GET"])
+@http_cache.conditional(lambda: price_snapshot_version(request.args), max_age=60, stale_while_revalidate=30)
+def get_price():
+    try:
+        query = PRICE_QUERY.check(request.args)
+
+        key = price_page_key(query)
+        page = price_pages.get(key)
+        if page is None:
+            resp = price_api.get_page(price_filters(query), limit=query["limit"],
+                                      priority=quota.request_priority(request.headers))
+            if resp.status_code in (429, 503):
+                return upstream_busy(resp.headers.get("Retry-After"))
+            resp.raise_for_status()
+            page = price_pages.put(key, resp.json())
+
+        formatted, error = format_price_records(page.records, query["filter"], query["include_quarantined"])
+        if error:
+            return jsonify({"error": error}), 404
+        with metrics.span("json_serialize"):
+            return jsonify(formatted)
+
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except quota.QuotaExceeded as e:
+        return quota_exceeded(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ---------------- Bulk Price Export ----------------
+EXPORT_CHUNK_ROWS = 5000
+# Encoded CSV size per (store version, query), so a Range request doesn't render the export twice
+export_lengths = price_store.LRUCache()
+
+@app.route("/export_prices", methods=["GET"])
+def export_prices():
+    """
+    Stream prices as CSV or Parquet from the local store (default) or straight from
+    upstream pages (source=upstream). CSV from the store supports byte ranges so an
+    interrupted download can resume; gzip is used when the client accepts it.
+    """
+    try:
+        commodity = request.args.get("commodity")
+        state = request.args.get("state")
+        market = request.args.get("market")
+        start = request.args.get("start")  # YYYY-MM-DD, inclusive
+        end = request.args.get("end")
+        fmt = request.args.get("format", "csv").lower()
+        source = request.args.get("source", "store").lower()
+
+        for d in (start, end):
+            if d:
+                try:
+                    datetime.strptime(d, "%Y-%m-%d")
+                except ValueError:
+                    return jsonify({"error": f"Invalid date '{d}', expected YYYY-MM-DD"}), 400
+        if fmt not in ("csv", "parquet"):
+            return jsonify({"error": "format must be csv or parquet"}), 400
+        if source not in ("store", "upstream"):
+            return jsonify({"error": "source must be store or upstream"}), 400
+        if fmt == "parquet" and price_export.pq is None:
+            return jsonify({"error": "Parquet export requires pyarrow on the server"}), 501
+
+        def chunks():
+            if source == "upstream":
+                pages = price_api.iter_pages(price_client.filters(commodity, state, market),
+                                             page_size=EXPORT_CHUNK_ROWS)
+                return price_export.upstream_chunks(pages, start, end)
+            return price_store.iter_rows(commodity, state, market, start, end, EXPORT_CHUNK_ROWS)
+
+        use_gzip = ("gzip" in request.headers.get("Accept-Encoding", "").lower()
+                    or request.args.get("compress") == "gzip")
+        filename = f"prices_{(commodity or 'all').replace(' ', '_').lower()}.{fmt}"
+        headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+        if fmt == "parquet":
+            body = price_export.parquet_stream(chunks(), compression="gzip" if use_gzip else "snappy")
+            return Response(body, mimetype="application/vnd.apache.parquet", headers=headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(price_export.gzip_stream(price_export.csv_stream(chunks())),
+                            mimetype="text/csv", headers=headers)
+
+        if source == "upstream":
+            return Response(price_export.csv_stream(chunks()), mimetype="text/csv", headers=headers)
+
+        # Identity CSV from the store is byte-stable for a given store version,
+        # so it can carry an ETag and serve Range requests for resumable downloads.
+        query = "|".join(str(v) for v in (commodity, state, market, start, end))
+        version = price_store.version()
+        etag = f'"{version}-{zlib.crc32(query.encode()):08x}"'
+        headers.update({"ETag": etag, "Accept-Ranges": "bytes"})
+        length_key = (version, query)
+        byte_range = price_export.parse_range(request.headers.get("Range"))
+        if_range = request.headers.get("If-Range")
+        if byte_range and (not if_range or if_range == etag):
+            total = export_lengths.get(length_key)
+            if total is None:  # first ranged request for this export: measure it once
+                total = price_export.stream_length(price_export.csv_stream(chunks()))
+                export_lengths.put(length_key, total)
+            first, last = byte_range
+            if first >= total:
+                return Response(status=416, headers={"Content-Range": f"bytes */{total}"})
+            last = total - 1 if last is None else min(last, total - 1)
+            headers["Content-Range"] = f"bytes {first}-{last}/{total}"
+            headers["Content-Length"] = str(last - first + 1)
+            body = price_export.byte_slice(price_export.csv_stream(chunks()), first, last)
+            return Response(body, status=206, mimetype="text/csv", headers=headers)
+
+        body = price_export.counted(price_export.csv_stream(chunks()),
+                                    lambda total: export_lengths.put(length_key, total))
+        return Response(body, mimetype="text/csv", headers=headers)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ---------------- Price Delta Sync ----------------
+MAX_SYNC_ROWS = 20000
+
+@app.route("/sync/prices", methods=["GET"])
+def sync_prices():
+    """
+    Rows changed since the client's watermark: ?since=<version>[&cursor=...][&limit=N]
+    [&format=json|columnar|msgpack][&commodity=&state=&market=]. Keep "version" from the
+    page with "complete": true as the next watermark; follow "next_cursor" until then.
+    """
+    try:
+        try:
+            since = max(int(request.args.get("since", 0)), 0)
+            limit = min(max(int(request.args.get("limit", 5000)), 1), MAX_SYNC_ROWS)
+        except ValueError:
+            return jsonify({"error": "since and limit must be integers"}), 400
+        cursor = request.args.get("cursor")
+        fmt = request.args.get("format", "columnar").lower()
+        commodity, state, market = (request.args.get(k) for k in ("commodity", "state", "market"))
+        if fmt not in price_sync.FORMATS:
+            return jsonify({"error": f"format must be one of {', '.join(price_sync.FORMATS)}"}), 400
+        if fmt == "msgpack" and price_sync.msgpack is None:
+            return jsonify({"error": "MessagePack sync requires msgpack on the server"}), 501
+
+        use_gzip = "gzip" in request.headers.get("Accept-Encoding", "").lower()
+        tag = price_sync.etag(price_store.version(), since, cursor, limit, fmt, commodity, state, market, use_gzip)
+        headers = {"ETag": tag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+        if request.if_none_match.contains_raw(tag):
+            return Response(status=304, headers=headers)
+
+        try:
+            page = price_sync.delta(since, limit, cursor, commodity, state, market)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        with metrics.span("json_serialize"):
+            body = price_sync.encode(page, fmt)
+        if use_gzip:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        return Response(body, content_type=price_sync.FORMATS[fmt], headers=headers)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ---------------- Nearby Market Prices ----------------
+MARKET_LOCATIONS_PATH = config.get("MARKET_LOCATIONS_PATH") or market_geo.DEFAULT_LOCATIONS_PATH
+market_index = market_geo.MarketIndex.from_csv(MARKET_LOCATIONS_PATH)
+
+NEARBY_QUERY = validation.Schema({
+    "commodity": validation.Field("str", required=True, max_length=100),
+    "lat": validation.Field("float", required=True, min_val=-90, max_val=90),
+    "lon": validation.Field("float", required=True, min_val=-180, max_val=180),
+    "k": validation.Field("int", default=5, min_val=1, max_val=50),
+    "max_km": validation.Field("float", min_val=0),
+    "sort": validation.Field("str", default="distance", choices=("distance", "price")),
+})
+
+@app.route("/nearby_prices", methods=["GET"])
+def nearby_prices():
+    try:
+        query = NEARBY_QUERY.check(request.args)
+        latest = price_store.latest_by_market(query["commodity"])
+        results = market_geo.nearby_prices(market_index, latest, query["lat"], query["lon"], query["k"],
+                                           query["max_km"], query["sort"])
+        if not results:
+            return jsonify({"error": "No nearby market prices found"}), 404
+        return jsonify(results)
+
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ---------------- Price Map ----------------
+state_price_map = price_map.StatePriceMap.from_geojson(config.get("MAP_STATES_PATH") or price_map.DEFAULT_STATES_PATH)
+
+@app.route("/map/prices", methods=["GET"])
+@http_cache.conditional(lambda: price_store.version(), max_age=300)
+def map_prices():
+    """Per-state aggregates for one commodity, keyed by the state ids of india-states-simplified.json"""
+    try:
+        commodity = request.args.get("commodity", "").strip()
+        if not commodity:
+            return jsonify({"error": "commodity is required"}), 400
+        _, body = state_price_map.payload(commodity)
+        return Response(body, content_type="application/json")
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ---------------- Price Alerts ----------------
+MAX_ALERTS = 500
+
+@app.route("/alerts", methods=["GET"])
+@http_cache.conditional(lambda: price_anomaly.revision(), max_age=60)
+def price_alerts():
+    """
+    Anomalous modal prices found while syncing. ?after=<id> polls for newer alerts (ascending);
+    without it the newest come first. Filters: status, commodity, state, market.
+    """
+    try:
+        try:
+            after = request.args.get("after")
+            after = int(after) if after is not None else None
+            limit = min(max(int(request.args.get("limit", 100)), 1), MAX_ALERTS)
+        except ValueError:
+            return jsonify({"error": "after and limit must be integers"}), 400
+        status = request.args.get("status")
+        if status and status not in price_anomaly.STATUSES:
+            return jsonify({"error": f"status must be one of {', '.join(price_anomaly.STATUSES)}"}), 400
+        alerts = price_anomaly.list_alerts(after, limit, status, request.args.get("commodity"),
+                                           request.args.get("state"), request.args.get("market"))
+        last_id = max((a["id"] for a in alerts), default=after)
+        return jsonify({"alerts": alerts, "next_after": last_id})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/admin/alerts/<int:alert_id>", methods=["POST"])
+def update_price_alert(alert_id):
+    """{"status": "released"} shows a quarantined price again; "confirmed" / "quarantined" likewise"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        status = (request.get_json(silent=True) or {}).get("status")
+        if not price_anomaly.set_status(alert_id, status):
+            return jsonify({"error": "No such alert"}), 404
+        return jsonify({"id": alert_id, "status": status})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ---------------- Equipment Rental ----------------
+bookings = equipment_store.BookingStore(config.get("EQUIPMENT_DB_PATH"))
+
+def rental_window(args):
+    """(start, end) epoch seconds from ISO "start"/"end"; raises ValueError"""
+    start, end = equipment_store.parse_time(args["start"]), equipment_store.parse_time(args["end"])
+    if end <= start:
+        raise ValueError("end must be after start")
+    return start, end
+
+@app.route("/equipment", methods=["POST"])
+def add_equipment():
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            owner, title = str(data["owner"]).strip(), str(data["title"]).strip()
+            lat, lon = float(data["lat"]), float(data["lon"])
+            rate = float(data["daily_rate"]) if data.get("daily_rate") is not None else None
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "owner, title, lat and lon are required (daily_rate numeric)"}), 400
+        if not owner or not title:
+            return jsonify({"error": "owner and title are required"}), 400
+        item = bookings.add_equipment(owner, title, lat, lon, data.get("category") or "", rate,
+                                      data.get("location") or "")
+        return jsonify(item), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/equipment/search", methods=["GET"])
+def search_equipment():
+    """Equipment free for the whole ?start=&end= window near ?lat=&lon= (radius_km, category, limit)"""
+    try:
+        try:
+            lat, lon = float(request.args["lat"]), float(request.args["lon"])
+            start, end = rental_window(request.args)
+            radius_km = min(max(float(request.args.get("radius_km", 50)), 1), 500)
+            limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+        except (KeyError, ValueError):
+            return jsonify({"error": "lat, lon, start and end are required (ISO dates, end after start)"}), 400
+        return jsonify(bookings.search(lat, lon, start, end, radius_km, request.args.get("category"), limit))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/equipment/<int:equipment_id>/availability", methods=["GET"])
+def equipment_availability(equipment_id):
+    """Booked intervals of one item within ?start=&end="""
+    try:
+        try:
+            start, end = rental_window(request.args)
+        except (KeyError, ValueError):
+            return jsonify({"error": "start and end are required (ISO dates, end after start)"}), 400
+        return jsonify({"equipment_id": equipment_id, "booked": bookings.availability(equipment_id, start, end)})
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/equipment/<int:equipment_id>/bookings", methods=["POST"])
+def book_equipment(equipment_id):
+    """{"renter", "start", "end"}; 409 when the window overlaps an existing booking"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            renter = str(data["renter"]).strip()
+            start, end = rental_window(data)
+        except (KeyError, ValueError):
+            return jsonify({"error": "renter, start and end are required (ISO dates, end after start)"}), 400
+        return jsonify(bookings.reserve(equipment_id, renter, start, end)), 201
+    except equipment_store.BookingConflict as e:
+        return jsonify({"error": str(e), "conflicting_booking": e.booking_id}), 409
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/bookings/<int:booking_id>", methods=["DELETE"])
+def cancel_booking(booking_id):
+    try:
+        if not bookings.cancel(booking_id):
+            return jsonify({"error": "No such confirmed booking"}), 404
+        return jsonify({"id": booking_id, "status": "cancelled"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ---------------- Price Prediction ----------------
 @app.route("/predict_price", methods=["POST"])
 def predict_price():
@@ -246,60 +809,282 @@ def predict_price():
         return jsonify({"error": str(e)}), 500
 
 # ---------------- Schemes ----------------
-SCHEMES = [
-    {"code": "PMKISAN", "name": "PM-KISAN Samman Nidhi", "description": "Income support ₹6,000/year", "url": "https://pmkisan.gov.in/"},
-    {"code": "PMFBY", "name": "Pradhan Mantri Fasal Bima Yojana", "description": "Crop insurance scheme", "url": "https://pmfby.gov.in/"},
-    {"code": "AIF", "name": "Agri Infrastructure Fund", "description": "Infra projects financing", "url": "https://www.agriinfra.dac.gov.in/"},
-    {"code": "KCC", "name": "Kisan Credit Card", "description": "Easy credit access", "url": "https://www.myscheme.gov.in/schemes/kcc"},
-    {"code": "ENAM", "name": "e-NAM", "description": "National Agriculture Market", "url": "https://www.enam.gov.in/web/"},
-]
+SCHEMES_PATH = config.get("SCHEMES_PATH") or schemes_engine.DEFAULT_SCHEMES_PATH
+scheme_engine = schemes_engine.SchemeEngine.load(SCHEMES_PATH)
+SCHEMES = scheme_engine.schemes
+
+def parse_profile(args):
+    return validation.PROFILE_SCHEMA.check(args)
 
 @app.route("/find_schemes", methods=["GET"])
+@http_cache.conditional(lambda: scheme_engine.version, max_age=3600)
 def find_schemes():
     try:
-        land = float(request.args.get("land", 0))
-        income = float(request.args.get("income", 0))
-        age = int(request.args.get("age", 0))
-        state = request.args.get("state")
-        is_woman = request.args.get("is_woman", "false").lower() == "true"
-        is_scst = request.args.get("is_scst", "false").lower() == "true"
-        is_tenant = request.args.get("is_tenant", "false").lower() == "true"
-        has_bank = request.args.get("has_bank", "true").lower() == "true"
+        return jsonify(scheme_engine.match_one(parse_profile(request.args)))
 
-        recs = []
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        if land > 0 and has_bank:
-            recs.append({"code": "PMKISAN", "reason": "Landholding detected + bank account"})
+@app.route("/find_schemes/batch", methods=["POST"])
+def find_schemes_batch():
+    """
+    Score many profiles in one call: a CSV upload ("file"), a text/csv body, or
+    JSON {"profiles": [...]}. Returns matching scheme codes per profile plus the
+    catalog entries referenced, so scheme details are not repeated per row.
+    """
+    try:
+        if "file" in request.files or request.mimetype == "text/csv":
+            source = request.files["file"].stream if "file" in request.files else BytesIO(request.get_data())
+            cols, errors = validation.PROFILE_SCHEMA.validate_frame(pd.read_csv(source))
+            if errors:
+                raise validation.ValidationError(errors)
+        else:
+            profiles = (request.get_json(silent=True) or {}).get("profiles")
+            if not isinstance(profiles, list):
+                return jsonify({"error": "Send a CSV file or JSON {\"profiles\": [...]}"}), 400
+            cols = validation.PROFILE_SCHEMA.check_batch(profiles)
+
+        codes, notes = scheme_engine.match_codes(cols)
+        note_texts = [n["text"] for n in scheme_engine.notes]
+        used = sorted({c for row in codes for c in row})
+        return jsonify({
+            "count": len(codes),
+            "results": [
+                {"schemes": row, "notes": [note_texts[j] for j in np.flatnonzero(note_row)]}
+                for row, note_row in zip(codes, notes)
+            ],
+            "catalog": {c: scheme_engine.catalog[c] for c in used},
+        })
 
-        if land > 0 or is_tenant:
-            recs.append({"code": "PMFBY", "reason": "Crop insurance covers risks"})
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        if has_bank:
-            recs.append({"code": "KCC", "reason": "Kisan Credit Card can provide flexible credit"})
+@app.route("/screen_schemes", methods=["POST"])
+def screen_schemes_upload():
+    """Screen an uploaded register CSV ("file") and stream it back with eligibility columns"""
+    try:
+        if "file" not in request.files:
+            return jsonify({"error": "No CSV uploaded"}), 400
+        chunksize = min(max(int(request.args.get("chunksize", 50000)), 1000), 500000)
+        # Flask closes uploads when the view returns, so keep our own (disk-spooled) copy
+        upload = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        shutil.copyfileobj(request.files["file"].stream, upload)
+        upload.seek(0)
+        # Check the whole register before streaming, so bad cells get a 400 rather than a truncated CSV
+        errors = screen_schemes.validate_csv(upload, chunksize, MAX_REPORTED_ERRORS)
+        if errors:
+            upload.close()
+            raise validation.ValidationError(errors)
+        upload.seek(0)
+        stats = screen_schemes.ScreeningStats()
 
-        if land >= 1 or income >= 200000:
-            recs.append({"code": "AIF", "reason": "Eligible for infra financing"})
+        def generate():
+            try:
+                yield from screen_schemes.screen_csv(upload, scheme_engine, chunksize, stats)
+            finally:
+                upload.close()
+            s = stats.as_dict()
+            app.logger.info(f"Screened {s['profiles']} profiles in {s['seconds']} s "
+                            f"({s['profiles_per_second']} profiles/s)")
 
-        recs.append({"code": "ENAM", "reason": "Better market access via e-NAM"})
+        return Response(generate(), mimetype="text/csv",
+                        headers={"Content-Disposition": "attachment; filename=screened_profiles.csv"})
 
-        results = []
-        for r in recs:
-            scheme = next((s for s in SCHEMES if s["code"] == r["code"]), None)
-            if scheme:
-                results.append({**scheme, "reason": r["reason"]})
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        notes = []
-        if is_woman:
-            notes.append("Women farmers may receive priority/extra benefits.")
-        if is_scst:
-            notes.append("SC/ST beneficiaries often get relaxed criteria or higher benefits.")
-        if age > 0 and age < 18:
-            notes.append("Some schemes may require guardian co-applicant if under 18.")
+# ---------------- Metrics ----------------
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
-        return jsonify({"schemes": results, "notes": notes})
+# ---------------- Profiling ----------------
+request_profiler = profiling.RequestProfiler(
+    config.get("PROFILING_TOKEN"),
+    config.get("PROFILE_DIR") or profiling.DEFAULT_PROFILE_DIR,
+    config.get("PROFILING_SAMPLE_RATE", 0.0),
+    config.get("PROFILING_ROUTES", ["/get_price", "/detect_disease"]),
+)
+profiling.init_app(app, request_profiler)
+stack_sampler = profiling.StackSampler(config.get("PROFILING_SAMPLER_INTERVAL_MS", 5) / 1000.0)
 
+@app.route("/admin/profiling/sampler", methods=["GET", "POST", "DELETE"])
+def profiling_sampler():
+    """POST ?seconds=N starts sampling, GET downloads folded stacks (?format=json for status), DELETE stops and clears"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        if request.method == "POST":
+            if request.args.get("reset", "false").lower() == "true":
+                stack_sampler.reset()
+            stack_sampler.start(min(float(request.args.get("seconds", 30)), 3600))
+            return jsonify(stack_sampler.status())
+        if request.method == "DELETE":
+            stack_sampler.stop()
+            stack_sampler.reset()
+            return jsonify(stack_sampler.status())
+        if request.args.get("format") == "json":
+            return jsonify(stack_sampler.status())
+        return Response(stack_sampler.folded(), mimetype="text/plain",
+                        headers={"Content-Disposition": "attachment; filename=profile.folded"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/admin/profiling/profiles", methods=["GET"])
+def profiling_profiles():
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(request_profiler.list_profiles())
+
+@app.route("/admin/profiling/profiles/<profile_id>", methods=["GET"])
+def profiling_profile(profile_id):
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    path = request_profiler.path_for(profile_id)
+    if not path:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, as_attachment=True, download_name=f"{profile_id}.prof")
+
+# ---------------- Crop Model Updates ----------------
+retrain_job = crop_model.RetrainJob()
+FEEDBACK_FIELDS = dict(zip(FEATURE_FIELDS, crop_model.FEATURES))
+MAX_FEEDBACK_SAMPLES = 1000
+FEEDBACK_SCHEMA = validation.Schema({
+    **validation.soil_fields(FEATURE_FIELDS),
+    "crop": validation.Field("str", required=True, max_length=100),
+    "predicted": validation.Field("str", max_length=100),
+    "model_version": validation.Field("str", max_length=100),
+})
+
+def feedback_samples(items):
+    """API field names -> feedback rows; raises validation.ValidationError naming the bad rows"""
+    columns = FEEDBACK_SCHEMA.check_batch(items)
+    features = {column: columns[field].tolist() for field, column in FEEDBACK_FIELDS.items()}
+    return [
+        {**{column: values[i] for column, values in features.items()}, "label": columns["crop"][i],
+         "predicted": columns["predicted"][i], "model_version": columns["model_version"][i]}
+        for i in range(len(items))
+    ]
+
+def unknown_labels(samples):
+    """Errors for samples whose crop the serving model doesn't know"""
+    known = set(crop_models.current().encoder.classes_)
+    return [{"row": i, "field": "crop", "error": "is not a crop the model knows"}
+            for i, s in enumerate(samples) if s["label"].strip().lower() not in known]
+
+@app.route("/feedback", methods=["POST"])
+def feedback():
+    """
+    One report ({...features, "crop": what grew well}) or {"samples": [...]}. Crops must be
+    ones the model already knows; admins may pass ?allow_new_labels=true to add new ones.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get("samples") if "samples" in data else [data]
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "No feedback samples"}), 400
+        if len(items) > MAX_FEEDBACK_SAMPLES:
+            return jsonify({"error": f"At most {MAX_FEEDBACK_SAMPLES} samples per request"}), 413
+        samples = feedback_samples(items)
+        if request.args.get("allow_new_labels", "false").lower() == "true":
+            if not admin_authorized():
+                return jsonify({"error": "Forbidden"}), 403
+        else:
+            errors = unknown_labels(samples)
+            if errors:
+                raise validation.ValidationError(errors)
+        return jsonify({"stored": crop_model.add_feedback(samples)}), 201
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/model/versions", methods=["GET"])
+def model_versions():
+    """Known versions with their evaluation accuracy and latency, plus the one this worker serves"""
+    try:
+        return jsonify({
+            "serving": crop_models.current().version,
+            "current": crop_model.current_version(),
+            "versions": crop_model.list_versions(),
+            "feedback": crop_model.feedback_stats(),
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+RETRAIN_QUERY = validation.Schema({
+    "method": validation.Field("str", default="warm_start", choices=("warm_start", "full")),
+    "extra_trees": validation.Field("int", default=25, min_val=1, max_val=500),
+    "activate": validation.Field("bool", default=True),
+})
+
+@app.route("/admin/model/retrain", methods=["GET", "POST"])
+def model_retrain():
+    """
+    POST starts a background retrain (method=warm_start|full, extra_trees=N), GET shows its state.
+    The new version is activated only if it scores no worse than its parent; otherwise it is
+    left for a trial via /admin/model/candidate.
+    """
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.method == "GET":
+        return jsonify(retrain_job.state)
+    try:
+        query = RETRAIN_QUERY.check(request.args)
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    options = {"method": query["method"], "extra_trees": query["extra_trees"], "activate_new": query["activate"]}
+    if not retrain_job.start(**options):
+        return jsonify({"error": "A retrain is already running", **retrain_job.state}), 409
+    return jsonify(retrain_job.state), 202
+
+@app.route("/admin/model/candidate", methods=["GET", "POST", "DELETE"])
+def model_candidate():
+    """
+    POST ?version=vN&shadow_rate=0.1&canary_percent=5&canary_max=50&canary_step=5&step_every_s=600
+    starts a shadow/canary trial, GET reports agreement and latency deltas, DELETE ends it.
+    """
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        if request.method == "POST":
+            settings = {"version": request.args.get("version", ""), "created_at": time.time()}
+            for name, default in (("shadow_rate", 0.1), ("canary_percent", 0), ("canary_max", None),
+                                  ("canary_step", 0), ("step_every_s", 600), ("min_agreement", 0.9),
+                                  ("min_samples", 200)):
+                value = request.args.get(name, default)
+                if value is not None:
+                    settings[name] = float(value)
+            settings.setdefault("canary_max", settings["canary_percent"])
+            if not (0 <= settings["shadow_rate"] <= 1 and 0 <= settings["canary_max"] <= 100):
+                return jsonify({"error": "shadow_rate must be 0..1 and canary percentages 0..100"}), 400
+            crop_model.set_candidate(settings)
+        elif request.method == "DELETE":
+            crop_model.clear_candidate()
+        crop_models.invalidate()  # apply in this worker right away
+        return jsonify(crop_router.status())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/admin/model/activate", methods=["POST"])
+def model_activate():
+    """Switch every worker to ?version=vN (or "base"), e.g. to roll back"""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        crop_model.activate(request.args.get("version", ""))
+        crop_models.invalidate()
+        return jsonify({"current": crop_model.current_version()})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
 if __name__ == "__main__":
     app.run(port=5000, debug=True)
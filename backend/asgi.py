@@ -0,0 +1,211 @@
+"""
+Async (ASGI) serving mode for the backend.
+
+The I/O-bound routes (/get_price, /detect_disease) and /predict run as native
+async handlers: upstream calls go through one pooled httpx.AsyncClient and
+Gemini's async API, while CPU-bound steps (forest inference, image re-encoding,
+DataFrame formatting) run on a bounded thread pool. Every other route is served
+by the regular Flask app mounted underneath.
+
+    uvicorn asgi:app --port 5000 --workers 4
+"""
+import asyncio
+import contextvars
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from io import BytesIO
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+import app as backend
+import http_cache
+import metrics
+import quota
+import validation
+
+CPU_WORKERS = int(backend.config.get("ASGI_CPU_WORKERS") or min(8, os.cpu_count() or 2))
+# Jobs allowed to wait for a CPU worker before new requests start queueing at the door
+CPU_QUEUE_DEPTH = CPU_WORKERS * 4
+HTTP_LIMITS = httpx.Limits(max_connections=int(backend.config.get("ASGI_HTTP_MAX_CONNECTIONS") or 100),
+                           max_keepalive_connections=20)
+
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+cpu_slots = asyncio.Semaphore(CPU_QUEUE_DEPTH)
+http_client = None
+
+
+async def run_cpu(fn, *args):
+    # Carry the request's context into the worker so stage spans join its trace
+    ctx = contextvars.copy_context()
+    async with cpu_slots:
+        return await asyncio.get_running_loop().run_in_executor(cpu_executor, ctx.run, fn, *args)
+
+
+def flask_json(content):
+    """Encode like Flask's (non-debug) jsonify, so both serving modes return identical bodies"""
+    return (backend.app.json.dumps(content, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class FlaskJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        return flask_json(content)
+
+
+PRICE_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=30"
+
+
+def quota_exceeded(e):
+    return FlaskJSONResponse({"error": str(e)}, status_code=429,
+                             headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+
+def invalid_input(e):
+    return FlaskJSONResponse({"error": str(e), "errors": e.errors[:backend.MAX_REPORTED_ERRORS]}, status_code=400)
+
+
+def upstream_busy(retry_after=None):
+    return FlaskJSONResponse({"error": "Upstream API is rate limiting requests, please retry later"},
+                             status_code=503, headers={"Retry-After": str(retry_after or 5)})
+
+
+async def predict(request):
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None  # malformed body: the same 400 as Flask's get_json(silent=True)
+        return FlaskJSONResponse(await run_cpu(backend.recommend, data))
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except Exception as e:
+        return FlaskJSONResponse({"error": str(e)}, status_code=500)
+
+
+async def detect_disease(request):
+    try:
+        form = await request.form()
+        upload = form.get("image")
+        if upload is None or isinstance(upload, str):
+            return FlaskJSONResponse({"error": "No image uploaded"}, status_code=400)
+
+        raw = await upload.read()
+        image_bytes = await run_cpu(backend.reencode_jpeg, BytesIO(raw))
+
+        gemini_quota = backend.quota_manager["gemini"]
+        await gemini_quota.acquire_async(quota.request_priority(request.headers))
+        model_g = backend.genai.GenerativeModel(backend.DISEASE_MODEL_ID)
+        try:
+            with metrics.span("gemini_call"):
+                resp = await model_g.generate_content_async(
+                    [backend.DISEASE_PROMPT, {"mime_type": "image/jpeg", "data": image_bytes}]
+                )
+        except Exception as e:
+            if backend.is_rate_limit_error(e):
+                gemini_quota.report(429)
+                return upstream_busy()
+            raise
+        gemini_quota.report(200)
+        text = getattr(resp, "text", "") or ""
+        result = backend.parse_disease_text(text)
+        await run_cpu(backend.record_detection, result, form)
+        return FlaskJSONResponse(result)
+    except quota.QuotaExceeded as e:
+        return quota_exceeded(e)
+    except Exception as e:
+        return FlaskJSONResponse({"error": str(e)}, status_code=500)
+
+
+def _price_body(records, filter_type, include_quarantined=False):
+    """Filter/format and encode a price page off the event loop"""
+    formatted, error = backend.format_price_records(records, filter_type, include_quarantined)
+    if error:
+        return 404, flask_json({"error": error})
+    with metrics.span("json_serialize"):
+        return 200, flask_json(formatted)
+
+
+async def get_price(request):
+    try:
+        args = request.query_params
+        params = backend.PRICE_QUERY.check(args)
+
+        # Same page cache and validators as the Flask route (http_cache.conditional)
+        query = http_cache.query_key(args.multi_items())
+        version = backend.price_snapshot_version(args)
+        if version is not None:
+            tag = http_cache.make_etag("/get_price", version, query)
+            if http_cache.etag_matches(request.headers.get("If-None-Match"), tag):
+                return Response(status_code=304, headers={"ETag": tag, "Cache-Control": PRICE_CACHE_CONTROL})
+
+        key = backend.price_page_key(params)
+        page = backend.price_pages.get(key)
+        if page is None:
+            datagov_quota = backend.price_api.quota  # the client's quota, so price_api.quota = None lifts it here too
+            if datagov_quota is not None:
+                await datagov_quota.acquire_async(quota.request_priority(request.headers))
+            with metrics.span("upstream_fetch"):
+                resp = await http_client.get(backend.price_api.url, params=backend.price_params(params))
+            if datagov_quota is not None:
+                datagov_quota.report(resp.status_code, resp.headers.get("Retry-After"))
+            if resp.status_code in (429, 503):
+                return upstream_busy(resp.headers.get("Retry-After"))
+            resp.raise_for_status()
+            page = backend.price_pages.put(key, await run_cpu(backend.json.loads, resp.content))
+
+        status, body = await run_cpu(_price_body, page.records, params["filter"], params["include_quarantined"])
+        headers = {}
+        if status == 200 and version is None:
+            version = backend.price_snapshot_version(args)
+            if version is not None:
+                tag = http_cache.make_etag("/get_price", version, query)
+                if http_cache.etag_matches(request.headers.get("If-None-Match"), tag):
+                    return Response(status_code=304, headers={"ETag": tag, "Cache-Control": PRICE_CACHE_CONTROL})
+        if status == 200 and version is not None:
+            headers = {"ETag": tag, "Cache-Control": PRICE_CACHE_CONTROL}
+        return Response(body, status_code=status, media_type="application/json", headers=headers)
+    except validation.ValidationError as e:
+        return invalid_input(e)
+    except quota.QuotaExceeded as e:
+        return quota_exceeded(e)
+    except Exception as e:
+        return FlaskJSONResponse({"error": str(e)}, status_code=500)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    global http_client
+    http_client = httpx.AsyncClient(timeout=20, limits=HTTP_LIMITS)
+    try:
+        yield
+    finally:
+        await http_client.aclose()
+
+
+# Flask-CORS and metrics.init_app cover the mounted app; the async routes get the equivalents here
+def route_middleware(path):
+    return [
+        Middleware(metrics.ASGIMetricsMiddleware, route=path),
+        Middleware(GZipMiddleware, minimum_size=1024),
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+    ]
+
+app = Starlette(
+    routes=[
+        Route("/predict", predict, methods=["POST"], middleware=route_middleware("/predict")),
+        Route("/detect_disease", detect_disease, methods=["POST"], middleware=route_middleware("/detect_disease")),
+        Route("/get_price", get_price, methods=["GET"], middleware=route_middleware("/get_price")),
+        Mount("/", app=WsgiToAsgi(backend.app)),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,310 @@
+"""
+Offline benchmark suite for the backend hot paths.
+
+Every case uses fixed synthetic inputs and a stubbed data.gov.in upstream, so
+runs are reproducible without network access or API keys. Results are written
+as JSON (one file per commit by default) and can be compared across commits:
+
+    python bench_hotpaths.py                          # run all, save data/benchmarks/<commit>.json
+    python bench_hotpaths.py -k price --repeat 7      # only cases whose name contains "price"
+    python bench_hotpaths.py --compare data/benchmarks/abc1234.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "data", "benchmarks")
+
+os.environ.setdefault("PRICING_API_KEY", "offline-bench-key")
+os.environ.setdefault("PRICING_BASE_URL", "http://upstream.invalid/resource/bench")
+
+import app as backend  # noqa: E402  (env must be set before import)
+import fake_datagov  # noqa: E402
+
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+class _StubResponse:
+    def __init__(self, payload):
+        self._payload = payload
+        self.status_code = 200
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+def _soil_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 140, n), rng.uniform(5, 145, n), rng.uniform(5, 205, n),
+        rng.uniform(8, 44, n), rng.uniform(14, 100, n), rng.uniform(3.5, 9.9, n), rng.uniform(20, 300, n),
+    ])
+
+
+# Each case returns a zero-argument callable that runs one iteration.
+
+@case("crop_predict_single")
+def _crop_predict_single():
+    features = _soil_rows(1)
+    return lambda: backend.predict_crop(features)
+
+
+@case("crop_predict_batch_1000")
+def _crop_predict_batch():
+    features = _soil_rows(1000)
+    bundle = backend.crop_models.current()
+    return lambda: bundle.predict_proba(features).argmax(axis=1)
+
+
+@case("predict_route")
+def _predict_route():
+    client = backend.app.test_client()
+    body = dict(zip(backend.FEATURE_FIELDS, _soil_rows(1)[0].tolist()))
+    return lambda: client.post("/predict", json=body)
+
+
+@case("crop_explain_single")
+def _crop_explain_single():
+    features = _soil_rows(1)
+    bundle = backend.crop_models.current()
+    return lambda: backend.crop_explain.explain(bundle, features, backend.FEATURE_FIELDS)
+
+
+# Per-row latency is this case's time / 1000
+@case("crop_explain_batch_1000")
+def _crop_explain_batch():
+    features = _soil_rows(1000)
+    bundle = backend.crop_models.current()
+    return lambda: backend.crop_explain.explain(bundle, features, backend.FEATURE_FIELDS)
+
+
+@case("explain_route")
+def _explain_route():
+    client = backend.app.test_client()
+    body = dict(zip(backend.FEATURE_FIELDS, _soil_rows(1)[0].tolist()))
+    return lambda: client.post("/explain", json=body)
+
+
+@case("validate_predict_single")
+def _validate_predict_single():
+    body = dict(zip(backend.FEATURE_FIELDS, _soil_rows(1)[0].tolist()), top_k="3")
+    return lambda: backend.PREDICT_SCHEMA.check(body)
+
+
+# Per-row validation cost is this case's time / 10000
+@case("validate_predict_batch_10000")
+def _validate_predict_batch():
+    rows = [dict(zip(backend.FEATURE_FIELDS, r)) for r in _soil_rows(10000).tolist()]
+    return lambda: backend.PREDICT_SCHEMA.check_batch(rows)
+
+
+@case("validate_profiles_csv_10000")
+def _validate_profiles_csv():
+    import pandas as pd
+
+    rng = np.random.default_rng(5)
+    frame = pd.DataFrame({"land": rng.uniform(0, 4, 10000).round(2), "age": rng.integers(14, 80, 10000),
+                          "state": "Punjab", "is_woman": np.where(rng.random(10000) < 0.4, "yes", "no")})
+    return lambda: backend.validation.PROFILE_SCHEMA.validate_frame(frame)
+
+
+def _price_route(n):
+    payload = {"records": fake_datagov.generate_records(n, days=20, seed=7, today=datetime.now().date())}
+    client = backend.app.test_client()
+    backend.price_api.quota = None  # the stub isn't the shared upstream; don't rate limit it
+    backend.price_pages.ttl = 0  # measure the full pipeline, not the page cache
+
+    def run():
+        session = backend.price_api.session
+        session.get = lambda *a, **kw: _StubResponse(payload)
+        try:
+            resp = client.get("/get_price?state=Punjab&filter=15days")
+        finally:
+            del session.get
+        assert resp.status_code == 200, resp.status_code
+    return run
+
+
+for _n in (100, 1000, 5000):
+    case(f"get_price_pipeline_{_n}")(lambda n=_n: _price_route(n))
+
+
+def _phone_jpeg(width, height, seed=0):
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 127 // (width + height))], axis=-1)
+    noisy = np.clip(base + rng.integers(-20, 20, base.shape), 0, 255).astype(np.uint8)
+    buf = BytesIO()
+    Image.fromarray(noisy, "RGB").save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+for _label, _size in (("vga", (640, 480)), ("720p", (1280, 720)), ("1080p", (1920, 1080)), ("12mp", (4000, 3000))):
+    case(f"image_reencode_{_label}")(
+        lambda size=_size: (lambda data=_phone_jpeg(*size): backend.reencode_jpeg(BytesIO(data)))
+    )
+
+
+DISEASE_TEXTS = [
+    '{"disease": "Tomato - Late blight", "confidence": 0.91, "severity": "moderate", '
+    '"advice": "Remove infected leaves", "precautions": "Avoid overhead irrigation"}',
+    'Here is the analysis:\n```json\n{"disease": "Healthy", "confidence": 0.88, "severity": "none", '
+    '"advice": "", "precautions": "Keep monitoring"}\n```\nLet me know if you need more.',
+    "I could not identify a leaf in this image. Please upload a clearer photo. " * 5,
+]
+
+
+@case("disease_json_extraction")
+def _disease_json():
+    return lambda: [backend.parse_disease_text(t) for t in DISEASE_TEXTS]
+
+
+@case("find_schemes_route")
+def _find_schemes():
+    client = backend.app.test_client()
+    query = {"land": "1.5", "income": "120000", "age": "34", "state": "Punjab",
+             "is_woman": "true", "is_scst": "false", "is_tenant": "false", "has_bank": "true"}
+    return lambda: client.get("/find_schemes", query_string=query)
+
+
+@case("find_schemes_engine_batch_10000")
+def _find_schemes_batch():
+    rng = np.random.default_rng(3)
+    n = 10000
+    cols = {
+        "land": rng.uniform(0, 4, n), "income": rng.uniform(0, 400000, n), "age": rng.integers(14, 80, n),
+        "state": np.array(["Punjab"] * n, dtype=object), "is_woman": rng.random(n) < 0.4,
+        "is_scst": rng.random(n) < 0.25, "is_tenant": rng.random(n) < 0.3, "has_bank": rng.random(n) < 0.8,
+    }
+    return lambda: backend.scheme_engine.match_codes(cols)
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """timeit-style: pick a loop count that runs >= min_time, then time `repeat` rounds of it"""
+    fn()  # warm-up
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - t0 >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    rounds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        rounds.append((time.perf_counter() - t0) / loops)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min_s": min(rounds),
+        "median_s": statistics.median(rounds),
+        "mean_s": statistics.fmean(rounds),
+        "stdev_s": statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        "ops_per_s": 1.0 / statistics.median(rounds),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__) or ".",
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def environment():
+    import pandas
+    import sklearn
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print per-case median ratios; returns the names that regressed beyond `threshold`"""
+    regressions = []
+    print(f"{'case':34} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f"{name:34} {'-':>10} {result['median_s'] * 1000:10.3f} {'new':>7}")
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:34} {base['median_s'] * 1000:10.3f} {result['median_s'] * 1000:10.3f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline benchmarks for backend hot paths.")
+    ap.add_argument("-k", "--filter", help="Only run cases whose name contains this substring.")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timing round.")
+    ap.add_argument("-o", "--output", help="Result JSON path (default: data/benchmarks/<commit>.json).")
+    ap.add_argument("--compare", help="Baseline result JSON to compare against.")
+    ap.add_argument("--threshold", type=float, default=1.10, help="Median ratio that counts as a regression.")
+    ap.add_argument("--list", action="store_true", help="List case names and exit.")
+    args = ap.parse_args()
+
+    names = [n for n in CASES if not args.filter or args.filter in n]
+    if args.list:
+        print("\n".join(names))
+        return
+
+    report = {"meta": environment(), "results": {}}
+    for name in names:
+        result = measure(CASES[name](), args.repeat, args.min_time)
+        report["results"][name] = result
+        print(f"{name:34} {result['median_s'] * 1000:10.3f} ms  (±{result['stdev_s'] * 1000:.3f}, "
+              f"{result['loops']} loops x {result['repeat']})", file=sys.stderr)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
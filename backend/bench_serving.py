@@ -0,0 +1,78 @@
+"""
+Compare concurrent /get_price throughput of the sync (Flask/werkzeug) and async
+(ASGI via uvicorn) serving modes against the offline data.gov.in stand-in.
+
+    python bench_serving.py --requests 400 --concurrency 64 --latency-ms 250
+
+Both servers and the load generator share one process, so absolute numbers are
+pessimistic; the comparison between the two modes is what matters.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+import fake_datagov
+import loadtest_price
+
+
+def serve_asgi_in_thread(asgi_app):
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    config = uvicorn.Config(asgi_app, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    threading.Thread(target=lambda: asyncio.run(server.serve(sockets=[sock])), daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sync vs async serving benchmark for /get_price.")
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--records", type=int, default=5000)
+    ap.add_argument("--latency-ms", type=float, default=250.0, help="Simulated upstream latency.")
+    ap.add_argument("--jitter-ms", type=float, default=50.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    fake = fake_datagov.FakeDataGov(fake_datagov.generate_records(args.records, seed=args.seed),
+                                    args.latency_ms, args.jitter_ms, seed=args.seed)
+    _, upstream = loadtest_price.serve_in_thread(fake_datagov.create_app(fake))
+    os.environ["PRICING_BASE_URL"] = f"{upstream}/resource/{fake_datagov.RESOURCE_ID}"
+    os.environ.setdefault("PRICING_API_KEY", "offline-test-key")
+
+    import app as backend
+    import asgi
+
+    backend.price_pages.ttl = 0  # every request goes upstream; otherwise both modes just measure cache hits
+    backend.price_api.quota = None  # the fake isn't the shared upstream; don't measure the token bucket
+    _, sync_target = loadtest_price.serve_in_thread(backend.app)
+    _, async_target = serve_asgi_in_thread(asgi.app)
+
+    reports = {
+        "sync": loadtest_price.run(sync_target, args.requests, args.concurrency, args.seed),
+        "async": loadtest_price.run(async_target, args.requests, args.concurrency, args.seed),
+    }
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    print(f"{args.requests} requests @ concurrency {args.concurrency}, "
+          f"upstream latency {args.latency_ms}±{args.jitter_ms} ms")
+    print(f"{'mode':6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for mode, r in reports.items():
+        print(f"{mode:6} {r['throughput_rps']:8} {r['p50_ms']:8} {r['p95_ms']:8} {r['p99_ms']:8}  {r['status_counts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Shadow evaluation and canary routing for a candidate crop model version.
+
+A candidate is configured in data/models/CANDIDATE (crop_model.set_candidate),
+so every worker picks it up like a CURRENT switch:
+
+    {"version": "v3", "shadow_rate": 0.2,
+     "canary_percent": 5, "canary_max": 50, "canary_step": 5, "step_every_s": 600,
+     "min_agreement": 0.9, "min_samples": 200, "created_at": 1700000000}
+
+* Shadow: a `shadow_rate` share of requests served by the primary is re-scored
+  on the candidate by a background thread, off the request path. Agreement on
+  the top crop and the latency of both models are recorded.
+* Canary: `canary_percent` of requests are answered by the candidate. The
+  share grows by `canary_step` every `step_every_s` seconds up to `canary_max`,
+  and drops to 0 for this worker once shadow agreement (over at least
+  `min_samples` comparisons) falls below `min_agreement`.
+
+Promote a candidate with crop_model.activate(), which also ends the trial.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+COMPARISONS = metrics.counter("agri_crop_shadow_comparisons_total",
+                              "Shadow comparisons between primary and candidate models.",
+                              ("candidate", "agreed"))
+AGREEMENT = metrics.gauge("agri_crop_shadow_agreement_ratio", "Top-crop agreement of the candidate model.",
+                          ("candidate",))
+MEAN_LATENCY = metrics.gauge("agri_crop_shadow_latency_ms", "Mean predict latency seen in shadow comparisons.",
+                             ("candidate", "model"))
+CANARY_PERCENT = metrics.gauge("agri_crop_canary_percent", "Share of traffic currently routed to the candidate.",
+                               ("candidate",))
+SHADOW_DROPPED = metrics.counter("agri_crop_shadow_dropped_total", "Shadow jobs dropped because the queue was full.",
+                                 ("candidate",))
+
+
+class _Stats:
+    __slots__ = ("samples", "agreed", "primary_s", "candidate_s")
+
+    def __init__(self):
+        self.samples = self.agreed = 0
+        self.primary_s = self.candidate_s = 0.0
+
+    def as_dict(self):
+        n = self.samples or 1
+        return {
+            "samples": self.samples,
+            "agreement": round(self.agreed / n, 4) if self.samples else None,
+            "primary_ms": round(self.primary_s / n * 1000, 3) if self.samples else None,
+            "candidate_ms": round(self.candidate_s / n * 1000, 3) if self.samples else None,
+            "latency_delta_ms": round((self.candidate_s - self.primary_s) / n * 1000, 3) if self.samples else None,
+        }
+
+
+def canary_share(settings, stats, now=None):
+    """Percent of traffic the candidate should get right now, after ramping and the agreement guard"""
+    if stats.samples >= settings.get("min_samples", 200) and \
+            stats.agreed / stats.samples < settings.get("min_agreement", 0.9):
+        return 0.0
+    start = float(settings.get("canary_percent", 0))
+    step = float(settings.get("canary_step", 0))
+    every = float(settings.get("step_every_s", 600)) or 600.0
+    elapsed = max(0.0, (now or time.time()) - settings.get("created_at", 0))
+    return min(float(settings.get("canary_max", start)), start + step * int(elapsed // every))
+
+
+class CandidateRouter:
+    """Picks the model for each request and runs sampled shadow comparisons on one background thread"""
+
+    def __init__(self, registry, max_pending=256):
+        self.registry = registry
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crop-shadow")
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _stats_for(self, version):
+        with self._lock:
+            return self._stats.setdefault(version, _Stats())
+
+    def choose(self):
+        """(bundle, role): role is "canary" when the candidate answers this request, else "primary\""""
+        primary = self.registry.current()
+        candidate, settings = self.registry.candidate()
+        if candidate is not None:
+            share = canary_share(settings, self._stats_for(candidate.version))
+            CANARY_PERCENT.set(share, candidate=candidate.version)
+            if share > 0 and random.random() * 100 < share:
+                return candidate, "canary"
+        return primary, "primary"
+
+    def shadow(self, features, primary_crop, primary_seconds):
+        """Queue a comparison for a primary-served request, if sampled; never blocks the caller"""
+        candidate, settings = self.registry.candidate()
+        if candidate is None or random.random() >= settings.get("shadow_rate", 0.0):
+            return
+        with self._lock:
+            if self._pending >= self.max_pending:
+                SHADOW_DROPPED.inc(candidate=candidate.version)
+                return
+            self._pending += 1
+        self._executor.submit(self._compare, candidate, features, primary_crop, primary_seconds)
+
+    def _compare(self, candidate, features, primary_crop, primary_seconds):
+        try:
+            t0 = time.perf_counter()
+            proba = candidate.predict_proba(features, observe=False)
+            elapsed = time.perf_counter() - t0
+            agreed = candidate.classes[proba[0].argmax()] == primary_crop
+            stats = self._stats_for(candidate.version)
+            with self._lock:
+                stats.samples += 1
+                stats.agreed += agreed
+                stats.primary_s += primary_seconds
+                stats.candidate_s += elapsed
+                summary = stats.as_dict()
+            COMPARISONS.inc(candidate=candidate.version, agreed=str(bool(agreed)).lower())
+            AGREEMENT.set(summary["agreement"], candidate=candidate.version)
+            MEAN_LATENCY.set(summary["primary_ms"], candidate=candidate.version, model="primary")
+            MEAN_LATENCY.set(summary["candidate_ms"], candidate=candidate.version, model="candidate")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def status(self):
+        candidate, settings = self.registry.candidate()
+        if candidate is None:
+            return {"primary": self.registry.current().version, "candidate": None}
+        stats = self._stats_for(candidate.version)
+        with self._lock:
+            summary = stats.as_dict()
+        return {
+            "primary": self.registry.current().version,
+            "candidate": candidate.version,
+            "settings": settings,
+            "canary_percent": canary_share(settings, stats),
+            "shadow": summary,
+            "pending": self._pending,
+        }
@@ -0,0 +1,152 @@
+"""
+Per-feature contributions ("why this crop?") for the crop recommendation forest.
+
+Tree-path attribution: along a row's decision path every split changes the
+node's class distribution, and that change is credited to the split feature.
+For each tree the leaf distribution is exactly the root distribution (the
+tree's expectation over its training sample) plus the per-feature credits;
+averaged over the trees the same identity holds for predict_proba.
+
+Each model version is compiled once into a sparse matrix of those per-node
+changes (all trees' nodes x features*classes) plus the averaged root
+distribution, the background expectation. Explaining a batch is then one
+traversal of all trees at once (numpy steps over rows x trees, one per tree
+level) and one sparse matrix product.
+
+Contributions explain the forest's raw probabilities; the served
+probabilities are temperature-calibrated from them, which keeps the ranking
+of crops.
+"""
+import threading
+
+import numpy as np
+from scipy import sparse
+
+
+class ForestExplainer:
+    def __init__(self, model):
+        n_classes = model.n_classes_
+        self.n_features = model.n_features_in_
+        self.n_classes = n_classes
+        rows, cols, vals = [], [], []
+        expected = np.zeros(n_classes)
+        offset = 0
+        roots, features, thresholds, lefts, rights = [], [], [], [], []
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            roots.append(offset)
+            features.append(tree.feature)
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(tree.children_left >= 0, tree.children_left + offset, -1))
+            rights.append(np.where(tree.children_right >= 0, tree.children_right + offset, -1))
+            value = tree.value[:, 0, :]
+            value = value / value.sum(axis=1, keepdims=True)  # class fractions (older sklearn stores counts)
+            left, right = tree.children_left, tree.children_right
+            internal = np.flatnonzero(left >= 0)
+            parent = np.full(tree.node_count, -1)
+            parent[left[internal]] = internal
+            parent[right[internal]] = internal
+            child = np.flatnonzero(parent >= 0)
+            delta = value[child] - value[parent[child]]
+            feature = tree.feature[parent[child]]
+            rows.append(np.repeat(offset + child, n_classes))
+            cols.append((feature[:, None] * n_classes + np.arange(n_classes)).ravel())
+            vals.append(delta.ravel())
+            expected += value[0]
+            offset += tree.node_count
+
+        n_trees = len(model.estimators_)
+        self.model = model
+        # all trees' nodes in one set of arrays, children as global node ids
+        self.roots = np.array(roots)
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts)
+        self.right = np.concatenate(rights)
+        self.expected = expected / n_trees
+        self.matrix = sparse.csr_matrix(
+            (np.concatenate(vals) / n_trees, (np.concatenate(rows), np.concatenate(cols))),
+            shape=(offset, self.n_features * n_classes),
+        )
+
+    def decision_paths(self, features):
+        """Sparse (rows x all nodes) indicator of the non-root nodes each row visits"""
+        X = np.asarray(features, dtype=np.float32)  # trees split on float32 inputs
+        n, n_trees = len(X), len(self.roots)
+        row = np.repeat(np.arange(n), n_trees)
+        node = np.tile(self.roots, n)
+        visited_rows, visited_nodes = [], []
+        active = np.flatnonzero(self.left[node] >= 0)
+        while active.size:
+            current = node[active]
+            go_left = X[row[active], self.feature[current]] <= self.threshold[current]
+            node[active] = np.where(go_left, self.left[current], self.right[current])
+            visited_rows.append(row[active])
+            visited_nodes.append(node[active])
+            active = active[self.left[node[active]] >= 0]
+        if not visited_rows:
+            return sparse.csr_matrix((n, self.matrix.shape[0]))
+        rows, nodes = np.concatenate(visited_rows), np.concatenate(visited_nodes)
+        return sparse.csr_matrix((np.ones(len(rows)), (rows, nodes)), shape=(n, self.matrix.shape[0]))
+
+    def contributions(self, features):
+        """(raw probabilities (n, classes), contributions (n, features, classes))"""
+        paths = self.decision_paths(features)
+        contrib = np.asarray((paths @ self.matrix).todense()).reshape(len(features), self.n_features, self.n_classes)
+        return self.expected + contrib.sum(axis=1), contrib
+
+
+_explainers = {}
+_lock = threading.Lock()
+MAX_CACHED_VERSIONS = 4
+
+
+def explainer_for(bundle):
+    """The compiled explainer for a crop_model.ModelBundle, built once per model version"""
+    explainer = _explainers.get(bundle.version)
+    if explainer is not None and explainer.model is bundle.model:
+        return explainer
+    with _lock:
+        explainer = _explainers.get(bundle.version)
+        if explainer is None or explainer.model is not bundle.model:
+            explainer = ForestExplainer(bundle.model)
+            while len(_explainers) >= MAX_CACHED_VERSIONS:
+                _explainers.pop(next(iter(_explainers)))
+            _explainers[bundle.version] = explainer
+    return explainer
+
+
+def explain(bundle, features, feature_names, crops=None, top_k=1):
+    """
+    Explanations for each row of `features`: the top_k crops (or the named `crops`), each with
+    the forest probability, the background expectation and per-feature contributions.
+    """
+    explainer = explainer_for(bundle)
+    proba, contrib = explainer.contributions(features)
+    index = {str(c).lower(): i for i, c in enumerate(bundle.classes)}
+    if crops:
+        unknown = [c for c in crops if str(c).lower() not in index]
+        if unknown:
+            raise ValueError(f"Unknown crop(s): {', '.join(map(str, unknown))}")
+        chosen = np.tile([index[str(c).lower()] for c in crops], (len(features), 1))
+    else:
+        chosen = np.argsort(-proba, axis=1, kind="stable")[:, :top_k]
+
+    out = []
+    for row, classes in enumerate(chosen):
+        items = []
+        for c in classes:
+            parts = contrib[row, :, c]
+            order = np.argsort(-np.abs(parts), kind="stable")
+            items.append({
+                "crop": str(bundle.classes[c]),
+                "probability": round(float(proba[row, c]), 4),
+                "expected": round(float(explainer.expected[c]), 4),
+                "contributions": [
+                    {"feature": feature_names[f], "value": float(features[row, f]),
+                     "contribution": round(float(parts[f]), 4)}
+                    for f in order
+                ],
+            })
+        out.append(items)
+    return out
@@ -0,0 +1,451 @@
+"""
+Crop model versions, field feedback and incremental retraining.
+
+Farmers' reports of what actually grew well are appended to a local SQLite
+feedback store. A retraining job turns them into a new model version under
+data/models/<version>/:
+
+* warm_start: keep the current forest and grow extra trees on the feedback
+  (blended with a stratified sample of the original dataset so every crop
+  stays represented). Only possible when feedback adds no new crop labels.
+* full: train a fresh forest on the dataset plus all feedback.
+
+Each version is evaluated (accuracy on a fixed feedback holdout and on the
+dataset, single-row latency) and its numbers are kept in meta.json. A new
+version is activated only when neither accuracy falls below its parent's on
+the same data; otherwise it stays a candidate for a shadow/canary trial. The
+active version is named in data/models/CURRENT, replaced atomically;
+every worker's ModelRegistry notices the change and swaps the new bundle in
+without blocking requests.
+
+    python crop_model.py retrain --method warm_start --extra-trees 25
+    python crop_model.py activate v3        # or "base" to roll back
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import crop_ranking
+import metrics
+
+BASE_VERSION = "base"
+BASE_DIR = os.path.join(os.path.dirname(__file__), "models", "crop_recommendation")
+MODELS_DIR = os.environ.get("CROP_MODELS_DIR") or os.path.join(os.path.dirname(__file__), "data", "models")
+FEEDBACK_DB_PATH = os.environ.get("FEEDBACK_DB_PATH") or os.path.join(os.path.dirname(__file__), "data",
+                                                                       "feedback.db")
+FEATURES = crop_ranking.DATASET_COLUMNS
+# Feedback rows with id % HOLDOUT_EVERY == 0 are never trained on; they score every version
+HOLDOUT_EVERY = 5
+
+PREDICTIONS = metrics.counter("agri_crop_predictions_total", "Crop predictions served per model version.",
+                              ("version",))
+PREDICT_LATENCY = metrics.histogram("agri_crop_predict_duration_seconds",
+                                    "predict_proba latency per model version.", ("version",))
+ACCURACY = metrics.gauge("agri_crop_model_accuracy", "Evaluation accuracy per model version.",
+                         ("version", "dataset"))
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    {", ".join(f'"{f}" REAL NOT NULL' for f in FEATURES)},
+    label TEXT NOT NULL,
+    predicted TEXT,
+    model_version TEXT
+);
+"""
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+@contextmanager
+def connect(path=None):
+    path = path or FEEDBACK_DB_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with _schema_lock:
+            if path not in _schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _schema_ready.add(path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# ---------------- Feedback ----------------
+
+def add_feedback(samples, path=None):
+    """Append labeled samples (dicts with the feature columns and "label"); returns the number stored"""
+    now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    rows = [(now, *[float(s[f]) for f in FEATURES], str(s["label"]).strip().lower(),
+             s.get("predicted"), s.get("model_version")) for s in samples]
+    columns = ", ".join(["created_at"] + [f'"{f}"' for f in FEATURES] + ["label", "predicted", "model_version"])
+    with connect(path) as conn:
+        conn.executemany(f"INSERT INTO feedback ({columns}) VALUES ({', '.join('?' * (len(FEATURES) + 4))})",
+                         rows)
+    return len(rows)
+
+
+def feedback_frame(after_id=0, path=None):
+    """Feedback rows with id > after_id as a DataFrame (id, feature columns, label)"""
+    cols = ", ".join(["id"] + [f'"{f}"' for f in FEATURES] + ["label"])
+    with connect(path) as conn:
+        rows = conn.execute(f"SELECT {cols} FROM feedback WHERE id > ? ORDER BY id", (after_id,)).fetchall()
+    return pd.DataFrame(rows, columns=["id"] + FEATURES + ["label"])
+
+
+def feedback_stats(path=None):
+    with connect(path) as conn:
+        total, last_id = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM feedback").fetchone()
+    return {"samples": total, "last_id": last_id}
+
+
+def split_holdout(frame):
+    holdout = frame["id"] % HOLDOUT_EVERY == 0
+    return frame[~holdout], frame[holdout]
+
+
+# ---------------- Model versions ----------------
+
+class ModelBundle:
+    """An immutable, loaded model version; swapped as a whole so requests never see a half-updated model"""
+
+    def __init__(self, version, model, encoder, temperature, meta):
+        self.version = version
+        self.model = model
+        self.encoder = encoder
+        self.temperature = temperature
+        self.meta = meta
+        self.classes = encoder.classes_[model.classes_]
+
+    def predict_proba(self, features, observe=True):
+        t0 = time.perf_counter()
+        proba = self.model.predict_proba(features)
+        if observe:
+            PREDICT_LATENCY.observe(time.perf_counter() - t0, version=self.version)
+            PREDICTIONS.inc(len(features), version=self.version)
+        return crop_ranking.calibrate(proba, self.temperature)
+
+
+def version_dir(version, models_dir=MODELS_DIR):
+    return BASE_DIR if version == BASE_VERSION else os.path.join(models_dir, version)
+
+
+def read_meta(version, models_dir=MODELS_DIR):
+    try:
+        with open(os.path.join(version_dir(version, models_dir), "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except OSError:
+        return {"version": version}
+
+
+def load_bundle(version, models_dir=MODELS_DIR):
+    directory = version_dir(version, models_dir)
+    meta = read_meta(version, models_dir)
+    bundle = ModelBundle(
+        version,
+        joblib.load(os.path.join(directory, "rf_model.pkl")),
+        joblib.load(os.path.join(directory, "label_encoder.pkl")),
+        meta.get("temperature") or crop_ranking.load_temperature(os.path.join(directory, "calibration.json")),
+        meta,
+    )
+    for name, value in (meta.get("accuracy") or {}).items():
+        if value is not None:
+            ACCURACY.set(value, version=version, dataset=name)
+    return bundle
+
+
+def current_version(models_dir=MODELS_DIR):
+    try:
+        with open(os.path.join(models_dir, "CURRENT"), "r", encoding="utf-8") as f:
+            return f.read().strip() or BASE_VERSION
+    except OSError:
+        return BASE_VERSION
+
+
+def activate(version, models_dir=MODELS_DIR):
+    """Point CURRENT at `version`; os.replace makes the switch atomic for every reader"""
+    if not os.path.isfile(os.path.join(version_dir(version, models_dir), "rf_model.pkl")):
+        raise ValueError(f"Unknown model version: {version}")
+    os.makedirs(models_dir, exist_ok=True)
+    _write_atomic(os.path.join(models_dir, "CURRENT"), version)
+    if (read_candidate(models_dir) or {}).get("version") == version:
+        clear_candidate(models_dir)  # promoted: the trial is over
+
+
+def _write_atomic(path, text):
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def read_candidate(models_dir=MODELS_DIR):
+    """Candidate settings (see crop_canary) from data/models/CANDIDATE, or None"""
+    try:
+        with open(os.path.join(models_dir, "CANDIDATE"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def set_candidate(settings, models_dir=MODELS_DIR):
+    version = settings.get("version")
+    if version == current_version(models_dir):
+        raise ValueError(f"{version} is already the current version")
+    if not os.path.isfile(os.path.join(version_dir(version, models_dir), "rf_model.pkl")):
+        raise ValueError(f"Unknown model version: {version}")
+    os.makedirs(models_dir, exist_ok=True)
+    _write_atomic(os.path.join(models_dir, "CANDIDATE"), json.dumps(settings))
+
+
+def clear_candidate(models_dir=MODELS_DIR):
+    try:
+        os.remove(os.path.join(models_dir, "CANDIDATE"))
+    except FileNotFoundError:
+        pass
+
+
+def list_versions(models_dir=MODELS_DIR):
+    names = [BASE_VERSION]
+    if os.path.isdir(models_dir):
+        names += sorted((d for d in os.listdir(models_dir) if d.startswith("v") and d[1:].isdigit()),
+                        key=lambda d: int(d[1:]))
+    return [read_meta(n, models_dir) | {"version": n} for n in names]
+
+
+class ModelRegistry:
+    """
+    The serving model (and optional candidate) for this worker. Both pointers are
+    re-checked at most every `check_interval` seconds; when one moved, one request
+    thread loads the new version while the others keep serving the old bundle
+    until it's swapped in.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, check_interval=2.0):
+        self.models_dir = models_dir
+        self.check_interval = check_interval
+        self._bundle = load_bundle(current_version(models_dir), models_dir)
+        self._candidate = (None, None)
+        self._checked_at = float("-inf")
+        self._loading = threading.Lock()
+        self._refresh()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval or not self._loading.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            wanted = current_version(self.models_dir)
+            if wanted != self._bundle.version:
+                self._bundle = load_bundle(wanted, self.models_dir)
+            settings = read_candidate(self.models_dir)
+            if settings and settings.get("version") != wanted:
+                bundle = self._candidate[0]
+                if bundle is None or bundle.version != settings["version"]:
+                    bundle = load_bundle(settings["version"], self.models_dir)
+                self._candidate = (bundle, settings)
+            else:
+                self._candidate = (None, None)
+        finally:
+            self._loading.release()
+
+    def invalidate(self):
+        """Re-read the pointers on the next access instead of waiting out check_interval"""
+        self._checked_at = float("-inf")
+
+    def current(self):
+        self._refresh()
+        return self._bundle
+
+    def candidate(self):
+        """(candidate bundle, its settings) or (None, None)"""
+        self._refresh()
+        return self._candidate
+
+
+# ---------------- Retraining ----------------
+
+def _dataset(path=crop_ranking.DEFAULT_DATASET_PATH):
+    df = pd.read_csv(path)
+    df["label"] = df["label"].str.strip().str.lower()
+    return df
+
+
+def _next_version(models_dir):
+    """Reserve the next vN directory (mkdir is atomic, so concurrent jobs can't collide)"""
+    os.makedirs(models_dir, exist_ok=True)
+    n = 1 + max([int(d[1:]) for d in os.listdir(models_dir) if d.startswith("v") and d[1:].isdigit()] or [0])
+    while True:
+        try:
+            os.mkdir(os.path.join(models_dir, f"v{n}"))
+            return f"v{n}"
+        except FileExistsError:
+            n += 1
+
+
+def accuracy(model, encoder, holdout, dataset):
+    """{"feedback_holdout", "dataset"} accuracy over the rows whose label the encoder knows"""
+    def score(frame):
+        known = frame[frame["label"].isin(encoder.classes_)]
+        if known.empty:
+            return None
+        predicted = encoder.classes_[model.classes_][model.predict_proba(known[FEATURES]).argmax(axis=1)]
+        return round(float(np.mean(predicted == known["label"].to_numpy())), 4)
+    return {"feedback_holdout": score(holdout), "dataset": score(dataset)}
+
+
+def regressions(scores, parent_scores):
+    """Names of the accuracies where a version scores below its parent"""
+    return [name for name, value in scores.items()
+            if value is not None and parent_scores.get(name) is not None and value < parent_scores[name]]
+
+
+def evaluate(model, encoder, holdout, dataset, latency_rows=50):
+    """Accuracy on the feedback holdout and the dataset, plus single-row predict latency"""
+    # Same shape as the serving path: one numpy row per call
+    sample = dataset[FEATURES].sample(min(latency_rows, len(dataset)), random_state=0).to_numpy()
+    timings = []
+    for i in range(len(sample)):
+        t0 = time.perf_counter()
+        model.predict_proba(sample[i:i + 1])
+        timings.append((time.perf_counter() - t0) * 1000)
+    return {
+        "accuracy": accuracy(model, encoder, holdout, dataset),
+        "latency_ms": {"p50": round(float(np.percentile(timings, 50)), 3),
+                       "p95": round(float(np.percentile(timings, 95)), 3)},
+        "holdout_rows": len(holdout),
+    }
+
+
+def retrain(method="warm_start", extra_trees=25, base_sample=0.25, activate_new=True,
+            models_dir=MODELS_DIR, feedback_path=None, dataset_path=crop_ranking.DEFAULT_DATASET_PATH):
+    """
+    Train a new model version from the feedback store; returns its meta dict. With activate_new
+    it becomes current unless its accuracy regresses against the parent on today's holdout.
+    """
+    parent_version = current_version(models_dir)
+    parent = load_bundle(parent_version, models_dir)
+    dataset = _dataset(dataset_path)
+    train_fb, holdout = split_holdout(feedback_frame(0, feedback_path))
+
+    if method == "warm_start":
+        since = parent.meta.get("feedback_through_id", 0)
+        new_fb = train_fb[train_fb["id"] > since]
+        if new_fb.empty:
+            raise ValueError("No new feedback since the current model version")
+        unknown = set(new_fb["label"]) - set(parent.encoder.classes_)
+        if unknown:
+            raise ValueError(f"Feedback has new crop labels {sorted(unknown)}; use method=full")
+        # New trees must see every class so their probability columns line up with the old trees
+        anchor = dataset.groupby("label", group_keys=False).sample(frac=base_sample, random_state=len(new_fb))
+        train = pd.concat([anchor, new_fb], ignore_index=True)
+        model = joblib.load(os.path.join(version_dir(parent_version, models_dir), "rf_model.pkl"))
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + extra_trees)
+        model.fit(train[FEATURES], parent.encoder.transform(train["label"]))
+        model.set_params(warm_start=False)
+        encoder, temperature = parent.encoder, parent.temperature
+    elif method == "full":
+        from sklearn.base import clone
+        from sklearn.model_selection import cross_val_predict
+        from sklearn.preprocessing import LabelEncoder
+
+        train = pd.concat([dataset, train_fb.drop(columns="id")], ignore_index=True)
+        encoder = LabelEncoder().fit(train["label"])
+        y = encoder.transform(train["label"])
+        model = clone(parent.model).set_params(warm_start=False, n_estimators=100)
+        oof = cross_val_predict(clone(model), train[FEATURES], y, cv=3, method="predict_proba")
+        temperature = crop_ranking.fit_temperature(oof, y)
+        model.fit(train[FEATURES], y)
+    else:
+        raise ValueError(f"Unknown retrain method: {method}")
+
+    version = _next_version(models_dir)
+    directory = os.path.join(models_dir, version)
+    joblib.dump(model, os.path.join(directory, "rf_model.pkl"))
+    joblib.dump(encoder, os.path.join(directory, "label_encoder.pkl"))
+    meta = {
+        "version": version,
+        "parent": parent_version,
+        "method": method,
+        "trained_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "n_estimators": model.n_estimators,
+        "training_rows": len(train),
+        "feedback_through_id": int(train_fb["id"].max()) if not train_fb.empty else 0,
+        "temperature": round(float(temperature), 4),
+        **evaluate(model, encoder, holdout, dataset),
+        # The parent is rescored: its own meta predates feedback that has joined the holdout since
+        "parent_accuracy": accuracy(parent.model, parent.encoder, holdout, dataset),
+    }
+    meta["regressed"] = regressions(meta["accuracy"], meta["parent_accuracy"])
+    meta["activated"] = activate_new and not meta["regressed"]
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    if meta["activated"]:
+        activate(version, models_dir)
+    return meta
+
+
+class RetrainJob:
+    """Runs retrain() on a background thread, one at a time per process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = {"status": "idle"}
+
+    def start(self, **kwargs):
+        if not self._lock.acquire(blocking=False):
+            return False
+        self.state = {"status": "running", "started_at": time.time(), "options": kwargs}
+
+        def run():
+            try:
+                self.state = {**self.state, "status": "done", "result": retrain(**kwargs)}
+            except Exception as e:
+                self.state = {**self.state, "status": "failed", "error": str(e)}
+            finally:
+                self.state["finished_at"] = time.time()
+                self._lock.release()
+
+        threading.Thread(target=run, name="crop-retrain", daemon=True).start()
+        return True
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Crop model versions and retraining.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    rt = sub.add_parser("retrain", help="Train a new version from field feedback; activated unless it regresses.")
+    rt.add_argument("--method", choices=["warm_start", "full"], default="warm_start")
+    rt.add_argument("--extra-trees", type=int, default=25)
+    rt.add_argument("--no-activate", action="store_true")
+    act = sub.add_parser("activate", help="Make a version current (\"base\" for the shipped model).")
+    act.add_argument("version")
+    sub.add_parser("list", help="Show versions with their accuracy and latency.")
+    args = ap.parse_args()
+
+    if args.command == "retrain":
+        print(json.dumps(retrain(args.method, args.extra_trees, activate_new=not args.no_activate), indent=2))
+    elif args.command == "activate":
+        activate(args.version)
+        print(f"Activated {args.version}")
+    else:
+        print(json.dumps({"current": current_version(), "versions": list_versions(),
+                          "feedback": feedback_stats()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
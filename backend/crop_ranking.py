@@ -0,0 +1,143 @@
+"""
+Top-k crop recommendations with calibrated probabilities.
+
+The random forest's predict_proba (the share of trees voting for each crop)
+tends to be over- or under-confident, so the served probabilities are
+temperature scaled: p_i ** (1/T), renormalized. T is fitted once, offline,
+on out-of-fold probabilities of a forest with the same hyperparameters:
+
+    python crop_ranking.py calibrate        # writes models/crop_recommendation/calibration.json
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+DEFAULT_CALIBRATION_PATH = os.path.join(os.path.dirname(__file__), "models", "crop_recommendation",
+                                        "calibration.json")
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "Crop Recommendation",
+                                    "Crop_recommendation.csv")
+DATASET_COLUMNS = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+
+# Model labels -> data.gov.in (Agmarknet) commodity names, for price enrichment
+CROP_COMMODITIES = {
+    "apple": "Apple",
+    "banana": "Banana",
+    "blackgram": "Black Gram (Urd Beans)(Whole)",
+    "chickpea": "Bengal Gram(Gram)(Whole)",
+    "coconut": "Coconut",
+    "coffee": "Coffee",
+    "cotton": "Cotton",
+    "grapes": "Grapes",
+    "jute": "Jute",
+    "kidneybeans": "Rajma",
+    "lentil": "Lentil (Masur)(Whole)",
+    "maize": "Maize",
+    "mango": "Mango",
+    "mothbeans": "Moath Dal",
+    "mungbean": "Green Gram (Moong)(Whole)",
+    "muskmelon": "Karbuja(Musk Melon)",
+    "orange": "Orange",
+    "papaya": "Papaya",
+    "pigeonpeas": "Arhar (Tur/Red Gram)(Whole)",
+    "pomegranate": "Pomegranate",
+    "rice": "Rice",
+    "watermelon": "Water Melon",
+}
+
+
+def load_temperature(path=DEFAULT_CALIBRATION_PATH):
+    """Fitted temperature, or 1.0 (raw forest probabilities) when no calibration file exists"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return float(json.load(f)["temperature"])
+    except (OSError, KeyError, ValueError):
+        return 1.0
+
+
+def calibrate(proba, temperature):
+    """Temperature-scale a (rows x classes) probability matrix"""
+    if temperature == 1.0:
+        return proba
+    scaled = np.power(np.clip(proba, 1e-12, 1.0), 1.0 / temperature)
+    return scaled / scaled.sum(axis=1, keepdims=True)
+
+
+def top_k(proba, classes, k=3):
+    """Highest-probability classes per row: [[(label, probability), ...], ...]"""
+    k = max(1, min(int(k), proba.shape[1]))
+    idx = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(proba, idx, axis=1).argsort(axis=1)[:, ::-1]
+    idx = np.take_along_axis(idx, order, axis=1)
+    return [[(classes[j], float(row[j])) for j in cols] for row, cols in zip(proba, idx)]
+
+
+def ranked_items(ranked, trends=None):
+    """
+    Response items for one row of top_k(); with `trends` (price_store.commodity_trends)
+    each crop also gets its latest modal price and trend, or None when it isn't traded.
+    """
+    out = []
+    for crop, probability in ranked:
+        item = {"crop": crop, "probability": round(probability, 4)}
+        if trends is not None:
+            item["price"] = trends.get(CROP_COMMODITIES.get(crop, crop).lower())
+        out.append(item)
+    return out
+
+
+def _nll(proba, y, temperature):
+    p = calibrate(proba, temperature)
+    return -np.mean(np.log(np.clip(p[np.arange(len(y)), y], 1e-12, 1.0)))
+
+
+def fit_temperature(proba, y):
+    """Temperature minimizing the log loss of `proba` against integer labels `y` (golden-section search)"""
+    lo, hi = np.log(0.05), np.log(20.0)
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(60):
+        a, b = hi - ratio * (hi - lo), lo + ratio * (hi - lo)
+        if _nll(proba, y, np.exp(a)) < _nll(proba, y, np.exp(b)):
+            hi = b
+        else:
+            lo = a
+    return float(np.exp((lo + hi) / 2))
+
+
+def main():
+    import joblib
+    import pandas as pd
+    from sklearn.base import clone
+    from sklearn.model_selection import cross_val_predict
+
+    model_dir = os.path.dirname(DEFAULT_CALIBRATION_PATH)
+    ap = argparse.ArgumentParser(description="Crop recommendation calibration.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="Fit the probability temperature on out-of-fold predictions.")
+    cal.add_argument("--dataset", default=DEFAULT_DATASET_PATH)
+    cal.add_argument("--folds", type=int, default=5)
+    cal.add_argument("-o", "--output", default=DEFAULT_CALIBRATION_PATH)
+    args = ap.parse_args()
+
+    model = joblib.load(os.path.join(model_dir, "rf_model.pkl"))
+    encoder = joblib.load(os.path.join(model_dir, "label_encoder.pkl"))
+    df = pd.read_csv(args.dataset)
+    X, y = df[DATASET_COLUMNS], encoder.transform(df["label"])
+
+    proba = cross_val_predict(clone(model), X, y, cv=args.folds, method="predict_proba")
+    temperature = fit_temperature(proba, y)
+    report = {
+        "temperature": round(temperature, 4),
+        "folds": args.folds,
+        "rows": len(df),
+        "log_loss_raw": round(_nll(proba, y, 1.0), 4),
+        "log_loss_calibrated": round(_nll(proba, y, temperature), 4),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Local store of /detect_disease results and per-district outbreak counters.
+
+Every detection is appended to `detections` (disease, severity, confidence,
+coarse location, time). Alongside, one `disease_rollups` row per
+state x district x disease keeps daily counts for the last RING_DAYS days as
+a ring (index 0 = the row's as_of day). A write shifts and bumps the ring of
+its row; a read slides the ring forward to today and sums the window, so
+trend queries cost the same for a week of history as for ten years. Rows
+with no detection inside the window are skipped by the as_of index, so a
+read touches only the district x disease pairs active in the window.
+
+    python disease_store.py trends --window 7
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+DB_PATH = os.environ.get("DISEASE_DB_PATH") or os.path.join(os.path.dirname(__file__), "data", "disease.db")
+
+RING_DAYS = 60  # enough for a 30-day window plus the 30 days before it
+WINDOWS = (7, 14, 30)
+COARSE_DEGREES = 0.1  # ~11 km; raw coordinates are never stored
+SEVERE = ("severe",)
+NOT_A_DISEASE = ("healthy", "unknown", "none", "")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    detected_at TEXT NOT NULL,
+    disease TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    confidence REAL,
+    state TEXT NOT NULL DEFAULT '',
+    district TEXT NOT NULL DEFAULT '',
+    lat REAL,
+    lon REAL
+);
+CREATE TABLE IF NOT EXISTS disease_rollups (
+    state_key TEXT NOT NULL,
+    district_key TEXT NOT NULL,
+    disease_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    district TEXT NOT NULL,
+    disease TEXT NOT NULL,
+    as_of INTEGER NOT NULL,
+    counts TEXT NOT NULL,
+    severe TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (state_key, district_key, disease_key)
+);
+CREATE INDEX IF NOT EXISTS idx_disease_rollups_disease ON disease_rollups (disease_key);
+CREATE INDEX IF NOT EXISTS idx_disease_rollups_as_of ON disease_rollups (as_of);
+"""
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+@contextmanager
+def connect(path=None):
+    path = path or DB_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL: a crash can lose the last commits, never corrupt
+        with _schema_lock:
+            if path not in _schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _schema_ready.add(path)
+        yield conn
+    finally:
+        conn.close()
+
+
+def normalize(text):
+    return " ".join(str(text or "").split())
+
+
+def coarse(lat, lon):
+    """Round coordinates to the COARSE_DEGREES grid, or (None, None) when missing/invalid"""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None, None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None, None
+    return round(round(lat / COARSE_DEGREES) * COARSE_DEGREES, 4), round(round(lon / COARSE_DEGREES) * COARSE_DEGREES, 4)
+
+
+def confidence_value(value):
+    """Model confidences arrive as 0..1 or 0..100; None when unusable"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if value > 1:
+        value /= 100.0
+    return min(max(value, 0.0), 1.0)
+
+
+def epoch_day(moment):
+    return int(moment.timestamp() // 86400)
+
+
+def _ring(text):
+    return [int(c) for c in text.split(",")]
+
+
+def slide(ring, as_of, day):
+    """The ring re-based from day `as_of` to a later `day` (older counts fall off the end)"""
+    gap = day - as_of
+    if gap <= 0:
+        return ring
+    if gap >= RING_DAYS:
+        return [0] * RING_DAYS
+    return [0] * gap + ring[:RING_DAYS - gap]
+
+
+def _bump(ring, as_of, day):
+    """Add one detection on `day` to a ring anchored at `as_of`; returns (ring, as_of)"""
+    if day > as_of:
+        ring, as_of = slide(ring, as_of, day), day
+    age = as_of - day
+    if age < RING_DAYS:
+        ring = ring[:age] + [ring[age] + 1] + ring[age + 1:]
+    return ring, as_of
+
+
+def record(result, state=None, district=None, lat=None, lon=None, detected_at=None, path=None):
+    """
+    Append one detection result ({"disease", "severity", "confidence"}) and update its rollup.
+    Healthy/unknown results are logged but not counted as cases. Returns the detection id.
+    """
+    moment = detected_at or datetime.now(timezone.utc)
+    stamp = moment.isoformat(timespec="seconds")
+    disease = normalize(result.get("disease")) or "Unknown"
+    severity = normalize(result.get("severity")).lower() or "none"
+    state, district = normalize(state), normalize(district)
+    lat, lon = coarse(lat, lon)
+    day = epoch_day(moment)
+    key = (state.lower(), district.lower(), disease.lower())
+
+    with connect(path) as conn:
+        conn.execute("BEGIN IMMEDIATE")  # read-modify-write of the rollup row
+        try:
+            detection_id = conn.execute(
+                """INSERT INTO detections (detected_at, disease, severity, confidence, state, district, lat, lon)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (stamp, disease, severity, confidence_value(result.get("confidence")), state, district, lat, lon),
+            ).lastrowid
+            if key[2] not in NOT_A_DISEASE and severity != "none":
+                row = conn.execute("""SELECT state, district, disease, as_of, counts, severe, total, first_seen,
+                                             last_seen FROM disease_rollups
+                                      WHERE state_key = ? AND district_key = ? AND disease_key = ?""", key).fetchone()
+                if row:
+                    # names keep the spelling they were first reported with
+                    state, district, disease, as_of, counts, severe, total, first_seen, last_seen = row
+                    counts, severe = _ring(counts), _ring(severe)
+                else:
+                    as_of, counts, severe, total = day, [0] * RING_DAYS, [0] * RING_DAYS, 0
+                    first_seen = last_seen = stamp
+                new_counts, new_as_of = _bump(counts, as_of, day)
+                if severity in SEVERE:
+                    severe, _ = _bump(severe, as_of, day)
+                else:
+                    severe = slide(severe, as_of, new_as_of)
+                conn.execute(
+                    """INSERT OR REPLACE INTO disease_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    key + (state, district, disease, new_as_of, ",".join(map(str, new_counts)),
+                           ",".join(map(str, severe)), total + 1, min(first_seen, stamp), max(last_seen, stamp)),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return detection_id
+
+
+def trends(window=7, state=None, district=None, disease=None, today=None, limit=50, path=None):
+    """
+    Case counts per district x disease over the last `window` days (and the `window` days
+    before, for growth), busiest first. Reads only the rollup rows matching the filters
+    that had a detection inside the window.
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"window must be one of {', '.join(map(str, WINDOWS))}")
+    day = epoch_day(today or datetime.now(timezone.utc))
+    # A row last bumped `window` or more days ago has nothing left in the window
+    clauses, args = ["as_of > ?"], [day - window]
+    for column, value in (("state_key", state), ("district_key", district), ("disease_key", disease)):
+        if value:
+            clauses.append(f"{column} = ?")
+            args.append(normalize(value).lower())
+    where = " WHERE " + " AND ".join(clauses)
+    sql = f"SELECT state, district, disease, as_of, counts, severe, total, last_seen FROM disease_rollups{where}"
+
+    out = []
+    with connect(path) as conn:
+        for state_name, district_name, disease_name, as_of, counts, severe, total, last_seen in conn.execute(sql, args):
+            counts = slide(_ring(counts), as_of, day)
+            cases = sum(counts[:window])
+            if not cases:
+                continue
+            previous = sum(counts[window:2 * window])
+            out.append({
+                "state": state_name,
+                "district": district_name,
+                "disease": disease_name,
+                "cases": cases,
+                "previous": previous,
+                "change_pct": round((cases - previous) / previous * 100, 1) if previous else None,
+                "severe": sum(slide(_ring(severe), as_of, day)[:window]),
+                "daily": counts[:window][::-1],  # oldest first, ending today
+                "total": total,
+                "last_seen": last_seen,
+                # at least 3 cases and double the previous window: worth a look
+                "rising": cases >= 3 and cases >= 2 * previous,
+            })
+    out.sort(key=lambda r: (-r["cases"], -r["severe"], r["state"], r["district"], r["disease"]))
+    return out[:limit]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Disease detection store and outbreak trends.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    show = sub.add_parser("trends", help="Show the busiest district x disease counters.")
+    show.add_argument("--window", type=int, default=7, choices=WINDOWS)
+    show.add_argument("--state")
+    show.add_argument("--disease")
+    show.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+
+    for row in trends(args.window, args.state, disease=args.disease, limit=args.limit):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Equipment rental listings and bookings (shared by the web and Flutter apps).
+
+Bookings live in SQLite; each equipment item also has an in-memory
+IntervalIndex of its confirmed bookings (sorted, non-overlapping), so
+availability and conflict checks are a binary search instead of a scan.
+
+Reservations use optimistic locking: every item carries a version that each
+booking or cancellation bumps. A reservation checks the index built for the
+version it read, then commits with `UPDATE ... WHERE version = ?`; if another
+worker or process got there first the update matches nothing, and the
+reservation reloads the index and tries again. No lock is held while checking.
+
+Times are epoch seconds; intervals are half-open [start, end).
+"""
+import math
+import os
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+DB_PATH = os.environ.get("EQUIPMENT_DB_PATH") or os.path.join(os.path.dirname(__file__), "data", "equipment.db")
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_ATTEMPTS = 8  # optimistic retries before giving up on a hot item
+EQUIPMENT_COLUMNS = ("id", "owner", "title", "category", "daily_rate", "location", "lat", "lon", "created_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS equipment (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    daily_rate REAL,
+    location TEXT NOT NULL DEFAULT '',
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_equipment_lat ON equipment (lat);
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY,
+    equipment_id INTEGER NOT NULL REFERENCES equipment (id),
+    renter TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'confirmed',
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_equipment ON bookings (equipment_id, status, start_ts);
+"""
+
+
+class BookingConflict(Exception):
+    def __init__(self, message, booking_id=None):
+        super().__init__(message)
+        self.booking_id = booking_id
+
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+@contextmanager
+def connect(path=None):
+    path = path or DB_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        with _schema_lock:
+            if path not in _schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _schema_ready.add(path)
+        yield conn
+    finally:
+        conn.close()
+
+
+def parse_time(value):
+    """ISO date or datetime (naive = UTC), or epoch seconds -> epoch seconds"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    moment = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def format_time(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="minutes")
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class IntervalIndex:
+    """
+    Non-overlapping [start, end) intervals sorted by start. Because confirmed bookings never
+    overlap, their ends are sorted too, so only the neighbour found by bisection can conflict.
+    """
+
+    def __init__(self, intervals=()):
+        self.items = sorted(intervals)  # (start, end, booking_id)
+
+    def conflict(self, start, end):
+        """The booked (start, end, id) overlapping [start, end), or None -- O(log n)"""
+        i = bisect_left(self.items, (end,))
+        if i and self.items[i - 1][1] > start:
+            return self.items[i - 1]
+        return None
+
+    def busy(self, start, end):
+        """Bookings overlapping [start, end), in order"""
+        i = bisect_right(self.items, (start,))
+        if i and self.items[i - 1][1] > start:
+            i -= 1
+        out = []
+        for item in self.items[i:]:
+            if item[0] >= end:
+                break
+            out.append(item)
+        return out
+
+    def add(self, start, end, booking_id):
+        """A new index with the interval added (the old one stays valid for concurrent readers)"""
+        index = IntervalIndex()
+        items = list(self.items)
+        items.insert(bisect_left(items, (start, end, booking_id)), (start, end, booking_id))
+        index.items = items
+        return index
+
+
+class BookingStore:
+    def __init__(self, path=None):
+        self.path = path
+        self._indexes = {}  # equipment id -> (version, IntervalIndex)
+        self._lock = threading.Lock()
+
+    # ---------------- Listings ----------------
+
+    def add_equipment(self, owner, title, lat, lon, category="", daily_rate=None, location=""):
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("lat/lon out of range")
+        created = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with connect(self.path) as conn:
+            cur = conn.execute(
+                """INSERT INTO equipment (owner, title, category, daily_rate, location, lat, lon, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (owner, title, category.strip().lower(), daily_rate, location, lat, lon, created))
+            conn.commit()
+        return self.get_equipment(cur.lastrowid)
+
+    def get_equipment(self, equipment_id):
+        with connect(self.path) as conn:
+            row = conn.execute(f"SELECT {', '.join(EQUIPMENT_COLUMNS)} FROM equipment WHERE id = ?",
+                               (equipment_id,)).fetchone()
+        if row is None:
+            raise LookupError(f"No equipment {equipment_id}")
+        return dict(zip(EQUIPMENT_COLUMNS, row))
+
+    # ---------------- Interval index ----------------
+
+    def _index(self, conn, equipment_id, version):
+        """The index for `equipment_id` as of `version`, reloaded from SQLite if ours is older"""
+        cached = self._indexes.get(equipment_id)
+        if cached and cached[0] == version:
+            return cached[1]
+        rows = conn.execute("""SELECT start_ts, end_ts, id FROM bookings
+                               WHERE equipment_id = ? AND status = 'confirmed'""", (equipment_id,)).fetchall()
+        index = IntervalIndex(rows)
+        with self._lock:
+            current = self._indexes.get(equipment_id)
+            if current is None or current[0] <= version:
+                self._indexes[equipment_id] = (version, index)
+        return index
+
+    def _version(self, conn, equipment_id):
+        row = conn.execute("SELECT version FROM equipment WHERE id = ?", (equipment_id,)).fetchone()
+        if row is None:
+            raise LookupError(f"No equipment {equipment_id}")
+        return row[0]
+
+    def availability(self, equipment_id, start, end):
+        """Booked intervals of one item inside [start, end)"""
+        with connect(self.path) as conn:
+            index = self._index(conn, equipment_id, self._version(conn, equipment_id))
+        return [{"booking_id": b, "start": format_time(s), "end": format_time(e)} for s, e, b in index.busy(start, end)]
+
+    # ---------------- Bookings ----------------
+
+    def reserve(self, equipment_id, renter, start, end):
+        """Book [start, end); raises BookingConflict when it overlaps a confirmed booking"""
+        if end <= start:
+            raise ValueError("end must be after start")
+        created = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with connect(self.path) as conn:
+            for _ in range(MAX_ATTEMPTS):
+                version = self._version(conn, equipment_id)
+                index = self._index(conn, equipment_id, version)
+                clash = index.conflict(start, end)
+                if clash:
+                    raise BookingConflict(f"Equipment {equipment_id} is booked from {format_time(clash[0])} "
+                                          f"to {format_time(clash[1])}", clash[2])
+                # compare-and-swap on the version; the booking commits only if nothing changed since the check
+                bumped = conn.execute("UPDATE equipment SET version = version + 1 WHERE id = ? AND version = ?",
+                                      (equipment_id, version)).rowcount
+                if not bumped:
+                    conn.rollback()
+                    continue
+                booking_id = conn.execute(
+                    """INSERT INTO bookings (equipment_id, renter, start_ts, end_ts, created_at)
+                       VALUES (?, ?, ?, ?, ?)""", (equipment_id, renter, start, end, created)).lastrowid
+                conn.commit()
+                with self._lock:
+                    current = self._indexes.get(equipment_id)
+                    if current is not None and current[0] == version:
+                        self._indexes[equipment_id] = (version + 1, index.add(start, end, booking_id))
+                return {"id": booking_id, "equipment_id": equipment_id, "renter": renter,
+                        "start": format_time(start), "end": format_time(end), "status": "confirmed"}
+        raise BookingConflict(f"Equipment {equipment_id} is busy, please retry")
+
+    def cancel(self, booking_id):
+        """Cancel a confirmed booking; returns False if there is none"""
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT equipment_id FROM bookings WHERE id = ? AND status = 'confirmed'",
+                               (booking_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("UPDATE bookings SET status = 'cancelled' WHERE id = ?", (booking_id,))
+            conn.execute("UPDATE equipment SET version = version + 1 WHERE id = ?", (row[0],))
+            conn.commit()
+        return True
+
+    # ---------------- Search ----------------
+
+    def search(self, lat, lon, start, end, radius_km=50, category=None, limit=20):
+        """Equipment free for all of [start, end) within radius_km of (lat, lon), nearest first"""
+        dlat = radius_km / 111.0
+        dlon = radius_km / max(111.0 * math.cos(math.radians(lat)), 1e-6)
+        sql = f"""SELECT {', '.join(EQUIPMENT_COLUMNS)}, version FROM equipment
+                  WHERE lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?"""
+        args = [lat - dlat, lat + dlat, lon - dlon, lon + dlon]
+        if category:
+            sql += " AND category = ?"
+            args.append(category.strip().lower())
+
+        results = []
+        with connect(self.path) as conn:
+            candidates = []
+            for row in conn.execute(sql, args):
+                item = dict(zip(EQUIPMENT_COLUMNS, row[:-1]))
+                km = haversine_km(lat, lon, item["lat"], item["lon"])
+                if km <= radius_km:
+                    candidates.append((km, row[-1], item))
+            candidates.sort(key=lambda c: (c[0], c[2]["id"]))
+            for km, version, item in candidates:
+                if self._index(conn, item["id"], version).conflict(start, end) is None:
+                    results.append({**item, "distance_km": round(km, 2)})
+                    if len(results) == limit:
+                        break
+        return results
@@ -0,0 +1,190 @@
+"""
+Local stand-in for the data.gov.in mandi price resource.
+
+Serves recorded or synthetic records with the same query parameters the real
+API understands (filters[...], limit, offset, sort[Arrival_Date]) so the price
+path can be exercised and load-tested offline.
+
+    python fake_datagov.py --records 20000 --latency-ms 150 --error-rate 0.02
+    PRICING_BASE_URL=http://127.0.0.1:8765/resource/35985678-0d79-46b4-9ed6-6f13308a1d24 python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify, request
+
+RESOURCE_ID = "35985678-0d79-46b4-9ed6-6f13308a1d24"
+
+MARKETS = {
+    "Maharashtra": {"Pune": ["Pune", "Junnar"], "Nashik": ["Lasalgaon", "Nashik"], "Nagpur": ["Kalamna"]},
+    "Punjab": {"Ludhiana": ["Khanna", "Ludhiana"], "Amritsar": ["Amritsar"]},
+    "Uttar Pradesh": {"Agra": ["Agra"], "Lucknow": ["Lucknow"], "Kanpur": ["Kanpur(Grain)"]},
+    "Karnataka": {"Bangalore": ["Binny Mill (F&V)"], "Kolar": ["Kolar"], "Mysore": ["Mysore (Bandipalya)"]},
+    "Gujarat": {"Rajkot": ["Rajkot"], "Ahmedabad": ["Ahmedabad"]},
+    "Madhya Pradesh": {"Indore": ["Indore"], "Bhopal": ["Bhopal"]},
+    "Tamil Nadu": {"Coimbatore": ["Coimbatore"], "Madurai": ["Madurai"]},
+    "West Bengal": {"Kolkata": ["Sealdah Koley Market"], "Burdwan": ["Burdwan"]},
+}
+
+COMMODITIES = {
+    "Rice": 3400, "Wheat": 2150, "Onion": 1800, "Tomato": 1500, "Potato": 1200,
+    "Cotton": 5700, "Maize": 1900, "Soyabean": 4300, "Green Chilli": 3000, "Banana": 2000,
+}
+
+FILTER_FIELDS = ("State", "District", "Market", "Commodity", "Variety", "Grade", "Arrival_Date")
+
+
+def generate_records(count=5000, days=30, seed=42, today=None):
+    """Build `count` synthetic mandi records spread over the last `days` days"""
+    rng = random.Random(seed)
+    today = today or datetime.now().date()
+    markets = [(s, d, m) for s, districts in MARKETS.items()
+               for d, ms in districts.items() for m in ms]
+    commodities = list(COMMODITIES.items())
+
+    records = []
+    for _ in range(count):
+        state, district, market = rng.choice(markets)
+        commodity, base = rng.choice(commodities)
+        day = today - timedelta(days=rng.randrange(days))
+        modal = round(base * rng.uniform(0.8, 1.2))
+        records.append({
+            "State": state,
+            "District": district,
+            "Market": market,
+            "Commodity": commodity,
+            "Variety": "Other",
+            "Grade": "FAQ",
+            "Arrival_Date": day.strftime("%d/%m/%Y"),
+            "Min_Price": str(round(modal * rng.uniform(0.85, 0.97))),
+            "Max_Price": str(round(modal * rng.uniform(1.03, 1.15))),
+            "Modal_Price": str(modal),
+        })
+    return records
+
+
+def load_records(path):
+    """Load records from a saved API response (dict with "records") or a plain JSON list"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["records"] if isinstance(data, dict) else data
+
+
+def _date_key(record):
+    try:
+        return datetime.strptime(record.get("Arrival_Date", ""), "%d/%m/%Y")
+    except ValueError:
+        return datetime.min
+
+
+class FakeDataGov:
+    def __init__(self, records, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests_served = 0
+
+        # Keep records in ascending date order and index every filterable field,
+        # so a query only touches the rows that can match.
+        self.records = sorted(records, key=_date_key)
+        self._index = {field: {} for field in FILTER_FIELDS}
+        for i, r in enumerate(self.records):
+            for field in FILTER_FIELDS:
+                value = r.get(field)
+                if value:
+                    self._index[field].setdefault(value.lower(), []).append(i)
+
+    def _inject(self):
+        """Sleep for the configured latency; return an error status if one is injected"""
+        with self._lock:
+            self.requests_served += 1
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return self.error_status if fail else None
+
+    def query(self, args):
+        """Answer one API call; `args` is a mapping of query parameters. Returns (status, payload)"""
+        status = self._inject()
+        if status:
+            return status, {"status": "error", "message": f"Injected upstream error ({status})"}
+
+        if not args.get("api-key"):
+            return 403, {"status": "error", "message": "Missing api-key"}
+
+        try:
+            limit = int(args.get("limit", 10))
+            offset = int(args.get("offset", 0))
+        except ValueError:
+            return 400, {"status": "error", "message": "limit and offset must be integers"}
+
+        candidates = None
+        for field in FILTER_FIELDS:
+            value = args.get(f"filters[{field}]")
+            if not value:
+                continue
+            rows = self._index[field].get(value.lower(), [])
+            candidates = rows if candidates is None else sorted(set(candidates).intersection(rows))
+        if candidates is None:
+            candidates = range(len(self.records))
+
+        if args.get("sort[Arrival_Date]", "").lower() == "desc":
+            candidates = candidates[::-1]
+
+        page = [self.records[i] for i in candidates[offset:offset + limit]]
+        return 200, {
+            "index_name": RESOURCE_ID,
+            "title": "Current Daily Price of Various Commodities from Various Markets (Mandi)",
+            "status": "ok",
+            "total": len(candidates),
+            "count": len(page),
+            "limit": str(limit),
+            "offset": str(offset),
+            "records": page,
+        }
+
+
+def create_app(fake):
+    app = Flask(__name__)
+
+    @app.route("/resource/<resource_id>", methods=["GET"])
+    def resource(resource_id):
+        status, payload = fake.query(request.args)
+        return jsonify(payload), status
+
+    @app.route("/_stats", methods=["GET"])
+    def stats():
+        return jsonify({"records": len(fake.records), "requests_served": fake.requests_served})
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline stand-in for the data.gov.in mandi price API.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--replay", help="JSON file with recorded API records (default: synthetic data).")
+    ap.add_argument("--records", type=int, default=5000, help="Number of synthetic records to generate.")
+    ap.add_argument("--days", type=int, default=30, help="Spread synthetic records over this many days.")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request.")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the latency.")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0..1).")
+    ap.add_argument("--error-status", type=int, default=503, help="HTTP status for injected failures.")
+    args = ap.parse_args()
+
+    records = load_records(args.replay) if args.replay else generate_records(args.records, args.days, args.seed)
+    fake = FakeDataGov(records, args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.seed)
+    print(f"Serving {len(records)} records at http://127.0.0.1:{args.port}/resource/{RESOURCE_ID}")
+    create_app(fake).run(port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+HTTP caching and compression for read endpoints.
+
+    @app.route("/find_schemes")
+    @http_cache.conditional(lambda: scheme_engine.version, max_age=3600)
+    def find_schemes(): ...
+
+    http_cache.init_compression(app)
+
+conditional() derives a weak ETag from the route, the query string and the
+version of the data snapshot the response is built from (never from the
+body), answers a matching If-None-Match with 304 before the view runs, and
+sets Cache-Control so a CDN or reverse proxy can absorb repeated polls. When
+the version is only known once the view has run (e.g. a fresh upstream
+fetch), the version callable may return None beforehand; If-None-Match is
+then checked against the tag computed after the view.
+
+init_compression() negotiates brotli (when the `brotli` package is
+installed) or gzip for buffered responses above a size threshold. ETags are
+weak, so one tag covers every encoding of the same data.
+"""
+import gzip
+import zlib
+from functools import wraps
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def query_key(items):
+    """Order-independent form of the query string's (key, value) pairs"""
+    return "&".join(sorted(f"{k}={v}" for k, v in items))
+
+
+def make_etag(route, version, query=""):
+    key = f"{route}|{version}|{query}"
+    return f'W/"{zlib.crc32(key.encode("utf-8")):08x}-{len(key):x}"'
+
+
+def etag_matches(if_none_match, tag):
+    """Weak comparison of an If-None-Match header value against `tag` (W/ prefixes ignored, * matches)"""
+    if not if_none_match:
+        return False
+    opaque = tag[2:] if tag.startswith("W/") else tag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def conditional(version, max_age=60, scope="public", stale_while_revalidate=None):
+    """
+    Decorator for GET views. `version()` returns the current snapshot version of the
+    data behind the response (any str()-able value), or None when unknown until the view runs.
+    """
+    cache_control = f"{scope}, max-age={max_age}"
+    if stale_while_revalidate:
+        cache_control += f", stale-while-revalidate={stale_while_revalidate}"
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            from flask import Response, make_response, request
+
+            query = query_key(request.args.items(multi=True))
+            current = version()
+            if current is not None:
+                tag = make_etag(request.path, current, query)
+                if etag_matches(request.headers.get("If-None-Match"), tag):
+                    return Response(status=304, headers={"ETag": tag, "Cache-Control": cache_control})
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if current is None:
+                current = version()
+                if current is None:
+                    return response
+                tag = make_etag(request.path, current, query)
+                if etag_matches(request.headers.get("If-None-Match"), tag):
+                    # Same data the client already holds; the body just built is dropped
+                    return Response(status=304, headers={"ETag": tag, "Cache-Control": cache_control})
+            response.headers["ETag"] = tag
+            response.headers["Cache-Control"] = cache_control
+            return response
+        return wrapped
+    return decorator
+
+
+def _negotiate(accept_encodings):
+    offers = (["br"] if brotli is not None else []) + ["gzip"]
+    return accept_encodings.best_match(offers)
+
+
+def init_compression(app, min_size=1024, gzip_level=6, brotli_quality=5):
+    """Compress buffered text/JSON responses of at least `min_size` bytes"""
+    from flask import request
+
+    @app.after_request
+    def _compress(response):
+        if (response.direct_passthrough or response.is_streamed or not 200 <= response.status_code < 300
+                or response.status_code == 204 or "Content-Encoding" in response.headers):
+            return response
+        mimetype = response.mimetype or ""
+        if not (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        encoding = _negotiate(request.accept_encodings)
+        if encoding == "br":
+            body = brotli.compress(body, quality=brotli_quality)
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=gzip_level)
+        else:
+            return response
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        return response
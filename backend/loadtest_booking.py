@@ -0,0 +1,141 @@
+"""
+Load test for concurrent equipment bookings.
+
+Starts the backend in-process on a throwaway equipment database (or targets a
+running one), lists a few items, then fires overlapping booking requests at
+them from many threads. Besides throughput and latency it checks the outcome:
+every item's confirmed bookings must be non-overlapping.
+
+    python loadtest_booking.py --requests 2000 --concurrency 32 --items 20
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from loadtest_price import percentile, serve_in_thread
+
+CENTER = (30.9, 75.85)  # Ludhiana
+
+
+def start_in_process():
+    """Run the backend on a fresh equipment database; returns its base URL"""
+    os.environ["EQUIPMENT_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bookings-"), "equipment.db")
+    import app as backend
+
+    backend.bookings.path = os.environ["EQUIPMENT_DB_PATH"]  # even if config.json names another store
+    _, target = serve_in_thread(backend.app)
+    return target
+
+
+def seed_items(target, count, rng):
+    ids = []
+    for i in range(count):
+        body = {"owner": f"owner-{i}", "title": f"Tractor {i}", "category": "vehicles", "daily_rate": 2500,
+                "lat": CENTER[0] + rng.uniform(-0.3, 0.3), "lon": CENTER[1] + rng.uniform(-0.3, 0.3)}
+        resp = requests.post(f"{target}/equipment", json=body, timeout=30)
+        resp.raise_for_status()
+        ids.append(resp.json()["id"])
+    return ids
+
+
+def plan_bookings(ids, total, days, rng):
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    plan = []
+    for i in range(total):
+        start = today + timedelta(days=rng.randrange(days))
+        plan.append((rng.choice(ids), {"renter": f"renter-{i}", "start": start.isoformat(),
+                                       "end": (start + timedelta(days=rng.randint(1, 3))).isoformat()}))
+    return plan, today
+
+
+def overlaps(target, ids, horizon_start, days):
+    """Pairs of overlapping confirmed bookings across all items (must be 0)"""
+    params = {"start": horizon_start.isoformat(), "end": (horizon_start + timedelta(days=days + 5)).isoformat()}
+    bad = 0
+    for equipment_id in ids:
+        booked = requests.get(f"{target}/equipment/{equipment_id}/availability", params=params, timeout=30).json()
+        spans = sorted((b["start"], b["end"]) for b in booked["booked"])
+        bad += sum(1 for a, b in zip(spans, spans[1:]) if b[0] < a[1])
+    return bad
+
+
+def run(target, total, concurrency, items, days, seed=0):
+    rng = random.Random(seed)
+    ids = seed_items(target, items, rng)
+    plan, today = plan_bookings(ids, total, days, rng)
+    local = threading.local()
+
+    def one(job):
+        equipment_id, body = job
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        t0 = time.perf_counter()
+        try:
+            status = session.post(f"{target}/equipment/{equipment_id}/bookings", json=body, timeout=60).status_code
+        except requests.RequestException:
+            status = None
+        return status, (time.perf_counter() - t0) * 1000.0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        t_start = time.perf_counter()
+        results = list(pool.map(one, plan))
+        elapsed = time.perf_counter() - t_start
+
+    latencies = sorted(ms for _, ms in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        "target": target,
+        "requests": total,
+        "concurrency": concurrency,
+        "items": items,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "status_counts": statuses,
+        "overlapping_bookings": overlaps(target, ids, today, days),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test concurrent equipment bookings.")
+    ap.add_argument("--target", help="Base URL of a running backend (default: start one in-process).")
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--items", type=int, default=20, help="Equipment items to book (fewer = more contention).")
+    ap.add_argument("--days", type=int, default=30, help="Booking start dates are spread over this many days.")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = ap.parse_args()
+
+    target = args.target or start_in_process()
+    report = run(target, args.requests, args.concurrency, args.items, args.days, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"Target:      {report['target']}/equipment/<id>/bookings")
+    print(f"Requests:    {report['requests']} @ concurrency {report['concurrency']} over {report['items']} items")
+    print(f"Throughput:  {report['throughput_rps']} req/s over {report['elapsed_s']} s")
+    print(f"Latency ms:  p50 {report['p50_ms']}  p95 {report['p95_ms']}  "
+          f"p99 {report['p99_ms']}  max {report['max_ms']}")
+    print(f"Statuses:    {report['status_counts']}  (201 booked, 409 conflict)")
+    print(f"Overlaps:    {report['overlapping_bookings']}")
+
+
+if __name__ == "__main__":
+    main()
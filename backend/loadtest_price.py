@@ -0,0 +1,139 @@
+"""
+Load test for /get_price.
+
+By default this starts the fake data.gov.in server and the backend in-process
+(both on ephemeral ports) and drives /get_price through them, so it runs
+without network access or an API key:
+
+    python loadtest_price.py --requests 500 --concurrency 16 --latency-ms 120
+
+Point --target at an already running backend to test that instead.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import make_server
+
+import fake_datagov
+
+QUERIES = [
+    {"state": "Maharashtra", "filter": "7days"},
+    {"state": "Punjab", "commodity": "Wheat", "filter": "15days"},
+    {"commodity": "Onion", "filter": "today"},
+    {"state": "Karnataka", "commodity": "Tomato", "market": "Kolar", "filter": "all"},
+    {"state": "Uttar Pradesh", "filter": "all", "limit": 500},
+]
+
+
+def serve_in_thread(wsgi_app):
+    """Start a threaded WSGI server on a free port and return (server, base_url)"""
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, wsgi_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def start_in_process(args):
+    """Run the fake upstream and the backend app locally; returns the backend base URL"""
+    records = (fake_datagov.load_records(args.replay) if args.replay
+               else fake_datagov.generate_records(args.records, seed=args.seed))
+    fake = fake_datagov.FakeDataGov(records, args.latency_ms, args.jitter_ms,
+                                    args.error_rate, args.error_status, args.seed)
+    _, upstream = serve_in_thread(fake_datagov.create_app(fake))
+    os.environ["PRICING_BASE_URL"] = f"{upstream}/resource/{fake_datagov.RESOURCE_ID}"
+    os.environ.setdefault("PRICING_API_KEY", "offline-test-key")
+
+    import app as backend  # reads PRICING_BASE_URL at import time
+    backend.price_pages.ttl = 0  # exercise the upstream path on every request, not the page cache
+    backend.price_api.quota = None  # the fake isn't the shared upstream; don't rate limit it
+    _, target = serve_in_thread(backend.app)
+    return target
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run(target, total, concurrency, seed=0, warmup=10):
+    rng = random.Random(seed)
+    plan = [rng.choice(QUERIES) for _ in range(total)]
+    local = threading.local()
+
+    def one(params):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        t0 = time.perf_counter()
+        try:
+            status = session.get(f"{target}/get_price", params=params, timeout=60).status_code
+        except requests.RequestException:
+            status = None
+        return status, (time.perf_counter() - t0) * 1000.0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, plan[:warmup]))
+        t_start = time.perf_counter()
+        results = list(pool.map(one, plan))
+        elapsed = time.perf_counter() - t_start
+
+    latencies = sorted(ms for _, ms in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        "target": target,
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "status_counts": statuses,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test /get_price against the offline data.gov.in stand-in.")
+    ap.add_argument("--target", help="Base URL of a running backend (default: start one in-process).")
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--replay", help="Recorded API records for the fake upstream.")
+    ap.add_argument("--records", type=int, default=5000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = ap.parse_args()
+
+    target = args.target or start_in_process(args)
+    report = run(target, args.requests, args.concurrency, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"Target:      {report['target']}/get_price")
+    print(f"Requests:    {report['requests']} @ concurrency {report['concurrency']}")
+    print(f"Throughput:  {report['throughput_rps']} req/s over {report['elapsed_s']} s")
+    print(f"Latency ms:  p50 {report['p50_ms']}  p95 {report['p95_ms']}  "
+          f"p99 {report['p99_ms']}  max {report['max_ms']}")
+    print(f"Statuses:    {report['status_counts']}")
+
+
+if __name__ == "__main__":
+    main()
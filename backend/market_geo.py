@@ -0,0 +1,87 @@
+"""
+Market geocoordinates and nearest-mandi lookups.
+
+Markets are loaded from a CSV (state, district, market, latitude, longitude)
+into a haversine BallTree, so k-nearest queries stay sub-millisecond even with
+thousands of mandis.
+"""
+import csv
+import os
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_LOCATIONS_PATH = os.path.join(os.path.dirname(__file__), "market_locations.csv")
+
+
+class MarketIndex:
+    def __init__(self, markets):
+        """`markets` is a list of dicts with state, district, market, latitude, longitude"""
+        if not markets:
+            raise ValueError("MarketIndex needs at least one market")
+        self.markets = markets
+        coords = np.radians([[m["latitude"], m["longitude"]] for m in markets])
+        self._tree = BallTree(coords, metric="haversine")
+
+    @classmethod
+    def from_csv(cls, path=DEFAULT_LOCATIONS_PATH):
+        markets = []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    lat, lon = float(row["latitude"]), float(row["longitude"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                markets.append({
+                    "state": row.get("state", "").strip(),
+                    "district": row.get("district", "").strip(),
+                    "market": row.get("market", "").strip(),
+                    "latitude": lat,
+                    "longitude": lon,
+                })
+        return cls(markets)
+
+    def __len__(self):
+        return len(self.markets)
+
+    def nearest(self, lat, lon, k=5, max_km=None):
+        """Return [(market, distance_km)] for the k markets closest to (lat, lon), nearest first,
+        leaving out any further than `max_km`"""
+        k = max(1, min(int(k), len(self.markets)))
+        dist, idx = self._tree.query(np.radians([[lat, lon]]), k=k)
+        found = [(self.markets[i], float(d) * EARTH_RADIUS_KM) for d, i in zip(dist[0], idx[0])]
+        if max_km is not None:
+            found = [(m, km) for m, km in found if km <= max_km]
+        return found
+
+
+def nearby_prices(index, latest, lat, lon, k=5, max_km=None, sort="distance"):
+    """
+    Join the nearest markets with their latest prices.
+
+    `latest` maps (state, market) in lower case to a price row (see
+    price_store.latest_by_market). Markets without a price for the commodity are
+    skipped, widening the search until k priced markets are found.
+    """
+    results = []
+    want = max(1, int(k))
+    probe = min(len(index), want * 4)
+    while True:
+        results = []
+        for m, km in index.nearest(lat, lon, probe):
+            if max_km is not None and km > max_km:
+                break
+            row = latest.get((m["state"].lower(), m["market"].lower()))
+            if row:
+                results.append({**row, "latitude": m["latitude"], "longitude": m["longitude"],
+                                "distance_km": round(km, 2)})
+                if len(results) == want:
+                    break
+        if len(results) == want or probe >= len(index) or (max_km is not None and km > max_km):
+            break
+        probe = min(len(index), probe * 4)
+
+    if sort == "price":
+        results.sort(key=lambda r: (r["modal_price"] is None, r["modal_price"], r["distance_km"]))
+    return results
@@ -0,0 +1,254 @@
+"""
+Request metrics and stage timings in Prometheus text format.
+
+    with metrics.span("model_predict"):
+        model.predict(features)
+
+Per-route request counts, status codes and latency histograms are recorded by
+init_app (Flask) or ASGIMetricsMiddleware (async routes). Stage spans land in
+a histogram and, while a request is being traced, in that request's trace,
+which is written to the slow-request log when the request exceeds the
+configured threshold.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace = contextvars.ContextVar("agri_trace", default=None)
+slow_log = logging.getLogger("agri.slow_requests")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+_registry = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+_collectors = []
+
+
+def add_collector(fn):
+    """Register a callable run before every render, for gauges that need refreshing on scrape"""
+    _collectors.append(fn)
+
+
+def render():
+    """All registered metrics in Prometheus text exposition format"""
+    for fn in _collectors:
+        fn()
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUESTS = counter("agri_http_requests_total", "HTTP requests by route, method and status.",
+                   ("route", "method", "status"))
+REQUEST_LATENCY = histogram("agri_http_request_duration_seconds", "HTTP request latency by route.",
+                            ("route", "method"))
+STAGE_LATENCY = histogram("agri_stage_duration_seconds", "Time spent in internal request stages.",
+                          ("stage",))
+
+# Threshold (seconds) above which a request's trace is written to the slow log; None disables it
+slow_request_seconds = None
+
+
+@contextmanager
+def span(stage):
+    """Time a block as an internal stage of the current request"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append((stage, elapsed))
+
+
+def start_trace():
+    return _current_trace.set([])
+
+
+def finish_request(token, route, method, status, seconds):
+    """Record a finished request and emit a slow-request trace if it went over the threshold"""
+    spans = _current_trace.get() or []
+    _current_trace.reset(token)
+    REQUESTS.inc(route=route, method=method, status=status)
+    REQUEST_LATENCY.observe(seconds, route=route, method=method)
+    if slow_request_seconds is not None and seconds >= slow_request_seconds:
+        slow_log.warning(json.dumps({
+            "route": route,
+            "method": method,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 2),
+            "spans": [{"stage": s, "ms": round(t * 1000, 3)} for s, t in spans],
+        }))
+
+
+def configure(slow_request_ms=None, slow_log_path=None):
+    global slow_request_seconds
+    slow_request_seconds = slow_request_ms / 1000.0 if slow_request_ms is not None else None
+    if slow_log_path and not any(isinstance(h, logging.FileHandler) for h in slow_log.handlers):
+        handler = logging.FileHandler(slow_log_path)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_log.addHandler(handler)
+        slow_log.setLevel(logging.INFO)
+
+
+def init_app(app):
+    """Record per-route request metrics for a Flask app"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_t0 = time.perf_counter()
+        g._metrics_token = start_trace()
+
+    @app.after_request
+    def _record_request(response):
+        token = g.pop("_metrics_token", None)
+        if token is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        seconds = time.perf_counter() - g.pop("_metrics_t0")
+        finish_request(token, route, request.method, response.status_code, seconds)
+        if response.status_code >= 500 and not response.is_streamed and response.is_json:
+            app.logger.error(f"{request.method} {route} -> {response.status_code}: "
+                             f"{(response.get_json(silent=True) or {}).get('error')}")
+        return response
+
+
+class ASGIMetricsMiddleware:
+    """Pure ASGI middleware recording the same request metrics for one async route"""
+
+    def __init__(self, app, route):
+        self.app = app
+        self.route = route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        token = start_trace()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish_request(token, self.route, scope.get("method", ""), status, time.perf_counter() - t0)
@@ -0,0 +1,249 @@
+"""
+Streaming modal-price anomaly detection for the local price store.
+
+Each series (commodity x market x variety) keeps a robust EWMA of log modal
+price: a level and a mean absolute deviation, four numbers per series stored
+next to the prices. process() scores only the rows changed since its last
+run (by store version, in arrival order) and updates the touched series in
+chunks, so neither memory nor work grows with history or series count.
+
+A price whose deviation exceeds FLAG_SCORE robust standard deviations is
+recorded in price_alerts as "flagged". Beyond QUARANTINE_SCORE and at least
+QUARANTINE_RATIO times off the expected price (almost always a data-entry
+slip such as an extra digit) it is "quarantined" and hidden from /get_price
+until an admin releases it. Outliers update the series winsorized,
+so a genuine shift in level is absorbed over a few days rather than ignored.
+
+    python price_anomaly.py process
+    python price_anomaly.py alerts --limit 20
+"""
+import argparse
+import json
+import math
+import threading
+from datetime import datetime, timezone
+
+import metrics
+import price_store
+
+ALPHA = 0.1  # EWMA weight of a new observation once a series is warmed up
+MIN_HISTORY = 5  # observations before a series is scored
+FLAG_SCORE = 4.0
+QUARANTINE_SCORE = 8.0
+QUARANTINE_RATIO = 3.0  # real shortages rarely triple a mandi price overnight; typos do
+MIN_SCALE = 0.05  # floor on the log-price scale (~5%) so flat series don't flag ordinary noise
+MAD_TO_SIGMA = math.sqrt(math.pi / 2)  # E|x - mean| = sigma * sqrt(2 / pi) for normal noise
+STATUSES = ("flagged", "quarantined", "released", "confirmed")
+ALERT_COLUMNS = ("id", "price_id", "detected_at", "arrival_date", "state", "district", "market", "commodity",
+                 "variety", "modal_price", "expected_price", "score", "kind", "status")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS anomaly_series (
+    series TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    level REAL NOT NULL,
+    dev REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS price_alerts (
+    id INTEGER PRIMARY KEY,
+    price_id INTEGER NOT NULL,
+    detected_at TEXT NOT NULL,
+    arrival_date TEXT NOT NULL,
+    state TEXT NOT NULL,
+    district TEXT NOT NULL,
+    market TEXT NOT NULL,
+    commodity TEXT NOT NULL,
+    variety TEXT NOT NULL,
+    modal_price REAL NOT NULL,
+    expected_price REAL NOT NULL,
+    score REAL NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_alerts_status ON price_alerts (status);
+"""
+
+ANOMALIES = metrics.counter("agri_price_anomalies_total", "Modal prices flagged by the anomaly detector.",
+                            ("kind", "status"))
+
+SQL_BATCH = 900  # stays under SQLite's bound-parameter limit on old builds
+_ready = set()
+_process_lock = threading.Lock()
+
+
+def connect(path=None):
+    """price_store.connect, with the anomaly tables created on first use"""
+    key = path or price_store.DB_PATH
+    if key not in _ready:
+        with price_store.connect(path) as conn:
+            conn.executescript(SCHEMA)
+        _ready.add(key)
+    return price_store.connect(path)
+
+
+def series_key(commodity, state, market, variety):
+    return "|".join(v.strip().lower() for v in (commodity, state, market, variety))
+
+
+def score(stats, x):
+    """Robust z-score of log price `x` against (n, level, dev); None while the series is warming up"""
+    n, level, dev = stats
+    if n < MIN_HISTORY:
+        return None
+    return (x - level) / max(dev * MAD_TO_SIGMA, MIN_SCALE)
+
+
+def update(stats, x):
+    """Fold log price `x` into (n, level, dev), clipped to FLAG_SCORE deviations once warmed up"""
+    n, level, dev = stats
+    if n == 0:
+        return 1, x, 0.0
+    if n >= MIN_HISTORY:
+        limit = FLAG_SCORE * max(dev * MAD_TO_SIGMA, MIN_SCALE)
+        x = min(max(x, level - limit), level + limit)
+    alpha = max(ALPHA, 1.0 / (n + 1))  # running mean while the series is young
+    dev = (1 - alpha) * dev + alpha * abs(x - level)
+    level = (1 - alpha) * level + alpha * x
+    return n + 1, level, dev
+
+
+def _meta(conn, key, default=0):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return int(row[0]) if row else default
+
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def revision(path=None):
+    """Changes whenever alerts are added or their status changes (for caches and ETags)"""
+    with connect(path) as conn:
+        return _meta(conn, "anomaly_revision")
+
+
+def process(path=None, chunk_size=5000):
+    """Score and fold in every row changed since the last run; returns a summary dict"""
+    scanned = 0
+    alerts = []
+    detected_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with _process_lock, connect(path) as conn:
+        since = _meta(conn, "anomaly_version")
+        until = _meta(conn, "version")
+        cur = conn.execute(
+            """SELECT id, arrival_date, state, district, market, commodity, variety, modal_price FROM prices
+               WHERE version > ? AND version <= ? AND modal_price > 0 ORDER BY arrival_date, id""", (since, until))
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            scanned += len(rows)
+            keys = {series_key(r[5], r[2], r[4], r[6]) for r in rows}
+            stats = {k: (0, 0.0, 0.0) for k in keys}
+            keys = list(keys)
+            for i in range(0, len(keys), SQL_BATCH):
+                batch = keys[i:i + SQL_BATCH]
+                for series, n, level, dev in conn.execute(
+                        f"SELECT series, n, level, dev FROM anomaly_series WHERE series IN ({', '.join('?' * len(batch))})",
+                        batch):
+                    stats[series] = (n, level, dev)
+
+            for price_id, day, state, district, market, commodity, variety, modal in rows:
+                key = series_key(commodity, state, market, variety)
+                x = math.log(modal)
+                z = score(stats[key], x)
+                if z is not None and abs(z) >= FLAG_SCORE:
+                    gross = abs(x - stats[key][1]) >= math.log(QUARANTINE_RATIO)
+                    status = "quarantined" if abs(z) >= QUARANTINE_SCORE and gross else "flagged"
+                    alerts.append((price_id, detected_at, day, state, district, market, commodity, variety, modal,
+                                   round(math.exp(stats[key][1]), 2), round(z, 2),
+                                   "spike" if z > 0 else "drop", status))
+                stats[key] = update(stats[key], x)
+
+            conn.executemany("INSERT OR REPLACE INTO anomaly_series (series, n, level, dev) VALUES (?, ?, ?, ?)",
+                             [(k,) + v for k, v in stats.items()])
+
+        conn.executemany(f"INSERT INTO price_alerts ({', '.join(ALERT_COLUMNS[1:])}) "
+                         f"VALUES ({', '.join('?' * (len(ALERT_COLUMNS) - 1))})", alerts)
+        _set_meta(conn, "anomaly_version", until)
+        if alerts:
+            _set_meta(conn, "anomaly_revision", _meta(conn, "anomaly_revision") + 1)
+        conn.commit()
+
+    for alert in alerts:
+        ANOMALIES.inc(kind=alert[-2], status=alert[-1])
+    return {"scanned": scanned, "alerts": len(alerts), "version": until}
+
+
+def list_alerts(after=None, limit=100, status=None, commodity=None, state=None, market=None, path=None):
+    """Alerts with id > `after` in ascending order (a polling feed), or the newest `limit` without it"""
+    clauses, args = [], []
+    if after is not None:
+        clauses.append("id > ?")
+        args.append(after)
+    if status:
+        clauses.append("status = ?")
+        args.append(status)
+    for column, value in (("commodity", commodity), ("state", state), ("market", market)):
+        if value:
+            clauses.append(f"{column} = ? COLLATE NOCASE")
+            args.append(value)
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    order = "ASC" if after is not None else "DESC"
+    sql = f"SELECT {', '.join(ALERT_COLUMNS)} FROM price_alerts{where} ORDER BY id {order} LIMIT ?"
+    with connect(path) as conn:
+        return [dict(zip(ALERT_COLUMNS, r)) for r in conn.execute(sql, args + [limit])]
+
+
+def set_status(alert_id, status, path=None):
+    """Release, confirm or re-quarantine an alert; returns False if there is no such alert"""
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+    with price_store._write_lock, connect(path) as conn:
+        updated = conn.execute("UPDATE price_alerts SET status = ? WHERE id = ?", (status, alert_id)).rowcount
+        if updated:
+            _set_meta(conn, "anomaly_revision", _meta(conn, "anomaly_revision") + 1)
+        conn.commit()
+    return bool(updated)
+
+
+_flag_cache = price_store.LRUCache(64)
+
+
+def flags(path=None):
+    """
+    {(arrival_date, state, market, commodity, variety, modal_price): status} for flagged and
+    quarantined prices, in lower case with ISO dates; cached per revision for the /get_price hot path.
+    """
+    current = revision(path)
+    key = path or price_store.DB_PATH
+    cached = _flag_cache.get(key)
+    if cached and cached[0] == current:
+        return cached[1]
+    sql = """SELECT arrival_date, state, market, commodity, variety, modal_price, status FROM price_alerts
+             WHERE status IN ('flagged', 'quarantined')"""
+    with connect(path) as conn:
+        found = {(d, s.lower(), m.lower(), c.lower(), v.lower(), p): status
+                 for d, s, m, c, v, p, status in conn.execute(sql)}
+    _flag_cache.put(key, (current, found))
+    return found
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Modal price anomaly detection over the local store.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("process", help="Score rows changed since the last run.")
+    alerts = sub.add_parser("alerts", help="Show the newest alerts.")
+    alerts.add_argument("--limit", type=int, default=20)
+    alerts.add_argument("--status", choices=STATUSES)
+    args = ap.parse_args()
+
+    if args.cmd == "process":
+        print(json.dumps(process()))
+    else:
+        for alert in list_alerts(limit=args.limit, status=args.status):
+            print(json.dumps(alert))
+
+
+if __name__ == "__main__":
+    main()
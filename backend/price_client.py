@@ -0,0 +1,225 @@
+"""
+Shared client for the data.gov.in mandi price API.
+
+One pooled requests.Session per client (HTTP keep-alive, gzip), retries with
+backoff on connection errors and transient 5xx responses, optional quota
+gating (quota.UpstreamQuota), page iteration and typed records:
+
+    client = PriceClient(api_key)
+    for record in client.iter_records(filters(state="Punjab"), max_records=5000):
+        print(record.arrival_date, record.commodity, record.modal_price)
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+RESOURCE_ID = "35985678-0d79-46b4-9ed6-6f13308a1d24"
+BASE_URL = "https://api.data.gov.in/resource"
+DEFAULT_URL = f"{BASE_URL}/{RESOURCE_ID}"
+
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d")
+TEXT_FIELDS = ("State", "District", "Market", "Commodity", "Variety", "Grade")
+PRICE_FIELDS = ("Min_Price", "Max_Price", "Modal_Price")
+# 429/503 mean "slow down": left to the quota (or iter_pages) rather than hammered by urllib3
+RETRY_STATUSES = (500, 502, 504)
+
+
+def parse_date(value) -> Optional[date]:
+    """API dates are dd/mm/YYYY; ISO dates (as stored locally) are accepted too"""
+    text = str(value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_price(value) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _field(record, key):
+    """Records use Title_Case keys on some resources and lower_case on others"""
+    return record.get(key) if key in record else record.get(key.lower())
+
+
+class PriceRecord(NamedTuple):
+    arrival_date: date
+    state: str
+    district: str
+    market: str
+    commodity: str
+    variety: str
+    grade: str
+    min_price: Optional[float]
+    max_price: Optional[float]
+    modal_price: Optional[float]
+
+    @classmethod
+    def from_api(cls, record):
+        """Parse a raw API record (either key casing); None when it has no valid date"""
+        day = parse_date(_field(record, "Arrival_Date"))
+        if day is None:
+            return None
+        text = [(_field(record, k) or "").strip() for k in TEXT_FIELDS]
+        return cls(day, *text, *(parse_price(_field(record, k)) for k in PRICE_FIELDS))
+
+
+def filters(commodity=None, state=None, market=None, district=None):
+    """API filter parameters for the given fields (None/empty values are skipped)"""
+    fields = (("Commodity", commodity), ("State", state), ("Market", market), ("District", district))
+    return {f"filters[{name}]": value for name, value in fields if value}
+
+
+def filter_recent(records, days=7, today_only=False, today=None, keep_unparsed=False):
+    """
+    Raw records that arrived today (today_only) or within the last `days` days. With
+    keep_unparsed, records whose Arrival_Date is set but not a recognisable date are kept too.
+    """
+    today = today or date.today()
+    cutoff = today - timedelta(days=days)
+    out = []
+    for record in records:
+        raw = _field(record, "Arrival_Date")
+        day = parse_date(raw)
+        if day is None:
+            if keep_unparsed and str(raw or "").strip():
+                out.append(record)
+        elif day == today if today_only else day >= cutoff:
+            out.append(record)
+    return out
+
+
+class CachedPage(NamedTuple):
+    expires: float
+    version: str
+    records: list
+
+
+class PageCache:
+    """
+    Recently fetched raw pages, reused for `ttl` seconds. Each page carries a snapshot
+    version: the resource's updated_date/total when the API reports them (so refetching
+    unchanged data keeps the version), else a fetch counter.
+    """
+
+    def __init__(self, ttl=60, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self._fetches = 0
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None or page.expires < time.monotonic():
+                return None
+            self._pages.move_to_end(key)
+            return page
+
+    def version(self, key):
+        page = self.get(key)
+        return page.version if page else None
+
+    def put(self, key, payload):
+        with self._lock:
+            self._fetches += 1
+            if payload.get("updated_date"):
+                version = f"{payload['updated_date']}:{payload.get('total', '')}"
+            else:
+                version = f"f{self._fetches}"
+            page = CachedPage(time.monotonic() + self.ttl, version, payload.get("records") or [])
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+            return page
+
+
+class PriceClient:
+    def __init__(self, api_key, url=DEFAULT_URL, timeout=30, retries=3, backoff=0.5, pool_size=20, quota=None):
+        self.api_key = (api_key or "").strip()
+        self.url = url
+        self.timeout = timeout
+        self.backoff = backoff
+        self.quota = quota
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=frozenset(["GET"]), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def params(self, filters=None, limit=1000, offset=0, sort_by_date=True):
+        params = {"api-key": self.api_key, "format": "json", "limit": limit, "offset": offset}
+        if sort_by_date:
+            params["sort[Arrival_Date]"] = "desc"
+        params.update(filters or {})
+        return params
+
+    def get_page(self, filters=None, limit=1000, offset=0, priority="interactive", sort_by_date=True):
+        """
+        One raw page response (status not checked). With a quota the call first waits
+        for a token (raising quota.QuotaExceeded past the deadline) and reports the status back.
+        """
+        if self.quota is not None:
+            self.quota.acquire(priority)
+        with metrics.span("upstream_fetch"):
+            resp = self.session.get(self.url, params=self.params(filters, limit, offset, sort_by_date),
+                                    timeout=self.timeout)
+        if self.quota is not None:
+            self.quota.report(resp.status_code, resp.headers.get("Retry-After"))
+        return resp
+
+    def fetch_records(self, filters=None, limit=1000, offset=0, priority="interactive", sort_by_date=True):
+        """Raw records of one page; raises requests.HTTPError on a failed response"""
+        resp = self.get_page(filters, limit, offset, priority, sort_by_date)
+        resp.raise_for_status()
+        return resp.json().get("records") or []
+
+    def iter_pages(self, filters=None, page_size=1000, max_records=None, priority="background", max_attempts=5,
+                   sort_by_date=True):
+        """
+        Page through the resource (newest first unless sort_by_date=False), yielding one list of raw records per page.
+        Pages answered with 429/503 are retried after backing off (via the quota when set).
+        """
+        offset = 0
+        while max_records is None or offset < max_records:
+            limit = page_size if max_records is None else min(page_size, max_records - offset)
+            for attempt in range(1, max_attempts + 1):
+                resp = self.get_page(filters, limit, offset, priority, sort_by_date)
+                if resp.status_code not in (429, 503) or attempt == max_attempts:
+                    break
+                if self.quota is None:
+                    retry_after = parse_price(resp.headers.get("Retry-After"))
+                    time.sleep(retry_after if retry_after is not None else self.backoff * 2 ** attempt)
+            resp.raise_for_status()
+            records = resp.json().get("records") or []
+            if not records:
+                break
+            yield records
+            offset += len(records)
+            if len(records) < limit:
+                break
+
+    def iter_records(self, filters=None, page_size=1000, max_records=None, priority="background"):
+        """Typed PriceRecords, streamed page by page; records without a valid date are skipped"""
+        for page in self.iter_pages(filters, page_size, max_records, priority):
+            for raw in page:
+                record = PriceRecord.from_api(raw)
+                if record is not None:
+                    yield record
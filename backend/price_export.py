@@ -0,0 +1,148 @@
+"""
+Streaming CSV / Parquet writers for bulk price exports.
+
+Each writer consumes an iterator of row chunks (lists of price_store.COLUMNS
+tuples) and yields encoded bytes as it goes, so memory stays bounded by one
+chunk no matter how large the export is. Parquet needs pyarrow (optional):
+
+    pip install pyarrow
+"""
+import csv
+import io
+import zlib
+
+from price_store import COLUMNS, normalize_record
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # parquet export is optional
+    pa = pq = None
+
+PARQUET_SCHEMA = None
+if pa is not None:
+    PARQUET_SCHEMA = pa.schema(
+        [(c, pa.string()) for c in COLUMNS[:7]] + [(c, pa.float64()) for c in COLUMNS[7:]]
+    )
+
+
+def upstream_chunks(pages, start=None, end=None):
+    """
+    Normalize upstream API pages (newest first) into row chunks, keeping only rows
+    inside [start, end]. Stops paging once a page reaches past `start`.
+    """
+    for page in pages:
+        parsed = [r for r in map(normalize_record, page) if r]
+        rows = [r for r in parsed if (not start or r[0] >= start) and (not end or r[0] <= end)]
+        if rows:
+            yield rows
+        if start and parsed and min(r[0] for r in parsed) < start:
+            break
+
+
+def csv_stream(chunks, header=True):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    if header:
+        writer.writerow(COLUMNS)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_stream(chunks, compression="snappy"):
+    """Write one Parquet row group per chunk, yielding bytes as each group is flushed"""
+    if pq is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, PARQUET_SCHEMA, compression=compression)
+    try:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            table = pa.Table.from_arrays(
+                [pa.array(col, type=PARQUET_SCHEMA.field(i).type) for i, col in enumerate(columns)],
+                schema=PARQUET_SCHEMA,
+            )
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(byte_chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for data in byte_chunks:
+        out = compressor.compress(data)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def byte_slice(byte_chunks, start, end=None):
+    """Yield only bytes [start, end] (inclusive) of a byte stream, for HTTP range requests"""
+    pos = 0
+    for data in byte_chunks:
+        lo, hi = pos, pos + len(data)
+        pos = hi
+        if hi <= start:
+            continue
+        if end is not None and lo > end:
+            break
+        yield data[max(start - lo, 0): (end + 1 - lo) if end is not None else None]
+
+
+def stream_length(byte_chunks):
+    return sum(len(data) for data in byte_chunks)
+
+
+def counted(byte_chunks, done):
+    """Pass a byte stream through and call done(total bytes) once it has been fully sent"""
+    total = 0
+    for data in byte_chunks:
+        total += len(data)
+        yield data
+    done(total)
+
+
+def parse_range(header):
+    """Parse a single 'bytes=a-b' / 'bytes=a-' range; returns (start, end_or_None) or None"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+    start, end = int(first), int(last) if last else None
+    if end is not None and end < start:
+        return None
+    return start, end
@@ -0,0 +1,106 @@
+"""
+Per-state price aggregates for the India choropleth (frontend IndiaMap).
+
+State ids are the slugs of the NAME_1 properties in the frontend's
+india-states-simplified.json ("Madhya Pradesh" -> "madhya-pradesh"), so the
+map can colour its features straight from one response. The aggregates come
+from price_store.state_prices (precomputed on each sync); the joined,
+serialized payload is cached per commodity and store version.
+"""
+import json
+import os
+import re
+import threading
+
+import price_store
+
+DEFAULT_STATES_PATH = os.environ.get("MAP_STATES_PATH") or os.path.join(
+    os.path.dirname(__file__), "..", "frontend", "public", "india-states-simplified.json")
+
+# Upstream spellings that differ from the map's state names
+STATE_ALIASES = {
+    "orissa": "odisha",
+    "chattisgarh": "chhattisgarh",
+    "uttrakhand": "uttarakhand",
+    "pondicherry": "puducherry",
+    "nct of delhi": "delhi",
+}
+
+
+def state_id(name):
+    """Map id for a state name, e.g. "Tamil Nadu" -> "tamil-nadu" (upstream aliases resolved)"""
+    name = " ".join(str(name or "").lower().split())
+    name = STATE_ALIASES.get(name, name)
+    return re.sub(r"[^a-z0-9]+", "-", name).strip("-")
+
+
+def load_states(path=DEFAULT_STATES_PATH):
+    """{state id: {"name", "centroid"}} for the features of the simplified state GeoJSON"""
+    with open(path, "r", encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    states = {}
+    for feature in features:
+        props = feature.get("properties") or {}
+        name = props.get("NAME_1")
+        if name:
+            states[state_id(name)] = {"name": name, "centroid": props.get("centroid")}
+    return states
+
+
+def _change_pct(latest, week_ago):
+    if not week_ago:
+        return None
+    return round((latest - week_ago) / week_ago * 100, 2)
+
+
+class StatePriceMap:
+    def __init__(self, states, path=None):
+        self.states = states
+        self.path = path
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_geojson(cls, states_path=DEFAULT_STATES_PATH, path=None):
+        return cls(load_states(states_path), path)
+
+    def aggregates(self, commodity):
+        """Choropleth payload for one commodity: per-state aggregates keyed by map state id"""
+        states = {}
+        commodity_name = commodity
+        as_of = None
+        for row in price_store.state_prices(commodity, self.path).values():
+            sid = state_id(row["state"])
+            if sid not in self.states:
+                continue
+            commodity_name = row["commodity"]
+            as_of = max(as_of or row["as_of"], row["as_of"])
+            states[sid] = {
+                "name": self.states[sid]["name"],
+                "modal_price": round(row["modal_price"], 2),
+                "week_ago_price": None if row["week_ago_price"] is None else round(row["week_ago_price"], 2),
+                "change_pct": _change_pct(row["modal_price"], row["week_ago_price"]),
+                "markets": row["markets"],
+                "as_of": row["as_of"],
+            }
+        prices = [s["modal_price"] for s in states.values()]
+        return {
+            "commodity": commodity_name,
+            "as_of": as_of,
+            "range": [min(prices), max(prices)] if prices else None,
+            "states": states,
+        }
+
+    def payload(self, commodity):
+        """(store version, encoded JSON) for one commodity, rebuilt only when the store version changes"""
+        current = price_store.version(self.path)
+        key = commodity.strip().lower()
+        cached = self._cache.get(key)
+        if cached and cached[0] == current:
+            return cached
+        body = json.dumps({"version": current, **self.aggregates(key)}, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            if len(self._cache) > 1024:  # commodity names come from the query string
+                self._cache.clear()
+            self._cache[key] = (current, body)
+        return current, body
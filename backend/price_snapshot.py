@@ -0,0 +1,324 @@
+"""
+Read-only price table shared by every worker process through one mmap'd file.
+
+The publisher (one process at a time, elected by a lock file) syncs upstream
+into price_store and writes the table to the snapshot file: a fixed header
+(magic, format, store version, row count, build time), a JSON directory of
+column offsets, then the columns themselves -- arrival dates as epoch days,
+text columns as int32 codes into one sorted string table, prices as float64
+(NaN when missing). Workers mmap the file and view the columns zero-copy with
+np.frombuffer, so N workers share one copy through the page cache and make
+no upstream calls of their own.
+
+A new version is written to a temporary file and renamed over the old one,
+so a reader maps either the old file or the new one, never a partial write.
+Readers notice the rename by the file's inode on their next lookup (at most
+every check_interval seconds) and switch; arrays from the old snapshot stay
+valid for as long as something holds them.
+
+models/Crop_Prices_Tracker serves from a snapshot. The backend's /get_price does
+not: it answers arbitrary upstream filters and still fetches per worker through
+price_client.PageCache.
+
+    python price_snapshot.py publish --sync --state Punjab --max-records 20000
+    python price_snapshot.py info
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import price_client
+import price_store
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every process publishes for itself
+    fcntl = None
+
+SNAPSHOT_PATH = os.environ.get("PRICE_SNAPSHOT_PATH") or os.path.join(os.path.dirname(__file__), "data",
+                                                                        "prices.snapshot")
+MAGIC = b"AGRIPSNP"
+FORMAT = 1
+HEADER = struct.Struct("<8sIIQQd")  # magic, format, directory length, store version, rows, built at (epoch s)
+ALIGN = 64
+TEXT_COLUMNS = price_store.COLUMNS[1:7]  # state .. grade
+PRICE_COLUMNS = price_store.PRICE_COLUMNS
+
+log = logging.getLogger(__name__)
+
+
+def _pad(offset):
+    return -offset % ALIGN
+
+
+def build_columns(rows):
+    """COLUMNS tuples -> ({column: array}, sorted string table)"""
+    rows = list(rows)
+    strings = sorted({r[i] or "" for r in rows for i in range(1, 7)})
+    code = {s: i for i, s in enumerate(strings)}
+    columns = {
+        "arrival_date": np.array([r[0] for r in rows], dtype="datetime64[D]").astype(np.int32),
+    }
+    for i, name in enumerate(TEXT_COLUMNS, start=1):
+        columns[name] = np.fromiter((code[r[i] or ""] for r in rows), dtype=np.int32, count=len(rows))
+    for i, name in enumerate(PRICE_COLUMNS, start=7):
+        columns[name] = np.array([r[i] for r in rows], dtype=np.float64)  # None -> NaN
+    return columns, strings
+
+
+def write_snapshot(path, version, columns, strings):
+    """Write a snapshot file next to `path` and atomically rename it into place"""
+    rows = len(columns["arrival_date"])
+    blobs = [(name, np.ascontiguousarray(col)) for name, col in columns.items()]
+    text = json.dumps(strings, ensure_ascii=False).encode("utf-8")
+    layout, offset = {}, 0  # offsets are relative to the data section, which starts aligned after the directory
+    for name, col in blobs:
+        layout[name] = {"dtype": col.dtype.str, "offset": offset, "count": len(col)}
+        offset += col.nbytes + _pad(col.nbytes)
+    layout["_strings"] = {"offset": offset, "length": len(text)}
+    directory = json.dumps(layout).encode("utf-8")
+    directory += b" " * _pad(HEADER.size + len(directory))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT, len(directory), version, rows, time.time()))
+        f.write(directory)
+        for _, col in blobs:
+            f.write(col.tobytes())
+            f.write(b"\0" * _pad(col.nbytes))
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_header(path=None):
+    """(store version, rows, built at) of the published snapshot, or None when there is none"""
+    try:
+        with open(path or SNAPSHOT_PATH, "rb") as f:
+            raw = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+    magic, fmt, _, version, rows, built_at = HEADER.unpack(raw)
+    if magic != MAGIC or fmt != FORMAT:
+        return None
+    return version, rows, built_at
+
+
+def publish(path=None, store_path=None, force=False):
+    """Snapshot the store unless the published file already holds its version; returns (version, rows)"""
+    path = path or SNAPSHOT_PATH
+    version = price_store.version(store_path)
+    header = read_header(path)
+    if header and header[0] == version and not force:
+        return version, header[1]
+    rows = [r for chunk in price_store.iter_rows(path=store_path) for r in chunk]
+    columns, strings = build_columns(rows)
+    write_snapshot(path, version, columns, strings)
+    return version, len(rows)
+
+
+class PriceSnapshot:
+    """One mapped snapshot file; `columns` are read-only views into the shared pages"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, dir_len, self.version, self.rows, self.built_at = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError(f"{path} is not a price snapshot (format {FORMAT})")
+        layout = json.loads(self._map[HEADER.size:HEADER.size + dir_len])
+        base = HEADER.size + dir_len
+        strings = layout.pop("_strings")
+        self.columns = {name: np.frombuffer(self._map, np.dtype(spec["dtype"]), spec["count"], base + spec["offset"])
+                        for name, spec in layout.items()}
+        start = base + strings["offset"]
+        self.strings = json.loads(self._map[start:start + strings["length"]].decode("utf-8"))
+        self._codes = {}
+        for i, s in enumerate(self.strings):
+            self._codes.setdefault(s.strip().lower(), []).append(i)
+
+    def codes(self, text):
+        """String-table codes matching `text` case-insensitively"""
+        return np.array(self._codes.get(str(text).strip().lower(), []), dtype=np.int32)
+
+    def select(self, commodity=None, state=None, market=None):
+        """Indices of the rows matching the filters (case-insensitive exact matches), each filter narrowing the last"""
+        index = None
+        for name, value in (("commodity", commodity), ("state", state), ("market", market)):
+            if not value:
+                continue
+            codes = self.codes(value)
+            col = self.columns[name] if index is None else self.columns[name][index]
+            hit = col == codes[0] if len(codes) == 1 else np.isin(col, codes)
+            index = np.flatnonzero(hit) if index is None else index[hit]
+        return np.arange(self.rows) if index is None else index
+
+    def distinct(self, column, **filters):
+        """Sorted distinct values of a text column among the rows matching `filters`"""
+        values = self.columns[column]
+        if any(filters.values()):
+            values = values[self.select(**filters)]
+        return [self.strings[c] for c in np.unique(values)]  # the string table is sorted, so codes are too
+
+    def records(self, limit=None, **filters):
+        """Matching rows as dicts (ISO dates), newest first"""
+        index = self.select(**filters)
+        index = index[np.argsort(-self.columns["arrival_date"][index], kind="stable")][:limit]
+        dates = self.columns["arrival_date"][index].astype("datetime64[D]").astype(str)
+        out = [{"arrival_date": d} for d in dates.tolist()]
+        for name in TEXT_COLUMNS:
+            for row, c in zip(out, self.columns[name][index].tolist()):
+                row[name] = self.strings[c]
+        for name in PRICE_COLUMNS:
+            for row, v in zip(out, self.columns[name][index].tolist()):
+                row[name] = None if v != v else v
+        return out
+
+
+class SnapshotReader:
+    """The latest published snapshot for this process, re-mapped when the publisher renames a new one in"""
+
+    def __init__(self, path=None, check_interval=1.0):
+        self.path = path or SNAPSHOT_PATH
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._ident = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The current PriceSnapshot, or None until one has been published"""
+        if time.monotonic() < self._next_check:
+            return self._snapshot
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return self._snapshot
+            ident = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if ident != self._ident:
+                try:
+                    self._snapshot = PriceSnapshot(self.path)
+                    self._ident = ident
+                except (OSError, ValueError, struct.error) as e:
+                    log.warning("Could not map price snapshot %s: %s", self.path, e)
+        return self._snapshot
+
+    def wait(self, timeout=30.0, poll=0.2):
+        """Block until a snapshot exists (e.g. while another worker's first sync runs)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._next_check = 0.0
+            snapshot = self.current()
+            if snapshot is not None or time.monotonic() >= deadline:
+                return snapshot
+            time.sleep(poll)
+
+
+class SnapshotPublisher:
+    """
+    Background sync-and-publish loop. Every process may start one; only the holder of
+    `<snapshot>.lock` syncs, the others retry the lock each interval and take over if it dies.
+    """
+
+    def __init__(self, client, filters=None, max_records=None, interval=900, path=None, store_path=None,
+                 sort_by_date=True):
+        self.client = client
+        self.filters = filters
+        self.max_records = max_records
+        self.sort_by_date = sort_by_date
+        self.interval = interval
+        self.path = path or SNAPSHOT_PATH
+        self.store_path = store_path
+        self._lock_file = None
+        self._thread = None
+
+    def acquire(self):
+        """True if this process is (now) the publisher"""
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        f = open(f"{self.path}.lock", "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f  # held (and the lock with it) for the life of the process
+        return True
+
+    def run_once(self):
+        """Sync upstream into the store and publish; returns the publish result"""
+        summary = price_store.sync_from_upstream(self.client, self.filters, max_records=self.max_records,
+                                                 path=self.store_path, sort_by_date=self.sort_by_date)
+        version, rows = publish(self.path, self.store_path)
+        log.info("Published price snapshot v%s (%s rows, %s changed)", version, rows, summary["changed"])
+        return version, rows
+
+    def _loop(self):
+        while True:
+            if self.acquire():
+                try:
+                    self.run_once()
+                except Exception as e:  # an upstream outage keeps the last snapshot in service
+                    log.warning("Price snapshot refresh failed: %s", e)
+            time.sleep(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="price-snapshot", daemon=True)
+            self._thread.start()
+        return self
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Shared price snapshot for multi-process workers.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    pub = sub.add_parser("publish", help="Write the store's price table to the snapshot file.")
+    pub.add_argument("--sync", action="store_true", help="Pull upstream into the store first.")
+    pub.add_argument("--state")
+    pub.add_argument("--commodity")
+    pub.add_argument("--max-records", type=int)
+    pub.add_argument("--force", action="store_true", help="Rewrite even if the version is unchanged.")
+    sub.add_parser("info", help="Show the published snapshot's header.")
+    args = ap.parse_args()
+
+    if args.cmd == "info":
+        header = read_header()
+        info = {"path": SNAPSHOT_PATH, "published": header is not None}
+        if header:
+            info.update(version=header[0], rows=header[1],
+                        built_at=datetime.fromtimestamp(header[2], timezone.utc).isoformat(timespec="seconds"))
+        print(json.dumps(info))
+        return
+
+    if args.sync:
+        with open(os.path.join(os.path.dirname(__file__), "config.json"), "r") as f:
+            config = json.load(f)
+        base_url = os.environ.get("PRICING_BASE_URL") or config.get("PRICING_BASE_URL")
+        api_key = os.environ.get("PRICING_API_KEY") or config.get("PRICING_API_KEY", "")
+        client = price_client.PriceClient(api_key, base_url or price_client.DEFAULT_URL)
+        filters = price_client.filters(args.commodity, args.state)
+        print(json.dumps(price_store.sync_from_upstream(client, filters, max_records=args.max_records)))
+    version, rows = publish(force=args.force)
+    print(json.dumps({"path": SNAPSHOT_PATH, "version": version, "rows": rows}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+Local SQLite store of mandi price records.
+
+Records pulled from data.gov.in are normalized (ISO dates, numeric prices) and
+upserted here so bulk reads don't have to page the upstream API. Every sync
+bumps the store version; rows remember the version that last changed them.
+
+    python price_store.py sync --state Punjab --max-records 20000
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+import price_client
+
+DB_PATH = os.environ.get("PRICE_DB_PATH") or os.path.join(os.path.dirname(__file__), "data", "prices.db")
+
+COLUMNS = ("arrival_date", "state", "district", "market", "commodity", "variety", "grade",
+           "min_price", "max_price", "modal_price")
+KEY_COLUMNS = COLUMNS[:7]
+PRICE_COLUMNS = COLUMNS[7:]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    id INTEGER PRIMARY KEY,
+    arrival_date TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT '',
+    district TEXT NOT NULL DEFAULT '',
+    market TEXT NOT NULL DEFAULT '',
+    commodity TEXT NOT NULL DEFAULT '',
+    variety TEXT NOT NULL DEFAULT '',
+    grade TEXT NOT NULL DEFAULT '',
+    min_price REAL,
+    max_price REAL,
+    modal_price REAL,
+    version INTEGER NOT NULL,
+    UNIQUE (arrival_date, state, district, market, commodity, variety, grade)
+);
+CREATE INDEX IF NOT EXISTS idx_prices_commodity_date ON prices (commodity, arrival_date);
+CREATE INDEX IF NOT EXISTS idx_prices_state_date ON prices (state, arrival_date);
+CREATE INDEX IF NOT EXISTS idx_prices_version ON prices (version);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS state_prices (
+    commodity_key TEXT NOT NULL,
+    state_key TEXT NOT NULL,
+    commodity TEXT NOT NULL,
+    state TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    modal_price REAL NOT NULL,
+    week_ago_price REAL,
+    markets INTEGER NOT NULL,
+    PRIMARY KEY (commodity_key, state_key)
+);
+"""
+
+STATE_PRICE_COLUMNS = ("commodity", "state", "as_of", "modal_price", "week_ago_price", "markets")
+# Daily state prices older than this (before the newest arrival date) don't reach the map
+STATE_PRICE_LOOKBACK_DAYS = 30
+
+UPSERT = f"""
+INSERT INTO prices ({", ".join(COLUMNS)}, version) VALUES ({", ".join("?" * len(COLUMNS))}, ?)
+ON CONFLICT ({", ".join(KEY_COLUMNS)}) DO UPDATE SET
+    {", ".join(f"{c} = excluded.{c}" for c in PRICE_COLUMNS)}, version = excluded.version
+WHERE {" OR ".join(f"{c} IS NOT excluded.{c}" for c in PRICE_COLUMNS)}
+"""
+
+_write_lock = threading.Lock()
+_initialized = set()
+
+
+@contextmanager
+def connect(path=None):
+    path = path or DB_PATH
+    if path not in _initialized:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        if path not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            _initialized.add(path)
+        yield conn
+    finally:
+        conn.close()
+
+
+def normalize_record(record):
+    """Turn an API record (either field casing) into a COLUMNS tuple, or None if it has no valid date"""
+    parsed = price_client.PriceRecord.from_api(record)
+    if parsed is None:
+        return None
+    return (parsed.arrival_date.isoformat(),) + tuple(parsed[1:])
+
+
+def version(path=None):
+    """Current store version (0 for an empty store)"""
+    with connect(path) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def upsert_records(records, path=None):
+    """
+    Insert or update a batch of API records as one new store version.
+    Returns (version, changed_rows); unchanged rows keep their old version.
+    """
+    rows = [r for r in map(normalize_record, records) if r]
+    with _write_lock, connect(path) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        new_version = (int(row[0]) if row else 0) + 1
+        before = conn.total_changes
+        conn.executemany(UPSERT, [r + (new_version,) for r in rows])
+        changed = conn.total_changes - before
+        if changed:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(new_version),))
+        conn.commit()
+    return (new_version if changed else new_version - 1), changed
+
+
+def _where(commodity=None, state=None, market=None, start=None, end=None):
+    clauses, args = [], []
+    for column, value in (("commodity", commodity), ("state", state), ("market", market)):
+        if value:
+            clauses.append(f"{column} = ? COLLATE NOCASE")
+            args.append(value)
+    if start:
+        clauses.append("arrival_date >= ?")
+        args.append(start)
+    if end:
+        clauses.append("arrival_date <= ?")
+        args.append(end)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+
+def iter_rows(commodity=None, state=None, market=None, start=None, end=None, chunk_size=5000, path=None):
+    """Yield lists of COLUMNS tuples in date order, at most chunk_size rows at a time"""
+    where, args = _where(commodity, state, market, start, end)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM prices{where} ORDER BY arrival_date, id"
+    with connect(path) as conn:
+        cur = conn.execute(sql, args)
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def changes_since(since, until, after=None, limit=5000, commodity=None, state=None, market=None, path=None):
+    """
+    Rows whose version is in (since, until], ordered by (version, id) and resumed after
+    `after` = (version, id). Served from the version index, never a full scan.
+    Returns [(id, version, *COLUMNS)].
+    """
+    where, args = _where(commodity, state, market)
+    clauses = ["version > ?", "version <= ?"]
+    bounds = [since, until]
+    if after:
+        clauses.append("(version, id) > (?, ?)")
+        bounds += list(after)
+    where = " WHERE " + " AND ".join(clauses) + (where.replace(" WHERE ", " AND ", 1) if where else "")
+    sql = f"SELECT id, version, {', '.join(COLUMNS)} FROM prices{where} ORDER BY version, id LIMIT ?"
+    with connect(path) as conn:
+        return conn.execute(sql, bounds + args + [limit]).fetchall()
+
+
+def count_rows(commodity=None, state=None, market=None, start=None, end=None, path=None):
+    where, args = _where(commodity, state, market, start, end)
+    with connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM prices{where}", args).fetchone()[0]
+
+
+class LRUCache:
+    """Bounded map for read caches keyed by request values (commodity, state); evicts least recently used"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_latest_cache = LRUCache()
+
+
+def latest_by_market(commodity, path=None):
+    """
+    Latest record per market for one commodity, keyed by (state, market) in lower case.
+    Cached per store version, so repeated lookups between syncs skip SQLite entirely.
+    """
+    current = version(path)
+    key = (path or DB_PATH, commodity.lower())
+    cached = _latest_cache.get(key)
+    if cached and cached[0] == current:
+        return cached[1]
+
+    # SQLite fills bare columns from the row that produced MAX(arrival_date)
+    sql = f"""SELECT MAX(arrival_date), {", ".join(COLUMNS[1:])} FROM prices
+              WHERE commodity = ? COLLATE NOCASE GROUP BY state, market"""
+    with connect(path) as conn:
+        latest = {(r[1].lower(), r[3].lower()): dict(zip(COLUMNS, r))
+                  for r in conn.execute(sql, (commodity,))}
+    _latest_cache.put(key, (current, latest))
+    return latest
+
+
+_trend_cache = LRUCache()
+
+
+def commodity_trends(state=None, window_days=7, path=None):
+    """
+    Latest average modal price and short-term trend per commodity, keyed by commodity in lower case.
+
+    The trend compares the mean daily modal price of each commodity's last
+    `window_days` days with the `window_days` before that. Cached per store
+    version (and state) like latest_by_market.
+    """
+    current = version(path)
+    key = (path or DB_PATH, (state or "").lower(), window_days)
+    cached = _trend_cache.get(key)
+    if cached and cached[0] == current:
+        return cached[1]
+
+    sql = """SELECT commodity, arrival_date, AVG(modal_price), COUNT(DISTINCT state || '|' || market) FROM prices
+             WHERE modal_price IS NOT NULL
+               AND arrival_date >= date((SELECT MAX(arrival_date) FROM prices), ?)"""
+    args = [f"-{4 * window_days} days"]
+    if state:
+        sql += " AND state = ? COLLATE NOCASE"
+        args.append(state)
+    sql += " GROUP BY commodity COLLATE NOCASE, arrival_date ORDER BY arrival_date"
+
+    daily = {}
+    with connect(path) as conn:
+        for commodity, day, modal, markets in conn.execute(sql, args):
+            daily.setdefault(commodity.lower(), (commodity, []))[1].append((day, modal, markets))
+
+    trends = {}
+    for key_name, (commodity, days) in daily.items():
+        last_day = datetime.strptime(days[-1][0], "%Y-%m-%d").date()
+        recent, previous = [], []
+        for day, modal, _ in days:
+            age = (last_day - datetime.strptime(day, "%Y-%m-%d").date()).days
+            if age < window_days:
+                recent.append(modal)
+            elif age < 2 * window_days:
+                previous.append(modal)
+        trend_pct = None
+        if recent and previous:
+            before = sum(previous) / len(previous)
+            trend_pct = round((sum(recent) / len(recent) - before) / before * 100, 2) if before else None
+        trends[key_name] = {
+            "commodity": commodity,
+            "modal_price": round(days[-1][1], 2),
+            "as_of": days[-1][0],
+            "markets": days[-1][2],
+            "trend_pct": trend_pct,
+            "trend": None if trend_pct is None else "up" if trend_pct > 2 else "down" if trend_pct < -2 else "flat",
+        }
+    _trend_cache.put(key, (current, trends))
+    return trends
+
+
+def _state_price_rows(conn, week_days=7):
+    """
+    One row per (commodity, state): mean modal price across the state's markets on its latest
+    arrival date, the same mean on the latest date at least `week_days` earlier, and the number
+    of markets that reported in the `week_days` up to the latest date.
+    """
+    sql = f"""SELECT commodity, state, market, arrival_date, modal_price FROM prices
+              WHERE modal_price IS NOT NULL
+                AND arrival_date >= date((SELECT MAX(arrival_date) FROM prices), '-{STATE_PRICE_LOOKBACK_DAYS} days')
+              ORDER BY commodity COLLATE NOCASE, state COLLATE NOCASE, arrival_date"""
+    series = {}
+    for commodity, state, market, day, modal in conn.execute(sql):
+        key = (commodity.lower(), state.lower())
+        entry = series.setdefault(key, (commodity, state, {}))
+        entry[2].setdefault(day, []).append((market.lower(), modal))
+
+    def mean(quotes):
+        return sum(p for _, p in quotes) / len(quotes)
+
+    rows = []
+    for (commodity_key, state_key), (commodity, state, days) in series.items():
+        ordered = list(days)  # already in date order
+        as_of = ordered[-1]
+        latest = datetime.strptime(as_of, "%Y-%m-%d").date()
+        week_ago = None
+        reporting = set()
+        for day in reversed(ordered):
+            if (latest - datetime.strptime(day, "%Y-%m-%d").date()).days >= week_days:
+                week_ago = mean(days[day])
+                break
+            reporting.update(m for m, _ in days[day])
+        rows.append((commodity_key, state_key, commodity, state, as_of, mean(days[as_of]), week_ago, len(reporting)))
+    return rows
+
+
+def refresh_state_prices(path=None):
+    """Rebuild the per-state price table for the current store version; returns that version"""
+    with _write_lock, connect(path) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        current = int(row[0]) if row else 0
+        rows = _state_price_rows(conn)
+        conn.execute("DELETE FROM state_prices")
+        conn.executemany("INSERT INTO state_prices VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('state_prices_version', ?)", (str(current),))
+        conn.commit()
+    return current
+
+
+def state_prices(commodity, path=None):
+    """
+    Precomputed per-state aggregates for one commodity, keyed by state in lower case.
+    Normally rebuilt by sync_from_upstream; rebuilt here if the store moved on without it.
+    """
+    with connect(path) as conn:
+        built = conn.execute("SELECT value FROM meta WHERE key = 'state_prices_version'").fetchone()
+    if built is None or int(built[0]) != version(path):
+        refresh_state_prices(path)
+    sql = f"SELECT state_key, {', '.join(STATE_PRICE_COLUMNS)} FROM state_prices WHERE commodity_key = ?"
+    with connect(path) as conn:
+        return {r[0]: dict(zip(STATE_PRICE_COLUMNS, r[1:])) for r in conn.execute(sql, (commodity.lower(),))}
+
+
+def sync_from_upstream(client, filters=None, page_size=1000, max_records=None, path=None, sort_by_date=True):
+    """Pull upstream pages (via a price_client.PriceClient) into the store; returns a summary dict"""
+    fetched = changed = 0
+    for page in client.iter_pages(filters, page_size, max_records, sort_by_date=sort_by_date):
+        fetched += len(page)
+        changed += upsert_records(page, path)[1]
+    summary = {"fetched": fetched, "changed": changed, "version": version(path)}
+    if changed:
+        refresh_state_prices(path)
+        import price_anomaly  # imports this module
+        summary["alerts"] = price_anomaly.process(path)["alerts"]
+    return summary
+
+
+def main():
+    import json
+
+    ap = argparse.ArgumentParser(description="Local mandi price store.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sync = sub.add_parser("sync", help="Pull records from data.gov.in into the store.")
+    sync.add_argument("--state")
+    sync.add_argument("--commodity")
+    sync.add_argument("--market")
+    sync.add_argument("--page-size", type=int, default=1000)
+    sync.add_argument("--max-records", type=int)
+    sub.add_parser("info", help="Show store version and row count.")
+    args = ap.parse_args()
+
+    if args.cmd == "info":
+        print(json.dumps({"path": DB_PATH, "version": version(), "rows": count_rows()}))
+        return
+
+    with open(os.path.join(os.path.dirname(__file__), "config.json"), "r") as f:
+        config = json.load(f)
+    base_url = os.environ.get("PRICING_BASE_URL") or config.get("PRICING_BASE_URL")
+    api_key = os.environ.get("PRICING_API_KEY") or config.get("PRICING_API_KEY", "")
+    client = price_client.PriceClient(api_key, base_url)
+    filters = price_client.filters(args.commodity, args.state, args.market)
+    print(json.dumps(sync_from_upstream(client, filters, args.page_size, args.max_records)))
+
+
+if __name__ == "__main__":
+    main()
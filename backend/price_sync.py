@@ -0,0 +1,103 @@
+"""
+Delta sync payloads for offline clients (mobile app, web cache).
+
+A client keeps the store version it last synced completely (its watermark)
+and asks for rows changed since then. Large deltas are paged with an opaque
+cursor; the final page has "complete": true and the watermark to keep.
+
+Payload formats:
+
+* json      - {"columns": [...], "rows": [[...], ...]}
+* columnar  - one array per column; text columns are dictionary encoded as
+              {"values": [distinct strings], "index": [positions]}, which
+              shrinks repetitive state/market/commodity names before gzip
+* msgpack   - the columnar payload as MessagePack (needs `pip install msgpack`)
+"""
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # msgpack payloads are optional
+    msgpack = None
+
+import price_store
+
+FORMATS = {
+    "json": "application/json",
+    "columnar": "application/json",
+    "msgpack": "application/x-msgpack",
+}
+TEXT_COLUMNS = ("state", "district", "market", "commodity", "variety", "grade")
+SYNC_COLUMNS = ("id",) + price_store.COLUMNS
+
+
+def encode_cursor(until, last_version, last_id):
+    return f"{until}.{last_version}.{last_id}"
+
+
+def decode_cursor(cursor):
+    """(until, (version, id)); raises ValueError for a malformed cursor"""
+    until, last_version, last_id = (int(part) for part in cursor.split("."))
+    return until, (last_version, last_id)
+
+
+def _dictionary(values):
+    positions, distinct = {}, []
+    index = []
+    for value in values:
+        pos = positions.get(value)
+        if pos is None:
+            pos = positions[value] = len(distinct)
+            distinct.append(value)
+        index.append(pos)
+    return {"values": distinct, "index": index}
+
+
+def columnar(rows):
+    columns = list(zip(*rows)) if rows else [()] * len(SYNC_COLUMNS)
+    out = {}
+    for name, values in zip(SYNC_COLUMNS, columns):
+        out[name] = _dictionary(values) if name in TEXT_COLUMNS else list(values)
+    return out
+
+
+def delta(since, limit=5000, cursor=None, commodity=None, state=None, market=None, path=None):
+    """
+    One page of changes since the watermark `since`. The upper bound is pinned to the store
+    version at the first page (carried in the cursor) so later syncs can't shift pages.
+    """
+    if cursor:
+        until, after = decode_cursor(cursor)
+    else:
+        until, after = price_store.version(path), None
+    changed = price_store.changes_since(since, until, after, limit, commodity, state, market, path)
+    complete = len(changed) < limit
+    return {
+        "since": since,
+        "version": until,
+        "complete": complete,
+        "next_cursor": None if complete else encode_cursor(until, changed[-1][1], changed[-1][0]),
+        # version is only needed for paging; clients get rows keyed by id
+        "rows": [(r[0],) + tuple(r[2:]) for r in changed],
+    }
+
+
+def encode(page, fmt):
+    """Serialize a delta() page; returns bytes"""
+    meta = {k: page[k] for k in ("since", "version", "complete", "next_cursor")}
+    if fmt == "json":
+        body = {**meta, "count": len(page["rows"]), "columns": list(SYNC_COLUMNS), "rows": page["rows"]}
+        return json.dumps(body, separators=(",", ":")).encode("utf-8")
+    body = {**meta, "count": len(page["rows"]), "columns": columnar(page["rows"])}
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("MessagePack sync requires msgpack (pip install msgpack)")
+        return msgpack.packb(body, use_bin_type=True)
+    return json.dumps(body, separators=(",", ":")).encode("utf-8")
+
+
+def etag(*parts):
+    """Strong validator for a sync response: request shape plus the store version it was built from"""
+    key = "|".join(str(p) for p in parts)
+    return f'"sync-{zlib.crc32(key.encode("utf-8")):08x}"'
@@ -0,0 +1,191 @@
+"""
+On-demand profiling for production requests.
+
+Two opt-in tools:
+
+* Per-request cProfile, disabled unless config.json sets PROFILING_TOKEN:
+  send `X-Profile: 1` with `X-Profile-Token: <token>`,
+  or set PROFILING_SAMPLE_RATE to profile a random fraction of requests to
+  PROFILING_ROUTES. The .prof file (pstats; open with snakeviz or convert
+  with flameprof) is stored under PROFILE_DIR and named in `X-Profile-Id`.
+* Statistical stack sampler: POST /admin/profiling/sampler?seconds=N walks
+  every thread's stack at a fixed interval for N seconds. GET the same URL
+  for the aggregated collapsed stacks ("a;b;c count" lines, the input format
+  of flamegraph.pl and speedscope). Like the stored profiles under
+  /admin/profiling/profiles, it needs the admin token (X-Admin-Token).
+"""
+import cProfile
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(__file__), "data", "profiles")
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples the stacks of all other threads every `interval` seconds into folded-stack counts"""
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.counts = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stops_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds):
+        """Run for `seconds` (restarting the window if already running); previous samples are kept"""
+        with self._lock:
+            if not self.running or self._stop.is_set():
+                self.started_at = time.time()
+            self.stops_at = time.time() + seconds
+            # Always a fresh thread with its own stop event: a thread still finishing its last
+            # sleep after stop() or the end of a window retires instead of swallowing this start
+            self._stop.set()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name="stack-sampler",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reset(self):
+        with self._lock:
+            self.counts = Counter()
+            self.samples = 0
+
+    def _run(self, stop):
+        own = threading.get_ident()
+        while not stop.is_set() and time.time() < self.stops_at:
+            t0 = time.perf_counter()
+            frames = sys._current_frames()
+            stacks = []
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(stack)))
+            del frames
+            with self._lock:
+                self.counts.update(stacks)
+                self.samples += 1
+            # Sleep off the remainder of the interval so overhead stays roughly constant
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - t0)))
+
+    def folded(self):
+        with self._lock:
+            items = self.counts.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def status(self):
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "started_at": self.started_at,
+            "stops_at": self.stops_at,
+            "distinct_stacks": len(self.counts),
+        }
+
+
+class RequestProfiler:
+    """Runs selected Flask requests under cProfile and keeps the newest `keep` profiles on disk"""
+
+    def __init__(self, token, profile_dir=DEFAULT_PROFILE_DIR, sample_rate=0.0, routes=(), keep=50):
+        self.token = token
+        self.profile_dir = profile_dir
+        self.sample_rate = float(sample_rate or 0.0)
+        self.routes = set(routes or ())
+        self.keep = keep
+        # cProfile hooks are per interpreter; profile one request at a time
+        self._busy = threading.Lock()
+
+    def authorized(self, headers, header="X-Profile-Token"):
+        supplied = headers.get(header)
+        return bool(self.token) and supplied is not None and hmac.compare_digest(supplied, self.token)
+
+    def wants(self, request):
+        if request.headers.get("X-Profile") and self.authorized(request.headers):
+            return True
+        route = request.url_rule.rule if request.url_rule else None
+        return self.sample_rate > 0 and route in self.routes and random.random() < self.sample_rate
+
+    def begin(self):
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def end(self, profiler, route):
+        profiler.disable()
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}_{route.strip('/').replace('/', '_') or 'root'}" \
+                         f"_{uuid.uuid4().hex[:8]}"
+            profiler.dump_stats(os.path.join(self.profile_dir, profile_id + ".prof"))
+            self._prune()
+            return profile_id
+        finally:
+            self._busy.release()
+
+    def _prune(self):
+        files = sorted(f for f in os.listdir(self.profile_dir) if f.endswith(".prof"))
+        for name in files[:-self.keep] if self.keep else []:
+            os.remove(os.path.join(self.profile_dir, name))
+
+    def list_profiles(self):
+        if not os.path.isdir(self.profile_dir):
+            return []
+        return sorted((f[:-5] for f in os.listdir(self.profile_dir) if f.endswith(".prof")), reverse=True)
+
+    def path_for(self, profile_id):
+        name = os.path.basename(profile_id) + ".prof"
+        path = os.path.join(self.profile_dir, name)
+        return path if os.path.isfile(path) else None
+
+
+def init_app(app, profiler):
+    """Profile opted-in requests of a Flask app with `profiler` (a RequestProfiler)"""
+    from flask import g, request
+
+    @app.before_request
+    def _maybe_start_profile():
+        if profiler.token and profiler.wants(request):
+            g._profiler = profiler.begin()
+
+    @app.after_request
+    def _maybe_finish_profile(response):
+        active = g.pop("_profiler", None)
+        if active is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            response.headers["X-Profile-Id"] = profiler.end(active, route)
+        return response
+
+    @app.teardown_request
+    def _discard_unfinished_profile(exc):
+        # after_request is skipped when a view raises; don't leave the profiler locked
+        active = g.pop("_profiler", None)
+        if active is not None:
+            active.disable()
+            profiler._busy.release()
@@ -0,0 +1,236 @@
+"""
+Token-bucket quota manager for the shared upstream API keys.
+
+Each upstream (data.gov.in, Gemini) gets a bucket refilled at a configurable
+rate. Callers wait in a priority queue (interactive before background) until a
+token is granted or their deadline passes. A few tokens are held back for
+interactive callers so a background sync can't drain the bucket. When the
+upstream answers 429/503 the effective rate is cut in half (and paused for
+Retry-After); successful calls slowly restore it (AIMD).
+
+config.json:
+    "UPSTREAM_QUOTAS": {"datagov": {"rate": 5, "burst": 10}, "gemini": {"rate": 1, "burst": 5}}
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+import metrics
+
+PRIORITIES = {"interactive": 0, "background": 1}
+DEFAULT_TIMEOUTS = {"interactive": 5.0, "background": 120.0}
+DEFAULT_QUOTAS = {
+    "datagov": {"rate": 5.0, "burst": 10},
+    "gemini": {"rate": 1.0, "burst": 5},
+}
+
+TOKENS = metrics.gauge("agri_upstream_tokens_available", "Tokens currently available per upstream.", ("upstream",))
+RATE = metrics.gauge("agri_upstream_rate_per_second", "Effective request rate allowed per upstream.", ("upstream",))
+UTILIZATION = metrics.gauge("agri_upstream_utilization_ratio",
+                            "Share of the configured rate currently in use (0..1).", ("upstream",))
+QUEUED = metrics.gauge("agri_upstream_queue_depth", "Callers waiting for a token.", ("upstream", "priority"))
+GRANTED = metrics.counter("agri_upstream_grants_total", "Tokens granted.", ("upstream", "priority"))
+REJECTED = metrics.counter("agri_upstream_rejections_total", "Callers that hit their deadline.",
+                           ("upstream", "priority"))
+RESPONSES = metrics.counter("agri_upstream_responses_total", "Upstream responses seen by status.",
+                            ("upstream", "status"))
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"{upstream} quota exhausted, retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ("priority", "granted", "cancelled")
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+
+
+class UpstreamQuota:
+    def __init__(self, name, rate, burst, min_rate=None, background_reserve=None, window=10.0):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.min_rate = float(min_rate) if min_rate is not None else self.rate / 16
+        self.background_reserve = float(background_reserve) if background_reserve is not None \
+            else max(1.0, self.burst * 0.2)
+        self.effective_rate = self.rate
+        self.tokens = self.burst
+        self.cooldown_until = 0.0
+        self._last = time.monotonic()
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._window = window
+        self._recent = []  # grant timestamps inside the utilization window
+        self._publish()
+
+    # --- bucket bookkeeping (call with self._cond held) ---
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._last) * self.effective_rate)
+        self._last = now
+
+    def _dispatch(self, now):
+        self._refill(now)
+        while self._heap and now >= self.cooldown_until:
+            _, _, ticket = self._heap[0]
+            if ticket.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            needed = 1.0 if ticket.priority == PRIORITIES["interactive"] else 1.0 + self.background_reserve
+            if self.tokens < needed:
+                break
+            heapq.heappop(self._heap)
+            self.tokens -= 1.0
+            ticket.granted = True
+            self._recent.append(now)
+            GRANTED.inc(upstream=self.name, priority=_priority_name(ticket.priority))
+        self._publish(now)
+
+    def _next_grant_in(self, now):
+        """Rough time until the queue head could be served"""
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        head_is_interactive = not self._heap or self._heap[0][2].priority == PRIORITIES["interactive"]
+        needed = 1.0 if head_is_interactive else 1.0 + self.background_reserve
+        return max(0.001, (needed - self.tokens) / self.effective_rate)
+
+    def _publish(self, now=None):
+        now = now or time.monotonic()
+        while self._recent and self._recent[0] < now - self._window:
+            self._recent.pop(0)
+        TOKENS.set(self.tokens, upstream=self.name)
+        RATE.set(self.effective_rate, upstream=self.name)
+        UTILIZATION.set(min(1.0, len(self._recent) / (self.rate * self._window)), upstream=self.name)
+        depth = {p: 0 for p in PRIORITIES}
+        for _, _, t in self._heap:
+            if not t.cancelled:
+                depth[_priority_name(t.priority)] += 1
+        for p, n in depth.items():
+            QUEUED.set(n, upstream=self.name, priority=p)
+
+    def _enqueue(self, priority):
+        ticket = _Ticket(PRIORITIES[priority])
+        heapq.heappush(self._heap, (ticket.priority, next(self._seq), ticket))
+        return ticket
+
+    def _give_up(self, ticket, priority):
+        ticket.cancelled = True
+        REJECTED.inc(upstream=self.name, priority=priority)
+        retry_after = self._next_grant_in(time.monotonic())
+        self._publish()
+        raise QuotaExceeded(self.name, retry_after)
+
+    # --- public API ---
+
+    def acquire(self, priority="interactive", timeout=None):
+        """Block until a token is granted; raises QuotaExceeded when the deadline passes"""
+        timeout = DEFAULT_TIMEOUTS[priority] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            ticket = self._enqueue(priority)
+            while True:
+                now = time.monotonic()
+                self._dispatch(now)
+                if ticket.granted:
+                    self._cond.notify_all()
+                    return
+                if now >= deadline:
+                    self._give_up(ticket, priority)
+                self._cond.wait(min(deadline - now, self._next_grant_in(now)))
+
+    async def acquire_async(self, priority="interactive", timeout=None):
+        """Async variant of acquire() for the ASGI routes; waits without blocking the event loop"""
+        timeout = DEFAULT_TIMEOUTS[priority] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            ticket = self._enqueue(priority)
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                self._dispatch(now)
+                if ticket.granted:
+                    self._cond.notify_all()
+                    return
+                if now >= deadline:
+                    self._give_up(ticket, priority)
+                wait = min(deadline - now, self._next_grant_in(now), 0.05)
+            await asyncio.sleep(wait)
+
+    def report(self, status, retry_after=None):
+        """Feed back an upstream response status; 429/503 back off, successes recover the rate"""
+        RESPONSES.inc(upstream=self.name, status=status)
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if status in (429, 503):
+                self.effective_rate = max(self.min_rate, self.effective_rate / 2)
+                pause = parse_retry_after(retry_after) or 1.0 / self.effective_rate
+                self.cooldown_until = max(self.cooldown_until, now + pause)
+                self.tokens = min(self.tokens, 0.0)
+            elif 200 <= status < 400 and self.effective_rate < self.rate:
+                self.effective_rate = min(self.rate, self.effective_rate + self.rate / 20)
+            self._publish(now)
+            self._cond.notify_all()
+
+    def refresh(self):
+        """Bring the gauges up to date (tokens refill continuously, not only on events)"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            self._publish(now)
+
+    def status(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "effective_rate": self.effective_rate,
+                "burst": self.burst,
+                "tokens": round(self.tokens, 3),
+                "queued": sum(1 for _, _, t in self._heap if not t.cancelled),
+                "cooling_down_s": round(max(0.0, self.cooldown_until - time.monotonic()), 3),
+            }
+
+
+def _priority_name(value):
+    return next(name for name, v in PRIORITIES.items() if v == value)
+
+
+class QuotaManager:
+    def __init__(self, quotas=None):
+        settings = {**DEFAULT_QUOTAS, **(quotas or {})}
+        self.upstreams = {name: UpstreamQuota(name, **opts) for name, opts in settings.items()}
+        metrics.add_collector(self.refresh)
+
+    def refresh(self):
+        for q in self.upstreams.values():
+            q.refresh()
+
+    def __getitem__(self, name):
+        return self.upstreams[name]
+
+    def status(self):
+        return {name: q.status() for name, q in self.upstreams.items()}
+
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def request_priority(headers):
+    """Callers may mark themselves as background work with `X-Request-Priority: background`"""
+    value = (headers.get("X-Request-Priority") or "interactive").lower()
+    return value if value in PRIORITIES else "interactive"
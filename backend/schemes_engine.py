@@ -0,0 +1,172 @@
+"""
+Scheme catalog and eligibility rules compiled from schemes.json.
+
+Rules are declarative conditions over a farmer profile:
+
+    {"field": "land", "op": ">=", "value": 1}
+    {"all": [...]}  /  {"any": [...]}  /  {"not": {...}}
+
+At load time every condition is compiled into a NumPy predicate over profile
+columns, so one profile or a whole member register is scored the same way:
+a single pass producing a (profiles x rules) boolean matrix.
+"""
+import json
+import os
+import zlib
+
+import numpy as np
+
+DEFAULT_SCHEMES_PATH = os.path.join(os.path.dirname(__file__), "schemes.json")
+
+# Profile fields, their column dtype and the value used when a field is missing
+PROFILE_FIELDS = {
+    "land": (np.float64, 0.0),
+    "income": (np.float64, 0.0),
+    "age": (np.int64, 0),
+    "state": (object, ""),
+    "is_woman": (np.bool_, False),
+    "is_scst": (np.bool_, False),
+    "is_tenant": (np.bool_, False),
+    "has_bank": (np.bool_, True),
+}
+
+TRUE_STRINGS = ("true", "1", "yes", "y")
+
+_OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+def _compile(cond):
+    """Compile one condition into a function: columns dict -> bool array"""
+    if "all" in cond or "any" in cond:
+        combine = np.logical_and if "all" in cond else np.logical_or
+        parts = [_compile(c) for c in cond.get("all", cond.get("any"))]
+        identity = "all" in cond
+
+        def evaluate(cols, n):
+            out = np.full(n, identity)
+            for part in parts:
+                out = combine(out, part(cols, n))
+            return out
+        return evaluate
+
+    if "not" in cond:
+        inner = _compile(cond["not"])
+        return lambda cols, n: ~inner(cols, n)
+
+    field, op, value = cond.get("field"), cond.get("op"), cond.get("value")
+    if field not in PROFILE_FIELDS:
+        raise ValueError(f"Unknown profile field in rule: {field!r}")
+
+    if op in ("in", "not_in"):
+        if not isinstance(value, list):
+            raise ValueError(f"'{op}' needs a list value for field {field!r}")
+        wanted = np.array([str(v).lower() if isinstance(v, str) else v for v in value], dtype=object)
+        negate = op == "not_in"
+
+        def evaluate(cols, n):
+            column = cols[field]
+            if column.dtype == object:
+                column = np.char.lower(column.astype(str))
+            hit = np.isin(column, wanted)
+            return ~hit if negate else hit
+        return evaluate
+
+    if op not in _OPS:
+        raise ValueError(f"Unknown operator in rule: {op!r}")
+    fn = _OPS[op]
+    if isinstance(value, str):
+        value = value.lower()
+        return lambda cols, n: fn(np.char.lower(cols[field].astype(str)), value)
+    return lambda cols, n: fn(cols[field], value)
+
+
+class SchemeEngine:
+    def __init__(self, spec):
+        # Identifies this catalog/rule set, e.g. for HTTP validators
+        self.version = f"{zlib.crc32(json.dumps(spec, sort_keys=True).encode('utf-8')):08x}"
+        self.schemes = spec["schemes"]
+        self.catalog = {s["code"]: s for s in self.schemes}
+        for rule in spec["rules"]:
+            if rule["code"] not in self.catalog:
+                raise ValueError(f"Rule references unknown scheme code {rule['code']!r}")
+        self.rules = spec["rules"]
+        self.notes = spec.get("notes", [])
+        self._rule_preds = [_compile(r["when"]) for r in self.rules]
+        self._note_preds = [_compile(n["when"]) for n in self.notes]
+        self._rule_codes = np.array([r["code"] for r in self.rules], dtype=object)
+
+    @classmethod
+    def load(cls, path=DEFAULT_SCHEMES_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def columns_from_profiles(profiles):
+        """Build typed columns from a list of profile dicts (already-parsed values)"""
+        cols = {}
+        for field, (dtype, default) in PROFILE_FIELDS.items():
+            cols[field] = np.array([p.get(field, default) for p in profiles], dtype=dtype)
+        return cols
+
+    @staticmethod
+    def columns_from_frame(df):
+        """Build typed columns from a pandas DataFrame of raw (e.g. CSV) values, column-wise"""
+        import pandas as pd
+
+        cols = {}
+        for field, (dtype, default) in PROFILE_FIELDS.items():
+            if field not in df.columns:
+                cols[field] = np.full(len(df), default, dtype=dtype)
+            elif dtype is np.bool_:
+                raw = df[field]
+                cols[field] = np.where(
+                    raw.isna(), default, raw.astype(str).str.strip().str.lower().isin(TRUE_STRINGS)
+                ).astype(bool)
+            elif dtype is object:
+                cols[field] = df[field].fillna(default).astype(str).str.strip().to_numpy(dtype=object)
+            else:
+                numeric = pd.to_numeric(df[field], errors="coerce").fillna(default)
+                cols[field] = numeric.to_numpy().astype(dtype)
+        return cols
+
+    def evaluate(self, cols):
+        """Return (rule_matrix, note_matrix): bool arrays of shape (profiles, rules/notes)"""
+        n = len(next(iter(cols.values())))
+        rules = np.column_stack([p(cols, n) for p in self._rule_preds]) if self._rule_preds \
+            else np.zeros((n, 0), dtype=bool)
+        notes = np.column_stack([p(cols, n) for p in self._note_preds]) if self._note_preds \
+            else np.zeros((n, 0), dtype=bool)
+        return rules, notes
+
+    def _row_result(self, rule_row, note_row):
+        seen, schemes = set(), []
+        for j in np.flatnonzero(rule_row):
+            rule = self.rules[j]
+            if rule["code"] in seen:
+                continue  # first matching rule for a scheme supplies the reason
+            seen.add(rule["code"])
+            schemes.append({**self.catalog[rule["code"]], "reason": rule["reason"]})
+        return {"schemes": schemes, "notes": [self.notes[j]["text"] for j in np.flatnonzero(note_row)]}
+
+    def match_one(self, profile):
+        rules, notes = self.evaluate(self.columns_from_profiles([profile]))
+        return self._row_result(rules[0], notes[0])
+
+    def match_codes(self, cols):
+        """Scheme codes per profile (first-match order) for a batch of columns"""
+        rules, notes = self.evaluate(cols)
+        codes = []
+        for row in rules:
+            seen = []
+            for code in self._rule_codes[row]:
+                if code not in seen:
+                    seen.append(code)
+            codes.append(seen)
+        return codes, notes
@@ -0,0 +1,124 @@
+"""
+Bulk scheme eligibility screening for village/cooperative registers.
+
+Reads a CSV of profiles (land, income, age, state, is_woman, is_scst,
+is_tenant, has_bank; other columns such as a member id are passed through) in
+chunks, scores each chunk column-wise with the compiled SchemeEngine and
+streams the annotated rows back out as CSV.
+
+    python screen_schemes.py register.csv -o screened.csv --chunksize 50000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import schemes_engine
+import validation
+
+
+class ScreeningStats:
+    def __init__(self):
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    @property
+    def profiles_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {"profiles": self.rows, "seconds": round(self.seconds, 3),
+                "profiles_per_second": round(self.profiles_per_second, 1)}
+
+
+def _joined(mask_matrix, labels):
+    """Map each row of a bool matrix to the ';'-joined labels it selects, built once per distinct row"""
+    n, width = mask_matrix.shape
+    if width == 0 or n == 0:
+        return np.full(n, "", dtype=object)
+    # packed row bytes key the lookup for any number of columns
+    unique, inverse = np.unique(np.packbits(mask_matrix, axis=1), axis=0, return_inverse=True)
+    rows = np.unpackbits(unique, axis=1, count=width).astype(bool)
+    joined = np.array([";".join(labels[j] for j in np.flatnonzero(row)) for row in rows], dtype=object)
+    return joined[inverse.ravel()]
+
+
+def validate_csv(source, chunksize=50000, max_errors=100):
+    """Structured errors for a register (rows 0-based across the file), at most max_errors of them"""
+    errors, seen, offset = [], set(), 0
+    for df in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=True):
+        for e in validation.PROFILE_SCHEMA.validate_frame(df)[1]:
+            if e["row"] is None:
+                if e["field"] in seen:  # a missing column is reported by every chunk
+                    continue
+                seen.add(e["field"])
+            else:
+                e["row"] += offset
+            errors.append(e)
+        offset += len(df)
+        if len(errors) >= max_errors:
+            break
+    return errors[:max_errors]
+
+
+def screen_frame(df, engine):
+    """Annotate one chunk of profiles with per-scheme flags, matched codes and notes"""
+    cols, errors = validation.PROFILE_SCHEMA.validate_frame(df)
+    if errors:
+        raise validation.ValidationError(errors)
+    rules, notes = engine.evaluate(cols)
+    codes = [s["code"] for s in engine.schemes]
+    rule_codes = np.array([r["code"] for r in engine.rules], dtype=object)
+    flags = np.column_stack([rules[:, rule_codes == c].any(axis=1) for c in codes]) if codes \
+        else np.zeros((len(df), 0), dtype=bool)
+
+    out = df.copy()
+    for j, code in enumerate(codes):
+        out[code] = flags[:, j].astype(np.int8)
+    out["scheme_count"] = flags.sum(axis=1)
+    out["eligible_schemes"] = _joined(flags, codes)
+    out["notes"] = _joined(notes, [n["text"] for n in engine.notes])
+    return out
+
+
+def screen_csv(source, engine, chunksize=50000, stats=None):
+    """Yield CSV text for the screened register, one chunk at a time"""
+    stats = stats or ScreeningStats()
+    header = True
+    for df in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=True):
+        out = screen_frame(df, engine)
+        stats.rows += len(out)
+        yield out.to_csv(index=False, header=header)
+        header = False
+    stats.seconds = time.perf_counter() - stats.started
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Screen a CSV of farmer profiles against all schemes.")
+    ap.add_argument("input", help="CSV of profiles ('-' for stdin).")
+    ap.add_argument("-o", "--output", help="Output CSV (default: stdout).")
+    ap.add_argument("--chunksize", type=int, default=50000, help="Profiles per processing chunk.")
+    ap.add_argument("--schemes", default=schemes_engine.DEFAULT_SCHEMES_PATH, help="Scheme rules file.")
+    args = ap.parse_args()
+
+    engine = schemes_engine.SchemeEngine.load(args.schemes)
+    source = sys.stdin if args.input == "-" else args.input
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    stats = ScreeningStats()
+    try:
+        for text in screen_csv(source, engine, args.chunksize, stats):
+            out.write(text)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    s = stats.as_dict()
+    print(f"Screened {s['profiles']} profiles in {s['seconds']} s "
+          f"({s['profiles_per_second']} profiles/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# backend/ is a flat set of modules (import price_store, import validation, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,93 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+os.environ.setdefault("PRICING_API_KEY", "offline-test-key")
+
+from starlette.testclient import TestClient  # noqa: E402
+
+import asgi  # noqa: E402
+import http_cache  # noqa: E402
+
+backend = asgi.backend
+
+
+class FakeUpstream:
+    """Stands in for asgi.http_client; closing it closes the real client it replaced"""
+
+    def __init__(self, real):
+        self.real = real
+        self.calls = 0
+
+    async def aclose(self):
+        await self.real.aclose()
+
+    async def get(self, url, params=None):
+        self.calls += 1
+        record = {"Arrival_Date": datetime.now().strftime("%d/%m/%Y"), "State": "Punjab", "District": "Ludhiana",
+                  "Market": "Khanna", "Commodity": "Wheat", "Min_Price": "2000", "Max_Price": "2200",
+                  "Modal_Price": "2100"}
+        return FakeResponse({"records": [record]})
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode()
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(backend.price_pages, "ttl", 0)
+    monkeypatch.setattr(backend.price_api, "quota", None)
+    with TestClient(asgi.app) as c:
+        upstream = FakeUpstream(asgi.http_client)
+        monkeypatch.setattr(asgi, "http_client", upstream)
+        c.upstream = upstream
+        yield c
+
+
+def test_quota_is_taken_from_the_price_client(client, monkeypatch):
+    async def refuse(*args, **kwargs):
+        raise AssertionError("quota_manager must not be consulted when price_api.quota is None")
+
+    monkeypatch.setattr(backend.quota_manager["datagov"], "acquire_async", refuse)
+    resp = client.get("/get_price?state=Punjab")
+    assert resp.status_code == 200 and client.upstream.calls == 1
+
+
+def test_no_etag_while_the_snapshot_version_is_unknown(client, monkeypatch):
+    monkeypatch.setattr(backend, "price_snapshot_version", lambda args: None)
+    resp = client.get("/get_price?state=Punjab")
+    assert resp.status_code == 200
+    assert "etag" not in resp.headers
+
+
+def test_version_known_after_the_fetch_answers_304(client, monkeypatch):
+    versions = iter([None])  # unknown before the fetch, then 7
+    monkeypatch.setattr(backend, "price_snapshot_version", lambda args: next(versions, 7))
+    tag = http_cache.make_etag("/get_price", 7, "state=Punjab")
+    resp = client.get("/get_price?state=Punjab", headers={"If-None-Match": tag[2:]})  # weak match
+    assert resp.status_code == 304 and resp.headers["etag"] == tag
+
+
+def test_matching_tag_skips_the_upstream(client, monkeypatch):
+    monkeypatch.setattr(backend, "price_snapshot_version", lambda args: 7)
+    tag = client.get("/get_price?state=Punjab").headers["etag"]
+    resp = client.get("/get_price?state=Punjab", headers={"If-None-Match": tag})
+    assert resp.status_code == 304 and client.upstream.calls == 1
+
+
+def test_malformed_predict_body_is_a_400(client):
+    resp = client.post("/predict", content=b"{not json", headers={"Content-Type": "application/json"})
+    assert resp.status_code == 400
+    assert resp.json()["errors"] == [{"field": None, "error": "expected an object"}]
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+import crop_model
+
+ROW = {"N": 90.0, "P": 42.0, "K": 43.0, "temperature": 21.0, "humidity": 82.0, "ph": 6.5, "rainfall": 203.0}
+
+
+@pytest.mark.parametrize("scores, parent, regressed", [
+    ({"feedback_holdout": 0.9, "dataset": 0.99}, {"feedback_holdout": 0.9, "dataset": 0.99}, []),
+    ({"feedback_holdout": 0.8, "dataset": 0.99}, {"feedback_holdout": 0.9, "dataset": 0.98}, ["feedback_holdout"]),
+    ({"feedback_holdout": None, "dataset": 0.97}, {"feedback_holdout": 0.9, "dataset": 0.98}, ["dataset"]),
+    ({"feedback_holdout": 0.5, "dataset": 0.99}, {"feedback_holdout": None, "dataset": 0.99}, []),
+])
+def test_regressions(scores, parent, regressed):
+    assert crop_model.regressions(scores, parent) == regressed
+
+
+@pytest.fixture
+def stores(tmp_path):
+    models_dir, feedback = str(tmp_path / "models"), str(tmp_path / "feedback.db")
+    crop_model.add_feedback([{**{f: ROW[f] for f in crop_model.FEATURES}, "label": "rice"}] * 12, feedback)
+    return models_dir, feedback
+
+
+def retrain(stores, monkeypatch, new_scores, parent_scores):
+    scores = iter([new_scores, parent_scores])  # evaluate() scores the new model first, then the parent
+    monkeypatch.setattr(crop_model, "accuracy", lambda *args: next(scores))
+    models_dir, feedback = stores
+    return crop_model.retrain("warm_start", extra_trees=2, models_dir=models_dir, feedback_path=feedback)
+
+
+def test_retrain_activates_a_version_that_does_not_regress(stores, monkeypatch):
+    meta = retrain(stores, monkeypatch, {"feedback_holdout": 0.9, "dataset": 0.99},
+                   {"feedback_holdout": 0.8, "dataset": 0.99})
+    assert meta["activated"] is True and meta["regressed"] == []
+    assert crop_model.current_version(stores[0]) == meta["version"]
+
+
+def test_retrain_leaves_a_regressed_version_as_a_candidate(stores, monkeypatch):
+    meta = retrain(stores, monkeypatch, {"feedback_holdout": 0.9, "dataset": 0.95},
+                   {"feedback_holdout": 0.8, "dataset": 0.99})
+    assert meta["activated"] is False and meta["regressed"] == ["dataset"]
+    assert crop_model.current_version(stores[0]) == crop_model.BASE_VERSION
+    assert os.path.isfile(os.path.join(stores[0], meta["version"], "rf_model.pkl"))
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    monkeypatch.setenv("PRICING_API_KEY", os.environ.get("PRICING_API_KEY", "offline-test-key"))
+    import app as backend
+
+    monkeypatch.setattr(backend, "ADMIN_TOKEN", "test-admin")
+    return backend.app.test_client()
+
+
+@pytest.mark.parametrize("query, field", [("extra_trees=abc", "extra_trees"), ("extra_trees=0", "extra_trees"),
+                                          ("method=bogus", "method"), ("activate=maybe", "activate")])
+def test_retrain_rejects_bad_options(admin_client, query, field):
+    resp = admin_client.post(f"/admin/model/retrain?{query}", headers={"X-Admin-Token": "test-admin"})
+    assert resp.status_code == 400
+    assert [e["field"] for e in resp.json["errors"]] == [field]
+
+
+def test_admin_routes_need_the_admin_token(admin_client):
+    assert admin_client.get("/admin/model/retrain").status_code == 403
+    assert admin_client.get("/admin/model/retrain", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_feedback_rejects_crops_the_model_does_not_know(admin_client):
+    body = {"nitrogen": 90, "phosphorous": 42, "potassium": 43, "temperature": 21, "humidity": 82, "ph": 6.5,
+            "rainfall": 203, "crop": "banana split"}
+    resp = admin_client.post("/feedback", json=body)
+    assert resp.status_code == 400
+    assert resp.json["errors"] == [{"row": 0, "field": "crop", "error": "is not a crop the model knows"}]
+    assert admin_client.post("/feedback?allow_new_labels=true", json=body).status_code == 403
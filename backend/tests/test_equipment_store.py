@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from equipment_store import BookingConflict, BookingStore, IntervalIndex
+
+HOUR = 3600
+T0 = 1_800_000_000
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "equipment.db")
+
+
+@pytest.fixture
+def item(db):
+    return BookingStore(db).add_equipment("owner", "Tractor", 30.9, 75.8, category="Tractor")["id"]
+
+
+def test_interval_index_half_open_conflicts():
+    index = IntervalIndex([(10, 20, 1), (30, 40, 2)])
+    assert index.conflict(20, 30) is None  # touching ends don't overlap
+    assert index.conflict(15, 25) == (10, 20, 1)
+    assert index.conflict(25, 35) == (30, 40, 2)
+    assert [b for _, _, b in index.busy(0, 100)] == [1, 2]
+    assert index.add(20, 30, 3).conflict(25, 26) == (20, 30, 3)
+    assert index.conflict(25, 26) is None  # add() leaves the original untouched
+
+
+def test_overlapping_reservation_is_refused(db, item):
+    store = BookingStore(db)
+    first = store.reserve(item, "a", T0, T0 + 2 * HOUR)
+    with pytest.raises(BookingConflict) as exc:
+        store.reserve(item, "b", T0 + HOUR, T0 + 3 * HOUR)
+    assert exc.value.booking_id == first["id"]
+    store.reserve(item, "c", T0 + 2 * HOUR, T0 + 3 * HOUR)
+
+
+def test_stale_index_in_another_worker_is_reloaded(db, item):
+    worker_a, worker_b = BookingStore(db), BookingStore(db)
+    assert worker_a.availability(item, T0, T0 + HOUR) == []  # caches an empty index
+    worker_b.reserve(item, "b", T0, T0 + HOUR)
+    with pytest.raises(BookingConflict):
+        worker_a.reserve(item, "a", T0, T0 + HOUR)
+
+
+def test_compare_and_swap_retries_when_the_version_moves(db, item, monkeypatch):
+    worker_a, worker_b = BookingStore(db), BookingStore(db)
+    real_index = worker_a._index
+    raced = []
+
+    def index_then_race(conn, equipment_id, version):
+        index = real_index(conn, equipment_id, version)
+        if not raced:  # another worker books the slot between A's check and A's update
+            raced.append(worker_b.reserve(item, "b", T0, T0 + HOUR))
+        return index
+
+    monkeypatch.setattr(worker_a, "_index", index_then_race)
+    with pytest.raises(BookingConflict) as exc:
+        worker_a.reserve(item, "a", T0, T0 + HOUR)
+    assert exc.value.booking_id == raced[0]["id"]
+
+
+def test_concurrent_reservations_book_the_slot_once(db, item):
+    stores = [BookingStore(db) for _ in range(2)]
+    won, lost = [], []
+
+    def attempt(i):
+        try:
+            won.append(stores[i % 2].reserve(item, f"r{i}", T0, T0 + HOUR))
+        except BookingConflict:
+            lost.append(i)
+
+    threads = [threading.Thread(target=attempt, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(won) == 1 and len(lost) == 7
+    assert len(stores[0].availability(item, T0, T0 + HOUR)) == 1
+
+
+def test_cancel_frees_the_slot(db, item):
+    store = BookingStore(db)
+    booking = store.reserve(item, "a", T0, T0 + HOUR)
+    assert store.cancel(booking["id"]) is True
+    assert store.cancel(booking["id"]) is False
+    store.reserve(item, "b", T0, T0 + HOUR)
+
+
+def test_search_skips_busy_and_distant_items(db, item):
+    store = BookingStore(db)
+    free = store.add_equipment("owner", "Harvester", 30.91, 75.81, category="tractor")["id"]
+    store.add_equipment("owner", "Far tractor", 20.0, 75.8, category="tractor")
+    store.reserve(item, "a", T0, T0 + HOUR)
+    found = store.search(30.9, 75.8, T0, T0 + HOUR, radius_km=50, category="Tractor")
+    assert [r["id"] for r in found] == [free]
+
+
+def test_end_must_follow_start(db, item):
+    with pytest.raises(ValueError):
+        BookingStore(db).reserve(item, "a", T0, T0)
+
+
+def test_unknown_equipment(db):
+    with pytest.raises(LookupError):
+        BookingStore(db).reserve(999, "a", T0, T0 + HOUR)
@@ -0,0 +1,99 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+import http_cache
+
+
+@pytest.fixture
+def state():
+    return {"version": 1, "calls": 0, "known_before": True}
+
+
+@pytest.fixture
+def client(state):
+    app = Flask(__name__)
+    http_cache.init_compression(app, min_size=100)
+
+    def version():
+        return state["version"] if state["known_before"] or state["calls"] else None
+
+    @app.route("/data")
+    @http_cache.conditional(version, max_age=30, stale_while_revalidate=10)
+    def data():
+        state["calls"] += 1
+        return {"rows": ["x" * 20] * 20}
+
+    @app.route("/missing")
+    @http_cache.conditional(lambda: 1)
+    def missing():
+        return {"error": "nope"}, 404
+
+    return app.test_client()
+
+
+def test_make_etag_is_weak_and_query_order_independent():
+    a = http_cache.make_etag("/p", 3, http_cache.query_key([("b", "2"), ("a", "1")]))
+    b = http_cache.make_etag("/p", 3, http_cache.query_key([("a", "1"), ("b", "2")]))
+    assert a == b and a.startswith('W/"')
+    assert a != http_cache.make_etag("/p", 4, http_cache.query_key([("a", "1"), ("b", "2")]))
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('"zzz", W/"abc"', True),
+    ('W/"abcd"', False),
+])
+def test_etag_matches_uses_weak_comparison(header, expected):
+    assert http_cache.etag_matches(header, 'W/"abc"') is expected
+
+
+def test_sets_etag_and_cache_control(client):
+    resp = client.get("/data?a=1")
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] == http_cache.make_etag("/data", 1, "a=1")
+    assert resp.headers["Cache-Control"] == "public, max-age=30, stale-while-revalidate=10"
+
+
+def test_matching_tag_skips_the_view(client, state):
+    tag = client.get("/data").headers["ETag"]
+    resp = client.get("/data", headers={"If-None-Match": tag})
+    assert resp.status_code == 304 and resp.headers["ETag"] == tag
+    assert state["calls"] == 1
+
+
+def test_new_version_gets_a_full_response(client, state):
+    tag = client.get("/data").headers["ETag"]
+    state["version"] = 2
+    resp = client.get("/data", headers={"If-None-Match": tag})
+    assert resp.status_code == 200 and resp.headers["ETag"] != tag
+
+
+def test_version_known_only_after_the_view_still_answers_304(client, state):
+    state["known_before"] = False
+    tag = http_cache.make_etag("/data", 1, "")
+    resp = client.get("/data", headers={"If-None-Match": tag})
+    assert resp.status_code == 304 and resp.headers["ETag"] == tag
+
+
+def test_unknown_version_sends_no_etag(client, state):
+    state["version"] = None
+    resp = client.get("/data")
+    assert resp.status_code == 200 and "ETag" not in resp.headers
+
+
+def test_errors_are_not_tagged(client):
+    resp = client.get("/missing")
+    assert resp.status_code == 404 and "ETag" not in resp.headers
+
+
+def test_gzip_when_accepted(client):
+    resp = client.get("/data", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert b'"rows"' in gzip.decompress(resp.data)
+    assert "Accept-Encoding" in resp.headers["Vary"]
@@ -0,0 +1,115 @@
+import pytest
+
+import price_snapshot
+import price_store
+
+
+def record(market, commodity, day, modal, state="Punjab", variety="Local"):
+    return {"state": state, "district": "Ludhiana", "market": market, "commodity": commodity, "variety": variety,
+            "grade": "FAQ", "arrival_date": day, "min_price": str(modal - 100), "max_price": str(modal + 100),
+            "modal_price": str(modal)}
+
+
+RECORDS = [
+    record("Khanna", "Wheat", "01/10/2026", 2100),
+    record("Khanna", "Wheat", "03/10/2026", 2150),
+    record("Jagraon", "Wheat", "02/10/2026", 2080),
+    record("Khanna", "Paddy", "02/10/2026", 2300),
+    record("Karnal", "Wheat", "02/10/2026", 2120, state="Haryana"),
+]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    store, snapshot = str(tmp_path / "prices.db"), str(tmp_path / "prices.snapshot")
+    price_store.upsert_records(RECORDS, store)
+    return store, snapshot
+
+
+def test_publish_writes_the_store_version(paths):
+    store, snapshot = paths
+    version, rows = price_snapshot.publish(snapshot, store)
+    assert (version, rows) == (price_store.version(store), len(RECORDS))
+    assert price_snapshot.read_header(snapshot)[:2] == (version, rows)
+
+
+def test_publish_skips_an_unchanged_store(paths, monkeypatch):
+    store, snapshot = paths
+    price_snapshot.publish(snapshot, store)
+    monkeypatch.setattr(price_snapshot, "write_snapshot", lambda *a: pytest.fail("rewrote an unchanged snapshot"))
+    price_snapshot.publish(snapshot, store)
+
+
+def test_snapshot_queries(paths):
+    store, snapshot = paths
+    price_snapshot.publish(snapshot, store)
+    snap = price_snapshot.PriceSnapshot(snapshot)
+    assert snap.distinct("commodity") == ["Paddy", "Wheat"]
+    assert snap.distinct("market", commodity="wheat", state="PUNJAB") == ["Jagraon", "Khanna"]
+    rows = snap.records(commodity="Wheat", market="khanna")
+    assert [(r["arrival_date"], r["modal_price"]) for r in rows] == [("2026-10-03", 2150.0), ("2026-10-01", 2100.0)]
+    assert len(snap.select(commodity="Rice")) == 0
+    assert len(snap.select()) == len(RECORDS)
+
+
+def test_columns_are_read_only_views(paths):
+    store, snapshot = paths
+    price_snapshot.publish(snapshot, store)
+    col = price_snapshot.PriceSnapshot(snapshot).columns["modal_price"]
+    with pytest.raises(ValueError):
+        col[0] = 0
+
+
+def test_reader_waits_for_the_first_publish_and_follows_new_versions(paths):
+    store, snapshot = paths
+    reader = price_snapshot.SnapshotReader(snapshot, check_interval=0)
+    assert reader.current() is None
+    price_snapshot.publish(snapshot, store)
+    first = reader.current()
+    assert first.rows == len(RECORDS)
+
+    price_store.upsert_records([record("Khanna", "Maize", "04/10/2026", 1900)], store)
+    price_snapshot.publish(snapshot, store)
+    second = reader.current()
+    assert second.version > first.version and "Maize" in second.distinct("commodity")
+    assert "Maize" not in first.distinct("commodity")  # the old mapping stays valid for its holders
+
+
+def test_reader_keeps_the_last_snapshot_when_the_file_is_bad(paths, tmp_path):
+    store, snapshot = paths
+    price_snapshot.publish(snapshot, store)
+    reader = price_snapshot.SnapshotReader(snapshot, check_interval=0)
+    good = reader.current()
+    with open(snapshot + ".tmp", "wb") as f:
+        f.write(b"not a snapshot" * 10)
+    (tmp_path / "prices.snapshot.tmp").replace(snapshot)
+    assert reader.current() is good
+
+
+def test_only_one_publisher_holds_the_lock(paths):
+    store, snapshot = paths
+    if price_snapshot.fcntl is None:
+        pytest.skip("no flock on this platform")
+    first = price_snapshot.SnapshotPublisher(None, path=snapshot, store_path=store)
+    second = price_snapshot.SnapshotPublisher(None, path=snapshot, store_path=store)
+    assert first.acquire() is True
+    assert second.acquire() is False
+
+
+class FakeClient:
+    def __init__(self, records):
+        self.records = records
+        self.sorts = []
+
+    def iter_pages(self, filters=None, page_size=1000, max_records=None, sort_by_date=True):
+        self.sorts.append(sort_by_date)
+        yield self.records
+
+
+def test_publisher_syncs_into_its_own_store(tmp_path):
+    store, snapshot = str(tmp_path / "own.db"), str(tmp_path / "own.snapshot")
+    client = FakeClient(RECORDS[:2])
+    publisher = price_snapshot.SnapshotPublisher(client, path=snapshot, store_path=store, sort_by_date=False)
+    version, rows = publisher.run_once()
+    assert rows == 2 and client.sorts == [False]
+    assert price_snapshot.PriceSnapshot(snapshot).version == version == price_store.version(store)
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import quota
+
+
+def test_burst_is_granted_then_callers_are_rejected_past_their_deadline():
+    q = quota.UpstreamQuota("test-burst", rate=0.1, burst=3, background_reserve=0)
+    for _ in range(3):
+        q.acquire(timeout=0)
+    with pytest.raises(quota.QuotaExceeded) as exc:
+        q.acquire(timeout=0.05)
+    assert exc.value.upstream == "test-burst"
+    assert exc.value.retry_after > 0
+
+
+def test_tokens_refill_at_the_configured_rate():
+    q = quota.UpstreamQuota("test-refill", rate=50, burst=1, background_reserve=0)
+    q.acquire(timeout=0)
+    t0 = time.monotonic()
+    q.acquire(timeout=1)
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_background_callers_leave_a_reserve_for_interactive_ones():
+    q = quota.UpstreamQuota("test-reserve", rate=0.1, burst=3, background_reserve=2)
+    q.acquire("background", timeout=0)  # 3 tokens: 1 + reserve 2 is available
+    with pytest.raises(quota.QuotaExceeded):
+        q.acquire("background", timeout=0.05)
+    q.acquire("interactive", timeout=0)
+
+
+def test_interactive_waiters_are_served_before_background_ones():
+    q = quota.UpstreamQuota("test-priority", rate=20, burst=1, background_reserve=0)
+    q.acquire(timeout=0)
+    order = []
+
+    def take(priority):
+        q.acquire(priority, timeout=2)
+        order.append(priority)
+
+    background = threading.Thread(target=take, args=("background",))
+    background.start()
+    time.sleep(0.01)
+    interactive = threading.Thread(target=take, args=("interactive",))
+    interactive.start()
+    background.join()
+    interactive.join()
+    assert order == ["interactive", "background"]
+
+
+def test_429_halves_the_rate_and_successes_restore_it():
+    q = quota.UpstreamQuota("test-aimd", rate=8, burst=4)
+    q.report(429, retry_after="0")
+    assert q.effective_rate == 4
+    assert q.status()["tokens"] <= 1  # emptied on backoff, only refill since
+    for _ in range(40):
+        q.report(200)
+    assert q.effective_rate == 8
+
+
+def test_retry_after_pauses_grants():
+    q = quota.UpstreamQuota("test-pause", rate=100, burst=5)
+    q.report(503, retry_after="5")
+    with pytest.raises(quota.QuotaExceeded) as exc:
+        q.acquire(timeout=0.05)
+    assert exc.value.retry_after > 4
+
+
+def test_async_acquire():
+    q = quota.UpstreamQuota("test-async", rate=0.1, burst=1, background_reserve=0)
+    asyncio.run(q.acquire_async(timeout=0))
+    with pytest.raises(quota.QuotaExceeded):
+        asyncio.run(q.acquire_async(timeout=0.05))
+
+
+def test_manager_merges_config_over_defaults():
+    manager = quota.QuotaManager({"datagov": {"rate": 100, "burst": 200}})
+    assert manager["datagov"].rate == 100
+    assert manager["gemini"].rate == quota.DEFAULT_QUOTAS["gemini"]["rate"]
+
+
+@pytest.mark.parametrize("header, expected", [(None, "interactive"), ("background", "background"),
+                                              ("BACKGROUND", "background"), ("urgent", "interactive")])
+def test_request_priority(header, expected):
+    assert quota.request_priority({"X-Request-Priority": header} if header else {}) == expected
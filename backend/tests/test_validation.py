@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import validation
+from validation import Field, Schema, ValidationError
+
+SCHEMA = Schema({
+    "n": Field("float", required=True, min_val=0, max_val=10),
+    "k": Field("int", default=3, min_val=1),
+    "ok": Field("bool", default=False),
+    "name": Field("str", default="", max_length=5),
+    "sort": Field("str", default="asc", choices=("asc", "desc")),
+})
+
+
+def test_check_cleans_and_applies_defaults():
+    assert SCHEMA.check({"n": "2.5", "ok": "yes"}) == {"n": 2.5, "k": 3, "ok": True, "name": "", "sort": "asc"}
+
+
+@pytest.mark.parametrize("body, field, error", [
+    ({}, "n", "is required"),
+    ({"n": "abc"}, "n", "must be a number"),
+    ({"n": True}, "n", "must be a number"),
+    ({"n": 11}, "n", "must be at most 10"),
+    ({"n": 1, "k": 1.5}, "k", "must be a whole number"),
+    ({"n": 1, "ok": "maybe"}, "ok", "must be true or false"),
+    ({"n": 1, "name": "abcdef"}, "name", "must be at most 5 characters"),
+    ({"n": 1, "sort": "up"}, "sort", "must be one of asc, desc"),
+])
+def test_single_object_errors(body, field, error):
+    with pytest.raises(ValidationError) as exc:
+        SCHEMA.check(body)
+    assert {"field": field, "error": error} in exc.value.errors
+
+
+def test_non_object_is_rejected():
+    assert SCHEMA.validate(["n"])[1] == [{"field": None, "error": "expected an object"}]
+
+
+def test_batch_matches_single_object_rules():
+    rows = [{"n": 1}, {"n": True}, {"n": "x", "name": "toolong"}, {"n": 2, "k": 0}]
+    columns, errors = SCHEMA.validate_batch(rows)
+    assert errors == [
+        {"row": 1, "field": "n", "error": "must be a number"},
+        {"row": 2, "field": "n", "error": "must be a number"},
+        {"row": 2, "field": "name", "error": "must be at most 5 characters"},
+        {"row": 3, "field": "k", "error": "must be at least 1"},
+    ]
+    assert columns["n"][0] == 1.0
+
+
+def test_batch_rejects_bool_arrays():
+    _, errors = SCHEMA.validate_columns({"n": np.array([True, False])}, 2)
+    assert [e["row"] for e in errors] == [0, 1]
+
+
+def test_frame_reports_missing_required_column_once():
+    _, errors = SCHEMA.validate_frame(pd.DataFrame({"k": [1, 2, 3]}))
+    assert errors == [{"row": None, "field": "n", "error": "is required"}]
+
+
+def test_frame_fills_defaults_for_empty_cells():
+    columns, errors = validation.PROFILE_SCHEMA.validate_frame(pd.DataFrame({"land": [1.5, np.nan], "age": [30, 40]}))
+    assert errors == []
+    assert columns["land"].tolist() == [1.5, 0.0]
+    assert columns["has_bank"].tolist() == [True, True]
+
+
+def test_error_message_is_summarized():
+    with pytest.raises(ValidationError) as exc:
+        SCHEMA.check_batch([{"n": "x"}] * 5)
+    assert len(exc.value.errors) == 5
+    assert "and 2 more" in str(exc.value)
@@ -0,0 +1,289 @@
+"""
+Declarative request schemas, compiled once into validators.
+
+A Schema maps field names to Field specs (kind, required or default, range,
+choices). Building it compiles every field into a small parser closure, so
+validating a request is one call per field with its bounds already bound.
+
+validate() checks one object (a JSON body or query args) and returns the
+cleaned values plus {"field", "error"} entries. validate_batch() and
+validate_frame() check many rows column-wise: each numeric column is
+converted and range-checked with NumPy in one pass, and only columns that
+fail the fast conversion are parsed value by value to find the bad rows.
+Batch errors are {"row", "field", "error"} with 0-based rows.
+"""
+import math
+
+import numpy as np
+
+KINDS = ("float", "int", "bool", "str")
+TRUE_STRINGS = ("true", "1", "yes", "y")
+FALSE_STRINGS = ("false", "0", "no", "n")
+MAX_ERROR_MESSAGES = 3  # spelled out in ValidationError's message; all of them stay in .errors
+
+
+class ValidationError(ValueError):
+    """Raised by Schema.check; `errors` holds the structured per-field (or per-row) problems"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        parts = [" ".join(str(p) for p in (_where(e), e["error"]) if p) for e in errors[:MAX_ERROR_MESSAGES]]
+        if len(errors) > MAX_ERROR_MESSAGES:
+            parts.append(f"and {len(errors) - MAX_ERROR_MESSAGES} more")
+        super().__init__("Invalid input: " + "; ".join(parts))
+
+
+def _where(error):
+    if error.get("row") is not None:
+        return f"row {error['row']}: {error.get('field')}"
+    return error.get("field")
+
+
+class Field:
+    def __init__(self, kind="float", required=False, default=None, min_val=None, max_val=None, choices=None,
+                 max_length=255):
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+        self.kind = kind
+        self.required = required
+        self.default = default
+        self.min_val = min_val
+        self.max_val = max_val
+        self.choices = tuple(choices) if choices else None
+        self.max_length = max_length
+
+
+def _missing(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    return isinstance(value, float) and math.isnan(value)  # empty CSV cells arrive as NaN
+
+
+def _bool(value):
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in TRUE_STRINGS:
+        return True
+    if text in FALSE_STRINGS:
+        return False
+    raise ValueError("must be true or false")
+
+
+def _compile(field):
+    """One value -> cleaned value (or the default when missing); raises ValueError with the reason"""
+    lo, hi, choices, default, required = field.min_val, field.max_val, field.choices, field.default, field.required
+
+    if field.kind in ("float", "int"):
+        integer = field.kind == "int"
+
+        def convert(value):
+            if isinstance(value, (bool, np.bool_)):
+                raise ValueError("must be a number")
+            try:
+                num = float(value)
+            except (TypeError, ValueError):
+                raise ValueError("must be a number") from None
+            if not math.isfinite(num):
+                raise ValueError("must be a finite number")
+            if integer:
+                if not num.is_integer():
+                    raise ValueError("must be a whole number")
+                num = int(num)
+            if lo is not None and num < lo:
+                raise ValueError(f"must be at least {lo}")
+            if hi is not None and num > hi:
+                raise ValueError(f"must be at most {hi}")
+            return num
+    elif field.kind == "bool":
+        convert = _bool
+    else:
+        max_length = field.max_length
+
+        def convert(value):
+            text = str(value).strip()
+            if max_length is not None and len(text) > max_length:
+                raise ValueError(f"must be at most {max_length} characters")
+            if choices and text not in choices:
+                raise ValueError(f"must be one of {', '.join(choices)}")
+            return text
+
+    def parse(value):
+        if _missing(value):
+            if required:
+                raise ValueError("is required")
+            return default
+        return convert(value)
+    return parse
+
+
+class Schema:
+    def __init__(self, fields):
+        self.fields = dict(fields)
+        self._parsers = tuple((name, _compile(field)) for name, field in self.fields.items())
+
+    # ---------------- Single objects ----------------
+
+    def validate(self, obj):
+        """(cleaned dict, errors) for one mapping, e.g. request.json or request.args"""
+        if not hasattr(obj, "get"):
+            return {}, [{"field": None, "error": "expected an object"}]
+        clean, errors = {}, []
+        for name, parse in self._parsers:
+            try:
+                clean[name] = parse(obj.get(name))
+            except ValueError as e:
+                errors.append({"field": name, "error": str(e)})
+        return clean, errors
+
+    def check(self, obj):
+        """The cleaned dict, or ValidationError"""
+        clean, errors = self.validate(obj)
+        if errors:
+            raise ValidationError(errors)
+        return clean
+
+    # ---------------- Batches ----------------
+
+    def validate_batch(self, records):
+        """(columns, errors) for a list of mappings; columns are NumPy arrays, one per field"""
+        errors = [{"row": i, "field": None, "error": "expected an object"}
+                  for i, r in enumerate(records) if not hasattr(r, "get")]
+        if errors:
+            return {}, errors
+        return self.validate_columns({name: [r.get(name) for r in records] for name in self.fields}, len(records))
+
+    def validate_frame(self, df):
+        """(columns, errors) for a pandas DataFrame, e.g. an uploaded CSV"""
+        return self.validate_columns({name: df[name].to_numpy() for name in self.fields if name in df.columns},
+                                     len(df))
+
+    def validate_columns(self, columns, n):
+        """(columns, errors) for {field: sequence of n raw values}; absent fields take their default"""
+        out, errors, bad_rows = {}, [], []
+        for order, (name, parse) in enumerate(self._parsers):
+            field = self.fields[name]
+            values = columns.get(name)
+            check = _number_column if field.kind in ("float", "int") else _value_column
+            if values is None:
+                if field.required:
+                    errors.append({"row": None, "field": name, "error": "is required"})  # once, not per row
+                out[name], _ = check(Field(field.kind, default=field.default), [None] * n, n, parse)
+                continue
+            out[name], bad = check(field, values, n, parse)
+            bad_rows.extend((row, order, message) for row, message in bad)
+        names = list(self.fields)
+        errors.extend({"row": row, "field": names[order], "error": message}
+                      for row, order, message in sorted(bad_rows))
+        return out, errors
+
+    def check_batch(self, records):
+        columns, errors = self.validate_batch(records)
+        if errors:
+            raise ValidationError(errors)
+        return columns
+
+
+def _number_column(field, values, n, parse):
+    """Vectorized conversion and range checks; returns (array, [(row, message), ...])"""
+    bad = []
+    try:
+        col = np.array(values, dtype=np.float64)  # None -> NaN; fails on text such as "" or "12kg"
+        if col.shape != (n,) or _has_bools(values):
+            raise ValueError  # NumPy reads True/False as 1/0; convert() rejects them, so must this
+    except (TypeError, ValueError):
+        col = np.empty(n)
+        for i, value in enumerate(values):
+            if _missing(value):
+                col[i] = np.nan
+                continue
+            try:
+                if isinstance(value, (bool, np.bool_)):
+                    raise TypeError
+                col[i] = float(value)
+            except (TypeError, ValueError):
+                col[i] = np.nan
+                bad.append((i, "must be a number"))
+        invalid = {i for i, _ in bad}
+    else:
+        invalid = ()
+
+    missing = np.isnan(col)
+    if invalid:
+        missing[list(invalid)] = False
+    if missing.any():
+        if field.required:
+            bad.extend((int(i), "is required") for i in np.flatnonzero(missing))
+        col[missing] = np.nan if field.default is None else field.default
+
+    checks = [(np.isinf(col), "must be a finite number")]
+    if field.kind == "int":
+        checks.append((np.isfinite(col) & (col != np.floor(col)), "must be a whole number"))
+    if field.min_val is not None:
+        checks.append((col < field.min_val, f"must be at least {field.min_val}"))
+    if field.max_val is not None:
+        checks.append((col > field.max_val, f"must be at most {field.max_val}"))
+    for mask, message in checks:
+        if mask.any():
+            bad.extend((int(i), message) for i in np.flatnonzero(mask))
+
+    if field.kind == "int":
+        col = np.where(np.isfinite(col), col, 0).astype(np.int64)
+    return col, bad
+
+
+def _has_bools(values):
+    kind = getattr(getattr(values, "dtype", None), "kind", "O")
+    if kind != "O":
+        return kind == "b"  # typed arrays are all bools or none
+    return any(isinstance(v, (bool, np.bool_)) for v in values)
+
+
+def _value_column(field, values, n, parse):
+    """bool and str columns are parsed per value (no arithmetic to vectorize)"""
+    if field.kind == "bool" and getattr(values, "dtype", None) == np.bool_:
+        return np.asarray(values), []
+    out = np.empty(n, dtype=bool if field.kind == "bool" else object)
+    bad = []
+    for i, value in enumerate(values):
+        try:
+            out[i] = parse(value)
+        except ValueError as e:
+            bad.append((i, str(e)))
+    return out, bad
+
+
+# ---------------- Shared schemas ----------------
+
+# Crop model inputs, in model column order: (name, min, max)
+SOIL_RANGES = (
+    ("nitrogen", 0, 200),
+    ("phosphorous", 0, 200),
+    ("potassium", 0, 250),  # the training data reaches 205 (the form allows it too)
+    ("temperature", -50, 100),
+    ("humidity", 0, 100),
+    ("ph", 0, 14),
+    ("rainfall", 0, 1000),
+)
+
+
+def soil_fields(names=None):
+    """Required Fields for the seven crop model inputs, optionally under other names (e.g. N, P, K)"""
+    names = names or [name for name, _, _ in SOIL_RANGES]
+    return {name: Field("float", required=True, min_val=lo, max_val=hi)
+            for name, (_, lo, hi) in zip(names, SOIL_RANGES)}
+
+
+# Scheme eligibility profiles: same fields, types and defaults as schemes_engine.PROFILE_FIELDS
+PROFILE_SCHEMA = Schema({
+    "land": Field("float", default=0.0, min_val=0),
+    "income": Field("float", default=0.0, min_val=0),
+    "age": Field("int", default=0, min_val=0, max_val=120),
+    "state": Field("str", default="", max_length=100),
+    "is_woman": Field("bool", default=False),
+    "is_scst": Field("bool", default=False),
+    "is_tenant": Field("bool", default=False),
+    "has_bank": Field("bool", default=True),
+})
@@ -1,25 +1,27 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { Card, CardContent } from "@/components/ui/card";
+import { fetchStatePrices, StatePrice } from "@/services/priceService";
 
-const stateData = [
-  { id: "punjab", name: "Punjab", price: "₹2,150", change: "+5.2%", x: 120, y: 80, width: 80, height: 50 },
-  { id: "haryana", name: "Haryana", price: "₹3,420", change: "-2.1%", x: 140, y: 130, width: 70, height: 40 },
-  { id: "gujarat", name: "Gujarat", price: "₹5,680", change: "+8.7%", x: 80, y: 200, width: 90, height: 80 },
-  { id: "maharashtra", name: "Maharashtra", price: "₹350", change: "+3.4%", x: 170, y: 240, width: 100, height: 70 },
-  { id: "rajasthan", name: "Rajasthan", price: "₹1,890", change: "+2.8%", x: 60, y: 140, width: 110, height: 100 },
-  { id: "madhya-pradesh", name: "Madhya Pradesh", price: "₹2,340", change: "+1.5%", x: 170, y: 180, width: 120, height: 60 },
-  { id: "uttar-pradesh", name: "Uttar Pradesh", price: "₹2,280", change: "+4.1%", x: 200, y: 100, width: 120, height: 80 },
-  { id: "karnataka", name: "Karnataka", price: "₹4,120", change: "+6.3%", x: 160, y: 310, width: 80, height: 70 },
-  { id: "telangana", name: "Telangana", price: "₹3,890", change: "+3.7%", x: 240, y: 270, width: 70, height: 50 },
-  { id: "andhra-pradesh", name: "Andhra Pradesh", price: "₹3,650", change: "+2.9%", x: 240, y: 320, width: 80, height: 70 },
-  { id: "tamil-nadu", name: "Tamil Nadu", price: "₹4,560", change: "+5.8%", x: 200, y: 380, width: 80, height: 70 },
-  { id: "kerala", name: "Kerala", price: "₹4,890", change: "+7.2%", x: 160, y: 410, width: 50, height: 60 },
-  { id: "west-bengal", name: "West Bengal", price: "₹2,890", change: "+3.1%", x: 320, y: 200, width: 60, height: 80 },
-  { id: "bihar", name: "Bihar", price: "₹2,120", change: "+2.5%", x: 290, y: 150, width: 70, height: 50 },
-  { id: "odisha", name: "Odisha", price: "₹3,240", change: "+4.8%", x: 310, y: 250, width: 70, height: 70 },
-  { id: "assam", name: "Assam", price: "₹2,567", change: "+3.9%", x: 380, y: 180, width: 60, height: 40 },
-  { id: "chhattisgarh", name: "Chhattisgarh", price: "₹2,450", change: "+2.7%", x: 270, y: 220, width: 70, height: 50 },
-  { id: "jharkhand", name: "Jharkhand", price: "₹2,340", change: "+1.8%", x: 320, y: 180, width: 60, height: 40 },
+// Map layout only; prices come from /map/prices
+const stateLayout = [
+  { id: "punjab", name: "Punjab", x: 120, y: 80, width: 80, height: 50 },
+  { id: "haryana", name: "Haryana", x: 140, y: 130, width: 70, height: 40 },
+  { id: "gujarat", name: "Gujarat", x: 80, y: 200, width: 90, height: 80 },
+  { id: "maharashtra", name: "Maharashtra", x: 170, y: 240, width: 100, height: 70 },
+  { id: "rajasthan", name: "Rajasthan", x: 60, y: 140, width: 110, height: 100 },
+  { id: "madhya-pradesh", name: "Madhya Pradesh", x: 170, y: 180, width: 120, height: 60 },
+  { id: "uttar-pradesh", name: "Uttar Pradesh", x: 200, y: 100, width: 120, height: 80 },
+  { id: "karnataka", name: "Karnataka", x: 160, y: 310, width: 80, height: 70 },
+  { id: "telangana", name: "Telangana", x: 240, y: 270, width: 70, height: 50 },
+  { id: "andhra-pradesh", name: "Andhra Pradesh", x: 240, y: 320, width: 80, height: 70 },
+  { id: "tamil-nadu", name: "Tamil Nadu", x: 200, y: 380, width: 80, height: 70 },
+  { id: "kerala", name: "Kerala", x: 160, y: 410, width: 50, height: 60 },
+  { id: "west-bengal", name: "West Bengal", x: 320, y: 200, width: 60, height: 80 },
+  { id: "bihar", name: "Bihar", x: 290, y: 150, width: 70, height: 50 },
+  { id: "odisha", name: "Odisha", x: 310, y: 250, width: 70, height: 70 },
+  { id: "assam", name: "Assam", x: 380, y: 180, width: 60, height: 40 },
+  { id: "chhattisgarh", name: "Chhattisgarh", x: 270, y: 220, width: 70, height: 50 },
+  { id: "jharkhand", name: "Jharkhand", x: 320, y: 180, width: 60, height: 40 },
 ];
 
 interface IndiaMapProps {
@@ -30,8 +32,28 @@ interface IndiaMapProps {
 const IndiaMap = ({ selectedCrop, selectedPeriod }: IndiaMapProps) => {
   const [hoveredState, setHoveredState] = useState<string | null>(null);
   const [selectedState, setSelectedState] = useState<string | null>(null);
+  const [prices, setPrices] = useState<Record<string, StatePrice>>({});
+
+  useEffect(() => {
+    let cancelled = false;
+    fetchStatePrices(selectedCrop)
+      .then((data) => { if (!cancelled) setPrices(data.states); })
+      .catch(() => { if (!cancelled) setPrices({}); });
+    return () => { cancelled = true; };
+  }, [selectedCrop]);
+
+  const stateData = stateLayout.map((state) => {
+    const p = prices[state.id];
+    const change = p?.change_pct;
+    return {
+      ...state,
+      price: p ? `₹${Math.round(p.modal_price).toLocaleString("en-IN")}` : "—",
+      change: change == null ? "" : `${change >= 0 ? "+" : ""}${change.toFixed(1)}%`,
+    };
+  });
 
   const getStateColor = (change: string) => {
+    if (!change) return "fill-muted-foreground/20 hover:fill-muted-foreground/30";
     const value = parseFloat(change.replace(/[+%]/g, ''));
     if (value > 5) return "fill-green-500/70 hover:fill-green-500";
     if (value > 0) return "fill-yellow-500/70 hover:fill-yellow-500";
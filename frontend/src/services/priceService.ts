@@ -50,3 +50,27 @@ export async function fetchLastTwoPrices(crop: string, state: string): Promise<M
   if (!res.ok) throw new Error("Failed to fetch last two prices");
   return res.json();
 }
+
+export type StatePrice = {
+  name: string;
+  modal_price: number;
+  week_ago_price: number | null;
+  change_pct: number | null;
+  markets: number;
+  as_of: string;
+};
+
+export type StatePriceMap = {
+  version: number;
+  commodity: string;
+  as_of: string | null;
+  range: [number, number] | null;
+  states: Record<string, StatePrice>;
+};
+
+// Fetch per-state aggregates for the map, keyed by state id (e.g. "tamil-nadu")
+export async function fetchStatePrices(commodity: string): Promise<StatePriceMap> {
+  const res = await fetch(`http://127.0.0.1:5000/map/prices?commodity=${encodeURIComponent(commodity)}`);
+  if (!res.ok) throw new Error("Failed to fetch state prices");
+  return res.json();
+}
@@ -1,85 +1,55 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, render_template, request, send_file, jsonify, Response
+import os
+import sys
 import joblib
 import numpy as np
-import re
-from functools import wraps
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from io import BytesIO
-import datetime
+import csv
+import io
+import report_service
+
+# Request schemas are shared with the main API (backend/validation.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend"))
+import validation  # noqa: E402
 
 app = Flask(__name__)
 model = joblib.load('model/rf_model.pkl')
 label_encoder = joblib.load('model/label_encoder.pkl')  # Load encoder
 
-# Input validation helper functions
-def validate_required_fields(required_fields):
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            for field in required_fields:
-                if field not in request.form or not request.form[field].strip():
-                    return jsonify({'error': f'Missing required field: {field}'}), 400
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
-
-def sanitize_numeric_input(value, min_val=None, max_val=None, field_name=""):
-    """Sanitize and validate numeric input"""
-    try:
-        # Remove any non-numeric characters except decimal point and minus
-        cleaned = re.sub(r'[^0-9.-]', '', str(value))
-        num_value = float(cleaned)
-        
-        if min_val is not None and num_value < min_val:
-            raise ValueError(f"{field_name} must be at least {min_val}")
-        if max_val is not None and num_value > max_val:
-            raise ValueError(f"{field_name} must be at most {max_val}")
-            
-        return num_value
-    except ValueError as e:
-        raise ValueError(f"Invalid {field_name}: {str(e)}")
+# Form fields, in model column order
+NUMERIC_FIELDS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+SOIL_SCHEMA = validation.Schema(validation.soil_fields(NUMERIC_FIELDS))
+REPORT_SCHEMA = validation.Schema({
+    'crop': validation.Field('str', required=True, max_length=100),
+    **validation.soil_fields(NUMERIC_FIELDS),
+})
+BULK_SCHEMA = validation.Schema({
+    **validation.soil_fields(NUMERIC_FIELDS),
+    'crop': validation.Field('str', default='', max_length=100),
+    'name': validation.Field('str', default='', max_length=100),
+})
 
-def sanitize_input(text, max_length=255):
-    """Sanitize text input"""
-    if not isinstance(text, str):
-        return ""
-    return text.strip()[:max_length]
+def invalid_input(e):
+    return jsonify({'error': str(e), 'errors': e.errors[:100]}), 400
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
 @app.route('/predict', methods=['POST'])
-@validate_required_fields(['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'])
 def predict():
     try:
-        # Sanitize and validate all numeric inputs
-        data = [
-            sanitize_numeric_input(request.form['N'], 0, 200, "Nitrogen (N)"),
-            sanitize_numeric_input(request.form['P'], 0, 200, "Phosphorus (P)"),
-            sanitize_numeric_input(request.form['K'], 0, 200, "Potassium (K)"),
-            sanitize_numeric_input(request.form['temperature'], -50, 100, "Temperature"),
-            sanitize_numeric_input(request.form['humidity'], 0, 100, "Humidity"),
-            sanitize_numeric_input(request.form['ph'], 0, 14, "pH"),
-            sanitize_numeric_input(request.form['rainfall'], 0, 1000, "Rainfall")
-        ]
-        
-        input_params = {
-            'N': str(data[0]),
-            'P': str(data[1]),
-            'K': str(data[2]),
-            'temperature': str(data[3]),
-            'humidity': str(data[4]),
-            'ph': str(data[5]),
-            'rainfall': str(data[6])
-        }
-        
+        values = SOIL_SCHEMA.check(request.form)
+        data = [values[f] for f in NUMERIC_FIELDS]
+        input_params = {f: str(values[f]) for f in NUMERIC_FIELDS}
+
         prediction_num = model.predict([data])[0]
         prediction_label = label_encoder.inverse_transform([prediction_num])[0]  # Convert to name
         
         return render_template('result.html', crop=prediction_label, params=input_params)
-        
+
+    except validation.ValidationError as e:
+        return invalid_input(e)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -88,59 +58,81 @@ def predict():
 
 # PDF download route
 @app.route('/download_report', methods=['POST'])
-@validate_required_fields(['crop', 'N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall'])
 def download_report():
     try:
-        # Sanitize inputs
-        crop = sanitize_input(request.form['crop'], 100)
-        params = {
-            'N': str(sanitize_numeric_input(request.form['N'], 0, 200, "Nitrogen")),
-            'P': str(sanitize_numeric_input(request.form['P'], 0, 200, "Phosphorus")),
-            'K': str(sanitize_numeric_input(request.form['K'], 0, 200, "Potassium")),
-            'temperature': str(sanitize_numeric_input(request.form['temperature'], -50, 100, "Temperature")),
-            'humidity': str(sanitize_numeric_input(request.form['humidity'], 0, 100, "Humidity")),
-            'ph': str(sanitize_numeric_input(request.form['ph'], 0, 14, "pH")),
-            'rainfall': str(sanitize_numeric_input(request.form['rainfall'], 0, 1000, "Rainfall"))
-        }
-        
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        
-        # Logo/Header (optional)
-        p.setFont('Helvetica-Bold', 18)
-        p.drawString(50, height - 60, "AgriTech Crop Recommendation Report")
-        
-        # Date & Time
-        p.setFont('Helvetica', 10)
-        p.drawString(50, height - 80, f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        # Input Parameters
-        p.setFont('Helvetica-Bold', 12)
-        p.drawString(50, height - 120, "Input Parameters:")
-        p.setFont('Helvetica', 11)
-        y = height - 140
-        for k, v in params.items():
-            p.drawString(70, y, f"{k}: {v}")
-            y -= 18
-            
-        # Prediction Result
-        p.setFont('Helvetica-Bold', 12)
-        p.drawString(50, y - 10, "Prediction Result:")
-        p.setFont('Helvetica', 13)
-        p.drawString(70, y - 30, f"Recommended Crop: {crop}")
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        
+        values = REPORT_SCHEMA.check(request.form)
+        params = {f: str(values[f]) for f in NUMERIC_FIELDS}
+
+        buffer = BytesIO(report_service.get_report(values['crop'], params))
+
         return send_file(buffer, as_attachment=True, download_name="crop_recommendation_report.pdf", mimetype='application/pdf')
-        
+
+    except validation.ValidationError as e:
+        return invalid_input(e)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
         app.logger.error(f"PDF generation error: {str(e)}")
         return jsonify({'error': 'Failed to generate PDF'}), 500
 
+# Bulk reports for a whole cooperative
+MAX_BULK_ROWS = 10000
+
+@app.route('/download_reports_bulk', methods=['POST'])
+def download_reports_bulk():
+    """
+    Upload a CSV ("file") with N, P, K, temperature, humidity, ph, rainfall and
+    optional crop / name columns. Rows without a crop are predicted in one batch.
+    format=zip (default) streams one PDF per row; format=pdf returns one multi-page PDF,
+    rendered in full before the response starts (PDFs can't be emitted page by page).
+    """
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'Missing required field: file'}), 400
+        out_format = request.form.get('format', request.args.get('format', 'zip'))
+        if out_format not in ('zip', 'pdf'):
+            return jsonify({'error': 'format must be zip or pdf'}), 400
+
+        reader = csv.DictReader(io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig'))
+        raw_rows = []
+        try:
+            for raw in reader:
+                if len(raw_rows) == MAX_BULK_ROWS:
+                    return jsonify({'error': f'At most {MAX_BULK_ROWS} rows per request'}), 400
+                raw_rows.append(raw)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'error': f'File must be a UTF-8 CSV: {e}'}), 400
+        if not raw_rows:
+            return jsonify({'error': 'No rows in CSV'}), 400
+
+        # Validated column-wise; error rows are 1-based data rows, as in the CSV
+        columns, errors = BULK_SCHEMA.validate_batch(raw_rows)
+        if errors:
+            for e in errors:
+                e['row'] = None if e['row'] is None else e['row'] + 1
+            return jsonify({'error': 'Invalid rows', 'rows': errors[:100]}), 400
+
+        features = np.column_stack([columns[f] for f in NUMERIC_FIELDS])
+        crops = columns['crop']
+        missing = np.flatnonzero(crops == '')
+        if missing.size:
+            crops[missing] = label_encoder.inverse_transform(model.predict(features[missing]))
+        rows = [[str(crops[i]), {f: str(v) for f, v in zip(NUMERIC_FIELDS, features[i].tolist())},
+                 columns['name'][i] or f'report_{i + 1:05d}']
+                for i in range(len(raw_rows))]
+
+        if out_format == 'pdf':
+            pdf = report_service.render_multipage([(crop, params, name) for crop, params, name in rows])
+            return send_file(BytesIO(pdf), as_attachment=True, download_name="crop_recommendation_reports.pdf",
+                             mimetype='application/pdf')
+
+        return Response(report_service.iter_zip([tuple(r) for r in rows]), mimetype='application/zip',
+                        headers={'Content-Disposition': 'attachment; filename=crop_recommendation_reports.zip'})
+
+    except Exception as e:
+        app.logger.error(f"Bulk report error: {str(e)}")
+        return jsonify({'error': 'Failed to generate reports'}), 500
+
 # Global error handlers
 @app.errorhandler(400)
 def bad_request(error):
@@ -0,0 +1,234 @@
+"""
+Crop recommendation PDF reports: rendering, caching and bulk generation.
+
+Rendered PDFs are cached by a hash of (template version, date, crop, params),
+so repeat downloads of the same recommendation on the same day skip reportlab
+entirely. Bulk
+requests render one multi-page PDF, or a zip of per-row PDFs produced in a
+process pool and streamed out as each file completes. The multi-page PDF is
+built whole before it is sent: reportlab writes the cross-reference table that
+locates every page only when the document is saved, so use the zip to stream.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO, RawIOBase
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+# Bump whenever the layout below changes so stale cached PDFs are not served
+TEMPLATE_VERSION = "1"
+
+PARAM_ORDER = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+WIDTH, HEIGHT = A4
+TITLE = "AgriTech Crop Recommendation Report"
+DEFAULT_WORKERS = os.cpu_count() or 1
+MAX_NAME_LENGTH = 100
+
+
+def _draw_header(p):
+    """Static elements shared by every report page"""
+    p.setFont('Helvetica-Bold', 18)
+    p.drawString(50, HEIGHT - 60, TITLE)
+    p.setFont('Helvetica-Bold', 12)
+    p.drawString(50, HEIGHT - 120, "Input Parameters:")
+
+
+def _draw_body(p, crop, params, generated_at, label=None):
+    p.setFont('Helvetica', 10)
+    p.drawString(50, HEIGHT - 80, f"Date: {generated_at}")
+    if label:
+        p.drawString(350, HEIGHT - 80, label)
+
+    p.setFont('Helvetica', 11)
+    y = HEIGHT - 140
+    for k in PARAM_ORDER:
+        p.drawString(70, y, f"{k}: {params[k]}")
+        y -= 18
+
+    p.setFont('Helvetica-Bold', 12)
+    p.drawString(50, y - 10, "Prediction Result:")
+    p.setFont('Helvetica', 13)
+    p.drawString(70, y - 30, f"Recommended Crop: {crop}")
+
+
+def _now():
+    """Report date; part of the cache key, so cached PDFs never show a previous day"""
+    return datetime.date.today().isoformat()
+
+
+def render_report(crop, params, generated_at=None):
+    """Render a single-page report and return the PDF bytes"""
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    _draw_header(p)
+    _draw_body(p, crop, params, generated_at or _now())
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def render_multipage(rows, generated_at=None):
+    """Render one page per (crop, params, label) row into a single PDF"""
+    generated_at = generated_at or _now()
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    # Draw the static header once as a form XObject and reference it from every page
+    p.beginForm("report_header")
+    _draw_header(p)
+    p.endForm()
+    for crop, params, label in rows:
+        p.doForm("report_header")
+        _draw_body(p, crop, params, generated_at, label)
+        p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def report_key(crop, params, generated_at):
+    payload = json.dumps([TEMPLATE_VERSION, generated_at, crop, [params[k] for k in PARAM_ORDER]])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    """Thread-safe LRU of rendered PDFs, bounded by total size in bytes"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+
+cache = ReportCache()
+
+
+def get_report(crop, params):
+    """Cached single report for a (crop, params) pair"""
+    generated_at = _now()
+    key = report_key(crop, params, generated_at)
+    data = cache.get(key)
+    if data is None:
+        data = render_report(crop, params, generated_at)
+        cache.put(key, data)
+    return data
+
+
+def _render_job(job):
+    crop, params, generated_at = job
+    return render_report(crop, params, generated_at)
+
+
+class _ZipSink(RawIOBase):
+    """Unseekable write target for zipfile; drained after each member is written"""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """One long-lived process pool per worker count"""
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return pool
+
+
+def member_name(name, taken):
+    """A safe, unique '<name>.pdf' zip member: no directories or odd characters, duplicates suffixed"""
+    base = re.split(r'[\\/]', str(name))[-1]
+    base = re.sub(r'[^A-Za-z0-9._ -]+', '_', base).strip(' .')[:MAX_NAME_LENGTH] or 'report'
+    member, n = f"{base}.pdf", 1
+    while member.lower() in taken:
+        n += 1
+        member = f"{base}_{n}.pdf"
+    taken.add(member.lower())
+    return member
+
+
+def iter_zip(rows, workers=None, window=None):
+    """
+    Stream a zip of one PDF per (crop, params, name) row. Cache misses are
+    rendered in the process pool with at most `window` jobs in flight, so memory
+    stays bounded however many rows are requested.
+    """
+    workers = workers or DEFAULT_WORKERS
+    pool = _get_pool(workers)
+    window = window or 4 * workers
+    sink = _ZipSink()
+    generated_at = _now()
+    taken = set()
+
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as zf:
+        pending = []
+        rows = iter(rows)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < window:
+                row = next(rows, None)
+                if row is None:
+                    exhausted = True
+                    break
+                crop, params, name = row
+                key = report_key(crop, params, generated_at)
+                data = cache.get(key)
+                future = None if data is not None else pool.submit(_render_job, (crop, params, generated_at))
+                pending.append((name, key, data, future))
+            if not pending:
+                break
+            name, key, data, future = pending.pop(0)
+            if future is not None:
+                data = future.result()
+                cache.put(key, data)
+            zf.writestr(member_name(name, taken), data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
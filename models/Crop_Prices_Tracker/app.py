@@ -1,17 +1,23 @@
 from flask import Flask, render_template, request, jsonify, redirect
-import requests
+import os
+import sys
 import re
 from functools import wraps
 
+# Shared data.gov.in client (pooled session, retries, gzip) lives in backend/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend"))
+from price_client import PriceClient  # noqa: E402
+import http_cache  # noqa: E402
+import price_snapshot  # noqa: E402
+
 app = Flask(__name__)
+http_cache.init_compression(app)
 
 # Global API config
 API_URL = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
-API_PARAMS = {
-    "api-key": "579b464db66ec23bdd000001c43ef34767ce496343897dfb1893102b",
-    "format": "json",
-    "limit": 1000
-}
+API_KEY = "579b464db66ec23bdd000001c43ef34767ce496343897dfb1893102b"
+API_LIMIT = 1000
+price_api = PriceClient(API_KEY, API_URL, timeout=10)
 
 # Input validation helper functions
 def sanitize_input(text, max_length=255):
@@ -33,17 +39,31 @@ def validate_required_fields(required_fields):
         return decorated_function
     return decorator
 
-# Load data once (to avoid repeated API hits)
-def load_data():
-    try:
-        response = requests.get(API_URL, params=API_PARAMS, timeout=10)
-        response.raise_for_status()
-        return response.json().get("records", [])
-    except requests.RequestException as e:
-        app.logger.error(f"API request failed: {str(e)}")
-        return []
-
-DATA = load_data()
+# One worker (whichever holds the snapshot lock) syncs data.gov.in into the tracker's own price store
+# and publishes a snapshot file; every worker maps that file instead of fetching and holding its own copy.
+# This is a different resource from the backend's, so it must never share the backend's store or snapshot.
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PRICE_DB_PATH = os.environ.get("TRACKER_PRICE_DB_PATH") or os.path.join(DATA_DIR, "prices.db")
+PRICE_SNAPSHOT_PATH = os.environ.get("TRACKER_PRICE_SNAPSHOT_PATH") or os.path.join(DATA_DIR, "prices.snapshot")
+PRICE_REFRESH_SECONDS = int(os.environ.get("PRICE_REFRESH_SECONDS", 900))
+prices = price_snapshot.SnapshotReader(PRICE_SNAPSHOT_PATH)
+# The tracker queries this resource without a sort parameter (sort_by_date=False), as it always has.
+# Until the first sync lands (possibly in another worker) the pages render without data.
+publisher = price_snapshot.SnapshotPublisher(price_api, max_records=API_LIMIT, interval=PRICE_REFRESH_SECONDS,
+                                             path=PRICE_SNAPSHOT_PATH, store_path=PRICE_DB_PATH,
+                                             sort_by_date=False)
+# Started by `python app.py`; under a WSGI server (gunicorn app:app) set TRACKER_PUBLISH_PRICES=1.
+# Importing the module (tooling, tests) never starts a sync thread on its own.
+if os.environ.get("TRACKER_PUBLISH_PRICES", "").lower() in ("1", "true", "yes"):
+    publisher.start()
+
+def data_version():
+    """Store version of the mapped snapshot, for ETags"""
+    snapshot = prices.current()
+    return snapshot.version if snapshot else None
+
+def display_price(value):
+    return "" if value is None else f"{value:.0f}" if float(value).is_integer() else f"{value:.2f}"
 
 @app.route('/')
 def home():
@@ -52,7 +72,8 @@ def home():
 @app.route('/crop_price_tracker', methods=['GET', 'POST'])
 def crop_price_tracker():
     try:
-        crops = sorted({record['commodity'] for record in DATA if record.get('commodity')})
+        snapshot = prices.current()
+        crops = [c for c in snapshot.distinct('commodity') if c] if snapshot else []
         result = []
         error = None
 
@@ -65,13 +86,9 @@ def crop_price_tracker():
             # Validate inputs
             if not crop or not state or not market:
                 error = "All fields (crop, state, market) are required."
-            else:
-                result = [
-                    r for r in DATA
-                    if r.get('commodity', '').lower() == crop.lower()
-                    and r.get('state', '').lower() == state.lower()
-                    and r.get('market', '').lower() == market.lower()
-                ]
+            elif snapshot is not None:
+                result = [{**r, 'modal_price': display_price(r['modal_price'])}
+                          for r in snapshot.records(commodity=crop, state=state, market=market)]
 
                 if not result:
                     error = "No data found for the given crop, state, and market."
@@ -83,33 +100,32 @@ def crop_price_tracker():
         return render_template('crop_price_tracker.html', crops=[], result=[], error="An error occurred while processing your request.")
 
 @app.route('/get_states')
+@http_cache.conditional(data_version, max_age=300)
 def get_states():
     try:
         crop = sanitize_input(request.args.get('crop', ''), 100).lower()
-        if not crop:
+        snapshot = prices.current()
+        if not crop or snapshot is None:
             return jsonify([])
-            
-        states = sorted({r['state'] for r in DATA if r.get('commodity', '').lower() == crop})
-        return jsonify(states)
+
+        return jsonify(snapshot.distinct('state', commodity=crop))
         
     except Exception as e:
         app.logger.error(f"Get states error: {str(e)}")
         return jsonify([])
 
 @app.route('/get_markets')
+@http_cache.conditional(data_version, max_age=300)
 def get_markets():
     try:
         crop = sanitize_input(request.args.get('crop', ''), 100).lower()
         state = sanitize_input(request.args.get('state', ''), 100).lower()
         
-        if not crop or not state:
+        snapshot = prices.current()
+        if not crop or not state or snapshot is None:
             return jsonify([])
-            
-        markets = sorted({
-            r['market'] for r in DATA
-            if r.get('commodity', '').lower() == crop and r.get('state', '').lower() == state
-        })
-        return jsonify(markets)
+
+        return jsonify(snapshot.distinct('market', commodity=crop, state=state))
         
     except Exception as e:
         app.logger.error(f"Get markets error: {str(e)}")
@@ -126,4 +142,5 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
+    publisher.start()
     app.run(debug=True, port=5001)